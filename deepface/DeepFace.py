@@ -2,7 +2,7 @@
 import os
 import warnings
 import logging
-from typing import Any, Dict, IO, List, Union, Optional
+from typing import Any, Dict, IO, Iterable, Iterator, List, Sequence, Union, Optional
 
 # this has to be set before importing tensorflow
 os.environ["TF_USE_LEGACY_KERAS"] = "1"
@@ -26,6 +26,8 @@ from deepface.modules import (
     detection,
     streaming,
     preprocessing,
+    watching,
+    clustering,
 )
 from deepface import __version__
 
@@ -48,7 +50,9 @@ if tf_version == 2:
 folder_utils.initialize_folder()
 
 
-def build_model(model_name: str, task: str = "facial_recognition") -> Any:
+def build_model(
+    model_name: str, task: str = "facial_recognition", backend: Optional[str] = None
+) -> Any:
     """
     This function builds a pre-trained model
     Args:
@@ -61,10 +65,14 @@ def build_model(model_name: str, task: str = "facial_recognition") -> Any:
             - Fasnet for spoofing
         task (str): facial_recognition, facial_attribute, face_detector, spoofing
             default is facial_recognition
+        backend (str): inference backend of facial recognition and facial attribute models,
+            tensorflow or onnx. Onnx exports keras models once and runs them with onnx
+            runtime on cpu. Default is the DEEPFACE_INFERENCE_BACKEND environment variable,
+            or tensorflow if it is not set.
     Returns:
         built_model
     """
-    return modeling.build_model(task=task, model_name=model_name)
+    return modeling.build_model(task=task, model_name=model_name, backend=backend)
 
 
 def verify(
@@ -87,12 +95,12 @@ def verify(
         img1_path (str or np.ndarray or IO[bytes] or List[float]): Path to the first image.
             Accepts exact image path as a string, numpy array (BGR), a file object that supports
             at least `.read` and is opened in binary mode, base64 encoded images
-            or pre-calculated embeddings.
+            or pre-calculated embeddings, as a list of floats or a 1 dimensional numpy array.
 
         img2_path (str or np.ndarray or IO[bytes] or List[float]): Path to the second image.
             Accepts exact image path as a string, numpy array (BGR), a file object that supports
             at least `.read` and is opened in binary mode, base64 encoded images
-            or pre-calculated embeddings.
+            or pre-calculated embeddings, as a list of floats or a 1 dimensional numpy array.
 
         model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
             OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
@@ -280,7 +288,15 @@ def find(
     refresh_database: bool = True,
     anti_spoofing: bool = False,
     batched: bool = False,
-) -> Union[List[pd.DataFrame], List[List[Dict[str, Any]]]]:
+    index: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    workers: int = 1,
+    block_size: Optional[int] = None,
+    return_format: str = "dicts",
+) -> Union[List[pd.DataFrame], List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
     """
     Identify individuals in a database
     Args:
@@ -320,14 +336,64 @@ def find(
         silent (boolean): Suppress or allow some log messages for a quieter analysis process
             (default is False).
 
-        refresh_database (boolean): Synchronizes the images representation (pkl) file with the
-            directory/db files, if set to false, it will ignore any file changes inside the db_path
-            (default is True).
+        refresh_database (boolean): Synchronizes the images representation (datastore) files
+            with the directory/db files, if set to false, it will ignore any file changes inside
+            the db_path (default is True).
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        index (string): Approximate nearest neighbour index to nominate candidates instead of
+            comparing against every item in the database. Options: 'ivf', 'hnsw', 'identity',
+            'int8', 'pq'. The identity index groups images by their directory, e.g. one folder
+            per person, and only compares against members of the people with the closest
+            centroids. The int8 index scans embeddings quantized to one byte per dimension,
+            4 times smaller, and compares the shortlist exactly without losing any match.
+            The pq index scans product quantized codes of one byte per 8 dimensions.
+            With int8 and pq the float32 embeddings are not kept in memory, they
+            stay memory mapped and only the rows of the shortlist are read from disk.
+            Changes recorded since the last snapshot are compacted into it first.
+            The index is stored next to the representations and kept in sync with them.
+            Default is None for exact search.
+
+        nprobe (int): Search effort of the index. Number of clusters to scan for ivf
+            (default is 8), size of the dynamic candidate list for hnsw (default is 64) or
+            number of people to scan for identity (default is 8). People too far away to
+            have any image under the threshold are never scanned. Number of closest items
+            compared exactly for pq (default is 256). Not used by int8.
+            Higher values increase recall and latency.
+
+        top_k (int): Return at most this many closest identities under the threshold for each
+            detected face. Default is None to return all of them.
+
+        refresh_mode (string): How refresh_database detects changes. Options: 'files' checks
+            every image's properties, 'directories' skips directories whose entries did not
+            change since the previous call, using a manifest stored next to the representations.
+            The latter does not detect images overwritten in place under the same name
+            (default is files).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass while
+            representing new images in db_path (default is 32).
+
+        workers (int): Number of processes representing new images in db_path. Each process
+            loads its own detector and facial recognition model. Processes are spawned, so the
+            calling script must be guarded with `if __name__ == "__main__":` (default is 1).
+
+        block_size (int): Number of items in db_path compared at once. If set, the database
+            is scanned block by block, keeping only the matches of each face found so far,
+            so that memory is bounded by the block size and the number of matches instead
+            of the database size. Representations are read from disk as they are scanned,
+            use refresh_database=False for databases larger than memory. Default is None to
+            compare against all items at once.
+
+        return_format (string): Format of the matches of each face if batched is True.
+            Options: 'dicts' returns a list of dicts, one for each match. 'arrays' returns
+            a single dict of numpy arrays, one for each key, where source_x, source_y,
+            source_w, source_h and threshold are stored once as scalars. It skips building
+            a dict for every match, which dominates the search time of large match sets
+            (default is dicts).
+
     Returns:
-        results (List[pd.DataFrame] or List[List[Dict[str, Any]]]):
+        results (List[pd.DataFrame] or List[List[Dict[str, Any]]] or List[Dict[str, Any]]):
             A list of pandas dataframes (if `batched=False`) or
             a list of dicts (if `batched=True`).
             Each dataframe or dict corresponds to the identity information for
@@ -369,11 +435,239 @@ def find(
         refresh_database=refresh_database,
         anti_spoofing=anti_spoofing,
         batched=batched,
+        index=index,
+        nprobe=nprobe,
+        top_k=top_k,
+        refresh_mode=refresh_mode,
+        batch_size=batch_size,
+        workers=workers,
+        block_size=block_size,
+        return_format=return_format,
+    )
+
+
+def find_many(
+    img_paths: Iterable[Union[str, np.ndarray, IO[bytes]]],
+    db_path: str,
+    model_name: str = "VGG-Face",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    threshold: Optional[float] = None,
+    normalization: str = "base",
+    silent: bool = False,
+    refresh_database: bool = True,
+    anti_spoofing: bool = False,
+    batched: bool = False,
+    index: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    workers: int = 1,
+    block_size: Optional[int] = None,
+    chunk_size: int = 256,
+    return_format: str = "dicts",
+) -> Iterator[Union[List[pd.DataFrame], List[List[Dict[str, Any]]], List[Dict[str, Any]]]]:
+    """
+    Identify individuals of many probe images in a database with a single call.
+        The database is loaded and refreshed once. Probes are then searched in chunks,
+        representing their faces in batches and comparing them against the database
+        with one distance matrix per chunk.
+    Args:
+        img_paths (iterable): probe images, each one is an exact path to the image, a numpy
+            array in BGR format, a file object opened in binary mode, or a base64 encoded
+            image. It can be a generator, probes are read lazily chunk by chunk.
+
+        chunk_size (int): Number of probes searched together (default is 256).
+
+        Other arguments are the same as find's.
+
+    Returns:
+        results (Iterator): yields the result find would return for each probe, a list of
+            pandas dataframes (if `batched=False`) or a list of list of dicts or a list of dicts
+            of arrays (if `batched=True`, depending on return_format), in the order of img_paths.
+    """
+    return recognition.find_many(
+        img_paths=img_paths,
+        db_path=db_path,
+        model_name=model_name,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        threshold=threshold,
+        normalization=normalization,
+        silent=silent,
+        refresh_database=refresh_database,
+        anti_spoofing=anti_spoofing,
+        batched=batched,
+        index=index,
+        nprobe=nprobe,
+        top_k=top_k,
+        refresh_mode=refresh_mode,
+        batch_size=batch_size,
+        workers=workers,
+        block_size=block_size,
+        chunk_size=chunk_size,
+        return_format=return_format,
+    )
+
+
+def cluster(
+    db_path: str,
+    model_name: str = "VGG-Face",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    threshold: Optional[float] = None,
+    normalization: str = "base",
+    silent: bool = False,
+    refresh_database: bool = True,
+    min_size: int = 2,
+    block_size: int = 4096,
+) -> List[pd.DataFrame]:
+    """
+    Group the faces of a database into clusters of the same person, e.g. to find duplicates.
+        Faces closer than the threshold are linked, and faces linked directly or through
+        other faces form a cluster. Every pair of faces is compared once, in tiles, so memory
+        is bounded by the block size instead of the database size.
+
+    Args:
+        db_path (string): Path to the folder containing image files.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        distance_metric (string): Metric for measuring similarity. Options: 'cosine',
+            'euclidean', 'euclidean_l2' (default is cosine).
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Set to False to avoid the exception for low-resolution images (default is True).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'yolov11n', 'yolov11s', 'yolov11m',
+            'centerface' or 'skip' (default is opencv).
+
+        align (boolean): Perform alignment based on the eye positions (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        threshold (float): Maximum distance of linked faces. If left unset, the pre-tuned
+            threshold of the model and distance metric is used (default is None).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace (default is base).
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process
+            (default is False).
+
+        refresh_database (boolean): Synchronize the datastore with the images in db_path
+            first. If set to false, the existing datastore is clustered as is (default is True).
+
+        min_size (int): Minimum number of faces of a returned cluster. Default is 2 to return
+            duplicates only, set to 1 to return every face.
+
+        block_size (int): Number of faces compared against each other at once
+            (default is 4096).
+
+    Returns:
+        clusters (List[pd.DataFrame]): a dataframe for each cluster, largest first, with
+            identity, hash and target_x, target_y, target_w, target_h columns of its faces.
+    """
+    return clustering.cluster(
+        db_path=db_path,
+        model_name=model_name,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        threshold=threshold,
+        normalization=normalization,
+        silent=silent,
+        refresh_database=refresh_database,
+        min_size=min_size,
+        block_size=block_size,
     )
 
 
+def watch(
+    db_path: str,
+    model_name: str = "VGG-Face",
+    detector_backend: str = "opencv",
+    enforce_detection: bool = True,
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    silent: bool = False,
+    interval: float = 1.0,
+    backend: str = "auto",
+    batch_size: int = 32,
+) -> watching.Watcher:
+    """
+    Keep the representations of a database in sync with its images in the background,
+        so that find can be called with refresh_database=False and still see every change.
+
+    Args:
+        db_path (string): Path to the folder containing image files.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'yolov11n', 'yolov11s',
+            'yolov11m', 'centerface' or 'skip' (default is opencv).
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Default is True. Set to False to avoid the exception for low-resolution images.
+
+        align (boolean): Perform alignment based on the eye positions (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Default is base. Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process.
+
+        interval (float): Seconds between synchronizations (default is 1.0).
+
+        backend (string): How changes are noticed. Options: 'events' for file system events,
+            requiring watchdog, 'polling' for checking the modification times of directories,
+            which misses images overwritten in place, or 'auto' to use events if watchdog
+            is installed (default is auto).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass while
+            representing new images (default is 32).
+
+    Returns:
+        watcher (Watcher): started watcher. Call its stop method, or use it as a context
+            manager, to stop watching. Find calls must use the same model_name,
+            detector_backend, align, expand_percentage and normalization.
+    """
+    return watching.Watcher(
+        db_path=db_path,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        enforce_detection=enforce_detection,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        silent=silent,
+        interval=interval,
+        backend=backend,
+        batch_size=batch_size,
+    ).start()
+
+
 def represent(
-    img_path: Union[str, np.ndarray, IO[bytes]],
+    img_path: Union[str, np.ndarray, IO[bytes], Sequence[Union[str, np.ndarray, IO[bytes]]]],
     model_name: str = "VGG-Face",
     enforce_detection: bool = True,
     detector_backend: str = "opencv",
@@ -382,15 +676,20 @@ def represent(
     normalization: str = "base",
     anti_spoofing: bool = False,
     max_faces: Optional[int] = None,
-) -> List[Dict[str, Any]]:
+    batch_size: int = 32,
+    output: str = "list",
+) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
     """
     Represent facial images as multi-dimensional vector embeddings.
 
     Args:
-        img_path (str or np.ndarray or IO[bytes]): The exact path to the image, a numpy array
-            in BGR format, a file object that supports at least `.read` and is opened in binary
-            mode, or a base64 encoded image. If the source image contains multiple faces,
-            the result will include information for each detected face.
+        img_path (str or np.ndarray or IO[bytes] or list): The exact path to the image,
+            a numpy array in BGR format, a file object that supports at least `.read` and is
+            opened in binary mode, or a base64 encoded image. If the source image contains
+            multiple faces, the result will include information for each detected face.
+            Many images can be represented at once as a list, or as a 4 dimensional numpy
+            array of images stacked on the first axis. Faces of all images are then fed to
+            the model together in batches, which is much faster than one call per image.
 
         model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
             OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet
@@ -414,13 +713,24 @@ def represent(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
-        max_faces (int): Set a limit on the number of faces to be processed (default is None).
+        max_faces (int): Set a limit on the number of faces to be processed for each image
+            (default is None).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass
+            (default is 32).
+
+        output (string): Type of the embeddings. Options: 'list' for lists of floats, ready to
+            be serialized to JSON, or 'numpy' for float32 numpy arrays straight from the model.
+            The latter skips creating a Python float for every dimension, e.g. 4096 of them
+            per face for VGG-Face (default is list).
 
     Returns:
-        results (List[Dict[str, Any]]): A list of dictionaries, each containing the
-            following fields:
+        results (List[Dict[str, Any]] or List[List[Dict[str, Any]]]): A list of dictionaries,
+            each containing the following fields. If many images are given, a list of such
+            lists, one for each image in the same order.
 
-        - embedding (List[float]): Multidimensional vector representing facial features.
+        - embedding (List[float] or np.ndarray): Multidimensional vector representing facial
+            features.
             The number of dimensions varies based on the reference model
             (e.g., FaceNet returns 128 dimensions, VGG-Face returns 4096 dimensions).
 
@@ -442,6 +752,8 @@ def represent(
         normalization=normalization,
         anti_spoofing=anti_spoofing,
         max_faces=max_faces,
+        batch_size=batch_size,
+        output=output,
     )
 
 
@@ -10,6 +10,7 @@ import threading
 # project dependencies
 from deepface import DeepFace
 from deepface.api.src.modules.core.routes import blueprint
+from deepface.modules import batching, caching
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -73,6 +74,22 @@ def create_app():
         release=f"deepface@{DeepFace.__version__}"  # Track releases using DeepFace version
     )
 
+    # share forward passes of concurrent requests, requires a threaded server (e.g. --threads)
+    if os.getenv('DEEPFACE_MICRO_BATCHING', '0') == '1':
+        batching.enable(
+            max_batch_size=int(os.getenv('DEEPFACE_MICRO_BATCH_SIZE', '32')),
+            max_wait=float(os.getenv('DEEPFACE_MICRO_BATCH_WAIT_MS', '5')) / 1000,
+        )
+        logger.info("Micro batching of concurrent requests is enabled")
+
+    # serve embeddings of resubmitted images from a cache
+    if os.getenv('DEEPFACE_EMBEDDING_CACHE_BYTES'):
+        caching.enable(
+            max_bytes=int(os.getenv('DEEPFACE_EMBEDDING_CACHE_BYTES')),
+            disk=os.getenv('DEEPFACE_EMBEDDING_CACHE_DISK', '0') == '1',
+        )
+        logger.info("Embedding cache is enabled")
+
     app = Flask(__name__)
     CORS(app)
     app.register_blueprint(blueprint)
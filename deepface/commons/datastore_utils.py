@@ -0,0 +1,937 @@
+# built-in dependencies
+import io
+import json
+import os
+import pickle
+import re
+import struct
+import threading
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# metadata columns stored in the sidecar, in the order they appear in find results
+METADATA_COLUMNS = ["identity", "hash", "target_x", "target_y", "target_w", "target_h"]
+COORDINATE_COLUMNS = ["target_x", "target_y", "target_w", "target_h"]
+
+# a snapshot is published as a versioned set of files, the pointer names the current version
+SNAPSHOT_SUFFIX = "_snapshot.json"
+EMBEDDINGS_SUFFIX = "_embeddings_{version}.npy"
+METADATA_SUFFIX = "_metadata_{version}.npz"
+JOURNAL_SUFFIX = "_journal_{version}.npy"
+VERSIONED_FILES = re.compile(r"_(embeddings|metadata|journal)_(\d+)\.(npy|npz)$")
+MANIFEST_SUFFIX = "_manifest.json"
+LOCK_SUFFIX = "_lock"
+
+# journal record kinds, and the number of arrays stored after the header of each
+REMOVE_RECORD = 0
+ADD_RECORD = 1
+RECORD_ARRAYS = {REMOVE_RECORD: 1, ADD_RECORD: 3 + len(METADATA_COLUMNS)}
+
+# compact the journal into the snapshot once it is this large relative to the snapshot
+COMPACTION_RATIO = 0.25
+COMPACTION_MIN_BYTES = 16 * 1024**2
+
+# rows of embeddings handled at once while normalizing them
+NORMS_CHUNK_SIZE = 65536
+
+# serializes writers in this process, the lock file serializes them across processes
+_writer_lock = threading.Lock()
+_compacting_lock = threading.Lock()
+_compacting: set = set()
+
+
+@dataclass
+class Datastore:
+    """
+    Columnar representations of a facial database.
+
+    Args:
+        embeddings (np.ndarray): float32 matrix of shape (N, D) of l2 normalized embeddings,
+            so that cosine similarities are a single matrix product. Rows without a detected
+            face are zero vectors. It may be a read-only memory map of the file on disk.
+        norms (np.ndarray): float32 array of shape (N,) with the l2 norm of each embedding
+            before normalization, zero for rows without a detected face.
+        metadata (dict): column name to array of shape (N,) for identity, hash and
+            target_x, target_y, target_w, target_h
+        valid (np.ndarray): boolean array of shape (N,). False if no face was detected
+            in the corresponding image, so that row has no embedding.
+        sequence (int): sequence number of the last change applied, either merged into
+            the snapshot or read from its journal
+    """
+
+    embeddings: np.ndarray
+    norms: np.ndarray
+    metadata: Dict[str, np.ndarray]
+    valid: np.ndarray
+    sequence: int = 0
+
+    def __len__(self) -> int:
+        return int(self.valid.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.embeddings.shape[1])
+
+    @property
+    def identities(self) -> np.ndarray:
+        return self.metadata["identity"]
+
+
+def get_datastore_name(
+    model_name: str,
+    detector_backend: str,
+    align: bool,
+    normalization: str,
+    expand_percentage: int,
+) -> str:
+    """
+    Find the base file name of the datastore for a given configuration
+    Args:
+        model_name (str): facial recognition model name
+        detector_backend (str): face detector backend
+        align (bool): alignment is enabled or not
+        normalization (str): normalization technique
+        expand_percentage (int): expand percentage of detected facial area
+    Returns:
+        name (str): base name without extension, e.g.
+            ds_model_vggface_detector_opencv_aligned_normalization_base_expand_0
+    """
+    file_parts = [
+        "ds",
+        "model",
+        model_name,
+        "detector",
+        detector_backend,
+        "aligned" if align else "unaligned",
+        "normalization",
+        normalization,
+        "expand",
+        str(expand_percentage),
+    ]
+    return "_".join(file_parts).replace("-", "").lower()
+
+
+def get_snapshot_path(datastore_path: str) -> str:
+    return datastore_path + SNAPSHOT_SUFFIX
+
+
+def get_embeddings_path(datastore_path: str, version: int) -> str:
+    return datastore_path + EMBEDDINGS_SUFFIX.format(version=version)
+
+
+def get_metadata_path(datastore_path: str, version: int) -> str:
+    return datastore_path + METADATA_SUFFIX.format(version=version)
+
+
+def get_journal_path(datastore_path: str, version: int) -> str:
+    return datastore_path + JOURNAL_SUFFIX.format(version=version)
+
+
+def get_manifest_path(datastore_path: str) -> str:
+    return datastore_path + MANIFEST_SUFFIX
+
+
+def get_lock_path(datastore_path: str) -> str:
+    return datastore_path + LOCK_SUFFIX
+
+
+def get_pickle_path(datastore_path: str) -> str:
+    return datastore_path + ".pkl"
+
+
+def exists(datastore_path: str) -> bool:
+    """
+    Check a snapshot of the columnar datastore is published for the given base path
+    Args:
+        datastore_path (str): datastore path without extension
+    Returns:
+        result (bool)
+    """
+    return os.path.exists(get_snapshot_path(datastore_path))
+
+
+def get_version(datastore_path: str) -> Optional[int]:
+    """
+    Find the version of the published snapshot of a datastore
+    Args:
+        datastore_path (str): datastore path without extension
+    Returns:
+        version (int): version of the snapshot files or None if nothing is published
+    """
+    pointer = __read_pointer(datastore_path)
+    return None if pointer is None else pointer[0]
+
+
+def find_datastore_signature(datastore_path: str) -> Optional[Tuple]:
+    """
+    Find the identity of the published snapshot of a datastore and its journal on disk
+        to detect changes
+    Args:
+        datastore_path (str): datastore path without extension
+    Returns:
+        signature (tuple): version and sequence of the snapshot, and the identity of the
+            snapshot pointer and journal files, or None if nothing is published
+    """
+    pointer = __read_pointer(datastore_path)
+    if pointer is None:
+        return None
+    return (
+        pointer,
+        find_signature([get_snapshot_path(datastore_path)]),
+        find_signature([get_journal_path(datastore_path, pointer[0])]),
+    )
+
+
+def find_signature(file_paths: List[str]) -> Optional[Tuple]:
+    """
+    Find the identity of some files on disk to detect changes
+    Args:
+        file_paths (list): exact file paths
+    Returns:
+        signature (tuple): inode, size and modification time of each file
+            or None if any of them does not exist
+    """
+    signature = []
+    for file_path in file_paths:
+        try:
+            file_stats = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        signature.append((file_stats.st_ino, file_stats.st_size, file_stats.st_mtime_ns))
+    return tuple(signature)
+
+
+def empty(dimensions: int = 0) -> Datastore:
+    """
+    Create a datastore without any item
+    Args:
+        dimensions (int): embedding dimensions
+    Returns:
+        datastore (Datastore)
+    """
+    metadata = {
+        "identity": np.array([], dtype=str),
+        "hash": np.array([], dtype=str),
+    }
+    for column in COORDINATE_COLUMNS:
+        metadata[column] = np.array([], dtype=np.int64)
+    return Datastore(
+        embeddings=np.zeros((0, dimensions), dtype=np.float32),
+        norms=np.zeros((0,), dtype=np.float32),
+        metadata=metadata,
+        valid=np.array([], dtype=bool),
+    )
+
+
+def from_representations(representations: List[Dict[str, Any]]) -> Datastore:
+    """
+    Convert the legacy list of representation dicts into a columnar datastore
+    Args:
+        representations (list): list of dict with identity, hash, embedding
+            and target_x, target_y, target_w, target_h keys
+    Returns:
+        datastore (Datastore)
+    """
+    if len(representations) == 0:
+        return empty()
+
+    valid = np.array([item.get("embedding") is not None for item in representations])
+
+    dimensions = 0
+    for item in representations:
+        if item.get("embedding") is not None:
+            dimensions = len(item["embedding"])
+            break
+
+    embeddings = np.zeros((len(representations), dimensions), dtype=np.float32)
+    for i, item in enumerate(representations):
+        if valid[i]:
+            embeddings[i] = item["embedding"]
+
+    metadata = {
+        "identity": np.array([str(item["identity"]) for item in representations], dtype=str),
+        "hash": np.array([str(item["hash"]) for item in representations], dtype=str),
+    }
+    for column in COORDINATE_COLUMNS:
+        metadata[column] = np.array([item[column] for item in representations], dtype=np.int64)
+
+    embeddings, norms = normalize(embeddings)
+    return Datastore(embeddings=embeddings, norms=norms, metadata=metadata, valid=valid)
+
+
+def concat(alpha: Datastore, beta: Datastore) -> Datastore:
+    """
+    Append the items of the second datastore to the first one
+    Args:
+        alpha (Datastore): base datastore
+        beta (Datastore): items to append
+    Returns:
+        datastore (Datastore)
+    """
+    if len(beta) == 0:
+        return alpha
+    if len(alpha) == 0:
+        return Datastore(
+            embeddings=beta.embeddings,
+            norms=beta.norms,
+            metadata=beta.metadata,
+            valid=beta.valid,
+            sequence=alpha.sequence,
+        )
+
+    alpha_embeddings, beta_embeddings = alpha.embeddings, beta.embeddings
+
+    # a datastore whose images had no face at all does not know its dimensions yet
+    if alpha.dimensions == 0:
+        alpha_embeddings = np.zeros((len(alpha), beta.dimensions), dtype=np.float32)
+    elif beta.dimensions == 0:
+        beta_embeddings = np.zeros((len(beta), alpha.dimensions), dtype=np.float32)
+
+    if alpha_embeddings.shape[1] != beta_embeddings.shape[1]:
+        raise ValueError(
+            "Source and target embeddings must have same dimensions but "
+            f"{alpha_embeddings.shape[1]}:{beta_embeddings.shape[1]}. "
+            "Model structure may change after datastore created."
+        )
+
+    return Datastore(
+        embeddings=np.concatenate([alpha_embeddings, beta_embeddings]).astype(
+            np.float32, copy=False
+        ),
+        norms=np.concatenate([alpha.norms, beta.norms]).astype(np.float32, copy=False),
+        metadata={
+            key: np.concatenate([alpha.metadata[key], beta.metadata[key]])
+            for key in METADATA_COLUMNS
+        },
+        valid=np.concatenate([alpha.valid, beta.valid]),
+        sequence=alpha.sequence,
+    )
+
+
+def subset(datastore: Datastore, mask: np.ndarray) -> Datastore:
+    """
+    Filter the items of a datastore
+    Args:
+        datastore (Datastore): datastore to filter
+        mask (np.ndarray): boolean array of shape (N,) or integer indices
+    Returns:
+        datastore (Datastore)
+    """
+    return Datastore(
+        embeddings=np.asarray(datastore.embeddings[mask], dtype=np.float32),
+        norms=datastore.norms[mask],
+        metadata={key: value[mask] for key, value in datastore.metadata.items()},
+        valid=datastore.valid[mask],
+        sequence=datastore.sequence,
+    )
+
+
+def normalize(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    L2 normalize embeddings in chunks, without a float64 copy of them
+    Args:
+        embeddings (np.ndarray): matrix of shape (N, D)
+    Returns:
+        normalized embeddings (np.ndarray): float32 matrix of shape (N, D).
+            Zero vectors stay zero.
+        norms (np.ndarray): float32 array of shape (N,) with the norm of each embedding
+    """
+    normalized = np.empty(embeddings.shape, dtype=np.float32)
+    norms = np.empty(embeddings.shape[0], dtype=np.float32)
+    for start in range(0, embeddings.shape[0], NORMS_CHUNK_SIZE):
+        end = start + NORMS_CHUNK_SIZE
+        chunk = np.asarray(embeddings[start:end], dtype=np.float32)
+        chunk_norms = np.sqrt(np.einsum("ij,ij->i", chunk, chunk))
+        norms[start:end] = chunk_norms
+        normalized[start:end] = chunk / np.where(chunk_norms > 0, chunk_norms, 1)[:, None]
+    return normalized, norms
+
+
+def load(datastore_path: str, mmap: bool = True) -> Datastore:
+    """
+    Load a columnar datastore from disk. Changes recorded in the journal
+        after the last snapshot are applied on top of it. Loading never writes, an
+        incomplete record at the end of the journal, e.g. one being appended by another
+        process, is ignored.
+    Args:
+        datastore_path (str): datastore path without extension
+        mmap (bool): open the embedding matrix of the snapshot as a read-only
+            memory map (default is True)
+    Returns:
+        datastore (Datastore)
+    """
+    while True:
+        pointer = __read_pointer(datastore_path)
+        if pointer is None:
+            raise FileNotFoundError(f"{get_snapshot_path(datastore_path)} does not exist")
+
+        try:
+            datastore, _ = __load_version(datastore_path, *pointer, mmap=mmap)
+        except FileNotFoundError:
+            if __read_pointer(datastore_path) == pointer:
+                raise
+            # a writer published a new snapshot and removed this one meanwhile
+            continue
+
+        # journal of an outdated snapshot may be removed before it was read completely
+        if __read_pointer(datastore_path) == pointer:
+            return datastore
+
+
+def save(datastore: Datastore, datastore_path: str) -> None:
+    """
+    Store a columnar datastore on disk as a new snapshot with an empty journal. Files are
+        written under a new version and published by replacing the snapshot pointer, so
+        readers see either the previous snapshot or this one as a whole.
+    Args:
+        datastore (Datastore): datastore to store
+        datastore_path (str): datastore path without extension
+    """
+    tmp_paths = __write_snapshot(datastore, datastore_path)
+    try:
+        with __lock_writers(datastore_path):
+            pointer = __read_pointer(datastore_path)
+            version = 1 if pointer is None else pointer[0] + 1
+            __publish_snapshot(datastore_path, tmp_paths, version, datastore.sequence, b"")
+    finally:
+        __remove_files(tmp_paths)
+
+
+def append_journal(
+    datastore_path: str,
+    sequence: int,
+    removed_identities: Iterable[str],
+    added: Datastore,
+) -> Tuple[int, bool]:
+    """
+    Record changes of a datastore in its append-only journal instead of rewriting the
+        snapshot. Sequence numbers of the records follow the last one on disk, so records
+        of concurrent writers, also in other processes, are all kept. The journal is
+        compacted into the snapshot in the background once it grows large.
+    Args:
+        datastore_path (str): datastore path without extension
+        sequence (int): sequence number of the last change applied to the caller's datastore
+        removed_identities (iterable): identities whose items are dropped
+        added (Datastore): items appended after removal
+    Returns:
+        sequence (int): sequence number of the last appended record
+        in_sync (bool): False if other writers recorded changes after the given sequence,
+            so the caller's datastore misses them and should be loaded again
+    """
+    removed_identities = sorted(removed_identities)
+
+    with __lock_writers(datastore_path):
+        pointer = __read_pointer(datastore_path)
+        if pointer is None:
+            raise FileNotFoundError(f"{get_snapshot_path(datastore_path)} does not exist")
+
+        version, last_sequence = pointer
+        journal_path = get_journal_path(datastore_path, version)
+        if os.path.exists(journal_path):
+            with open(journal_path, "rb") as f:
+                journal_sequence, journal_size = __scan_journal(f)
+            if journal_sequence is not None:
+                last_sequence = journal_sequence
+            if journal_size < os.path.getsize(journal_path):
+                # writers hold the lock, so this is the remainder of a crashed append
+                logger.warn(f"Dropping incomplete record at the end of {journal_path}")
+                os.truncate(journal_path, journal_size)
+
+        in_sync = last_sequence == sequence
+        sequence = last_sequence
+        buffer = io.BytesIO()
+
+        if len(removed_identities) > 0:
+            sequence += 1
+            np.save(buffer, np.array([sequence, REMOVE_RECORD], dtype=np.int64))
+            np.save(buffer, np.array(removed_identities, dtype=str))
+
+        if len(added) > 0:
+            sequence += 1
+            np.save(buffer, np.array([sequence, ADD_RECORD], dtype=np.int64))
+            np.save(buffer, added.valid)
+            np.save(buffer, np.ascontiguousarray(added.embeddings, dtype=np.float32))
+            np.save(buffer, np.ascontiguousarray(added.norms, dtype=np.float32))
+            for column in METADATA_COLUMNS:
+                np.save(buffer, added.metadata[column])
+
+        with open(journal_path, "ab") as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+
+        journal_size = os.path.getsize(journal_path)
+        snapshot_size = os.path.getsize(get_embeddings_path(datastore_path, version))
+
+    if journal_size > max(COMPACTION_MIN_BYTES, COMPACTION_RATIO * snapshot_size):
+        __schedule_compaction(datastore_path)
+
+    return sequence, in_sync
+
+
+def compact(datastore_path: str) -> None:
+    """
+    Merge the journal into a new snapshot of the datastore. The merged snapshot is written
+        without blocking other writers. Records appended meanwhile move into the journal of
+        the new snapshot when it is published, and an incomplete record left at the end of
+        the journal by a crashed writer is dropped.
+    Args:
+        datastore_path (str): datastore path without extension
+    """
+    pointer = __read_pointer(datastore_path)
+    if pointer is None:
+        return
+
+    version, _ = pointer
+    journal_path = get_journal_path(datastore_path, version)
+    try:
+        if os.path.getsize(journal_path) == 0:
+            return
+        datastore, merged_size = __load_version(datastore_path, *pointer, mmap=True)
+    except FileNotFoundError:
+        # nothing to compact, or another writer published a new snapshot meanwhile
+        return
+
+    tmp_paths = __write_snapshot(datastore, datastore_path)
+    try:
+        with __lock_writers(datastore_path):
+            if __read_pointer(datastore_path) != pointer:
+                # another writer published a new snapshot meanwhile, ours is outdated
+                return
+
+            with open(journal_path, "rb") as f:
+                f.seek(merged_size)
+                _, tail_size = __scan_journal(f)
+                f.seek(merged_size)
+                tail = f.read(tail_size - merged_size)
+
+            __publish_snapshot(datastore_path, tmp_paths, version + 1, datastore.sequence, tail)
+    finally:
+        __remove_files(tmp_paths)
+
+    logger.debug(f"Journal of {datastore_path} compacted into {len(datastore)} items")
+
+
+def __schedule_compaction(datastore_path: str) -> None:
+    """
+    Compact the journal of a datastore in a background thread unless it is in progress
+    """
+    with _compacting_lock:
+        if datastore_path in _compacting:
+            return
+        _compacting.add(datastore_path)
+
+    def compact_in_background():
+        try:
+            compact(datastore_path)
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f"Exception while compacting journal of {datastore_path}: {str(err)}")
+        finally:
+            with _compacting_lock:
+                _compacting.discard(datastore_path)
+
+    threading.Thread(target=compact_in_background, daemon=True).start()
+
+
+@contextmanager
+def __lock_writers(datastore_path: str) -> Generator[None, None, None]:
+    """
+    Hold the writer lock of a datastore, exclusive amongst threads and processes
+    """
+    with _writer_lock, open(get_lock_path(datastore_path), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt  # pylint: disable=import-outside-toplevel, import-error
+
+            while True:
+                try:
+                    # blocks for 10 seconds at most
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl  # pylint: disable=import-outside-toplevel
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def __read_pointer(datastore_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Read the snapshot pointer of a datastore
+    Returns:
+        version (int): version of the published snapshot files
+        sequence (int): sequence number of the last change merged into that snapshot
+        or None if nothing is published
+    """
+    try:
+        with open(get_snapshot_path(datastore_path), "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return None
+    return int(content["version"]), int(content["sequence"])
+
+
+def __publish_snapshot(
+    datastore_path: str, tmp_paths: Tuple[str, str], version: int, sequence: int, journal: bytes
+) -> None:
+    """
+    Move written snapshot files under their version, and point readers to them with a single
+        replace of the snapshot pointer. Files of previous versions are removed afterwards.
+        Caller must hold the writer lock.
+    Args:
+        datastore_path (str): datastore path without extension
+        tmp_paths (tuple): written embeddings and metadata files
+        version (int): version of the new snapshot
+        sequence (int): sequence number of the last change merged into the new snapshot
+        journal (bytes): records to start the journal of the new snapshot with
+    """
+    os.replace(tmp_paths[0], get_embeddings_path(datastore_path, version))
+    os.replace(tmp_paths[1], get_metadata_path(datastore_path, version))
+
+    journal_path = get_journal_path(datastore_path, version)
+    if len(journal) > 0:
+        with open(journal_path, "wb") as f:
+            f.write(journal)
+            f.flush()
+            os.fsync(f.fileno())
+    elif os.path.exists(journal_path):
+        # left behind by a writer crashed before publishing this version
+        os.remove(journal_path)
+
+    snapshot_path = get_snapshot_path(datastore_path)
+    with open(snapshot_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "sequence": sequence}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(snapshot_path + ".tmp", snapshot_path)
+
+    directory, base_name = os.path.split(datastore_path)
+    for file_name in os.listdir(directory or "."):
+        match = VERSIONED_FILES.search(file_name)
+        if (
+            match is not None
+            and file_name[: match.start()] == base_name
+            and int(match.group(2)) != version
+        ):
+            __remove_files([os.path.join(directory, file_name)])
+
+
+def __remove_files(file_paths: Iterable[str]) -> None:
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            # e.g. memory mapped by a reader on windows, it is removed with the next version
+            logger.debug(f"Cannot remove {file_path} yet: {str(err)}")
+
+
+def __load_version(
+    datastore_path: str, version: int, sequence: int, mmap: bool = True
+) -> Tuple[Datastore, int]:
+    """
+    Load a snapshot of a datastore and apply the complete records of its journal
+    Returns:
+        datastore (Datastore)
+        journal_size (int): bytes of the journal applied
+    """
+    datastore = __load_snapshot(datastore_path, version, sequence, mmap=mmap)
+    records, journal_size = __read_journal(get_journal_path(datastore_path, version))
+    return __apply_journal(datastore, records), journal_size
+
+
+def __load_snapshot(
+    datastore_path: str, version: int, sequence: int, mmap: bool = True
+) -> Datastore:
+    """
+    Load the snapshot files of a datastore without applying its journal
+    """
+    embeddings_path = get_embeddings_path(datastore_path, version)
+    metadata_path = get_metadata_path(datastore_path, version)
+
+    npz = __load_npz(metadata_path, mmap=mmap)
+
+    missing_keys = set(METADATA_COLUMNS + ["valid", "norms"]) - set(npz.keys())
+    if len(missing_keys) > 0:
+        raise ValueError(
+            f"{metadata_path} does not have some required columns - {missing_keys}."
+            f"Consider to delete {metadata_path} and {embeddings_path}"
+        )
+
+    metadata = {key: npz[key] for key in METADATA_COLUMNS}
+    valid = npz["valid"]
+    norms = npz["norms"]
+
+    # memory mapping an empty file is not supported
+    mmap_mode = "r" if mmap and os.path.getsize(embeddings_path) > 0 else None
+    embeddings = np.load(embeddings_path, mmap_mode=mmap_mode, allow_pickle=False)
+    if embeddings.size == 0 and mmap_mode is not None:
+        embeddings = np.asarray(embeddings)
+
+    if embeddings.ndim != 2 or embeddings.shape[0] != valid.shape[0]:
+        raise ValueError(
+            f"{embeddings_path} has shape {embeddings.shape} but {metadata_path} "
+            f"has {valid.shape[0]} items. "
+            f"Consider to delete {metadata_path} and {embeddings_path}"
+        )
+
+    return Datastore(
+        embeddings=embeddings, norms=norms, metadata=metadata, valid=valid, sequence=sequence
+    )
+
+
+def __load_npz(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Load the arrays of an npz archive. Members stored uncompressed, as np.savez does,
+        are opened as read-only memory maps if requested, so that they are paged in on access.
+    Args:
+        path (str): npz file path
+        mmap (bool): memory map the members
+    Returns:
+        arrays (dict): member name to array
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            key = info.filename[: -len(".npy")]
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                # data of a member starts after its local file header
+                f.seek(info.header_offset)
+                header = f.read(30)
+                name_length, extra_length = struct.unpack("<HH", header[26:30])
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                # memory mapping empty arrays and scalars is not supported
+                if len(shape) > 0 and np.prod(shape) > 0 and not dtype.hasobject:
+                    arrays[key] = np.memmap(
+                        path,
+                        dtype=dtype,
+                        mode="r",
+                        shape=shape,
+                        order="F" if fortran_order else "C",
+                        offset=f.tell(),
+                    )
+                    continue
+            with archive.open(info) as member:
+                arrays[key] = np.lib.format.read_array(member, allow_pickle=False)
+    return arrays
+
+
+def __write_snapshot(datastore: Datastore, datastore_path: str) -> Tuple[str, str]:
+    """
+    Write the snapshot files of a datastore to temporary locations of this writer
+    Returns:
+        tmp_paths (tuple): written embeddings and metadata files
+    """
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    embeddings_path = datastore_path + EMBEDDINGS_SUFFIX.format(version="next") + suffix
+    metadata_path = datastore_path + METADATA_SUFFIX.format(version="next") + suffix
+
+    with open(embeddings_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(datastore.embeddings, dtype=np.float32))
+        f.flush()
+        os.fsync(f.fileno())
+
+    with open(metadata_path, "wb") as f:
+        np.savez(
+            f,
+            valid=datastore.valid,
+            norms=np.asarray(datastore.norms, dtype=np.float32),
+            **datastore.metadata,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+
+    return embeddings_path, metadata_path
+
+
+def __read_journal(
+    journal_path: str,
+) -> Tuple[List[Tuple[int, Optional[np.ndarray], Optional[Datastore]]], int]:
+    """
+    Read the complete records of a journal. An incomplete record at the end, e.g. one being
+        appended or left by a crashed writer, is ignored and the journal is not modified.
+    Args:
+        journal_path (str): exact path of the journal
+    Returns:
+        records (list): sequence number, removed identities and added items of each record
+        journal_size (int): bytes of the journal occupied by the complete records
+    """
+    records: List[Tuple[int, Optional[np.ndarray], Optional[Datastore]]] = []
+    if not os.path.exists(journal_path):
+        return records, 0
+
+    with open(journal_path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        journal_size = 0
+        while journal_size < end:
+            try:
+                sequence, kind = np.load(f, allow_pickle=False).tolist()
+                if kind == REMOVE_RECORD:
+                    records.append((sequence, np.load(f, allow_pickle=False), None))
+                else:
+                    valid = np.load(f, allow_pickle=False)
+                    embeddings = np.load(f, allow_pickle=False)
+                    norms = np.load(f, allow_pickle=False)
+                    metadata = {
+                        column: np.load(f, allow_pickle=False) for column in METADATA_COLUMNS
+                    }
+                    added = Datastore(
+                        embeddings=embeddings, norms=norms, metadata=metadata, valid=valid
+                    )
+                    records.append((sequence, None, added))
+            except (ValueError, EOFError) as err:
+                logger.debug(f"Ignoring incomplete record at the end of {journal_path}: {str(err)}")
+                break
+            journal_size = f.tell()
+
+    return records, journal_size
+
+
+def __scan_journal(f: io.BufferedReader) -> Tuple[Optional[int], int]:
+    """
+    Find the last complete record of a journal from the current position, reading the
+        headers of its arrays only
+    Args:
+        f (file): journal opened in binary mode
+    Returns:
+        sequence (int): sequence number of the last complete record or None if there is none
+        journal_size (int): position right after the last complete record
+    """
+    end = os.fstat(f.fileno()).st_size
+    sequence, journal_size = None, f.tell()
+    while journal_size < end:
+        try:
+            record_sequence, kind = np.load(f, allow_pickle=False).tolist()
+            for _ in range(RECORD_ARRAYS[kind]):
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+                f.seek(int(np.prod(shape)) * dtype.itemsize, os.SEEK_CUR)
+            if f.tell() > end:
+                break
+        except (ValueError, EOFError, KeyError):
+            break
+        sequence, journal_size = record_sequence, f.tell()
+    return sequence, journal_size
+
+
+def __apply_journal(
+    datastore: Datastore, records: List[Tuple[int, Optional[np.ndarray], Optional[Datastore]]]
+) -> Datastore:
+    """
+    Apply journal records in the order they were appended
+    """
+    for sequence, removed_identities, added in records:
+        if removed_identities is not None:
+            datastore = subset(datastore, ~np.isin(datastore.identities, removed_identities))
+        if added is not None:
+            datastore = concat(datastore, added)
+        datastore.sequence = sequence
+    return datastore
+
+
+def load_manifest(datastore_path: str, datastore: Datastore) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the directory manifest stored for a datastore
+    Args:
+        datastore_path (str): datastore path without extension
+        datastore (Datastore): current datastore
+    Returns:
+        manifest (dict): directory path to its properties. Empty if the manifest is missing,
+            unreadable or was stored for a different state of the datastore.
+    """
+    try:
+        with open(get_manifest_path(datastore_path), "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if content.get("items") != len(datastore) or content.get("sequence") != datastore.sequence:
+        # datastore changed without the manifest, e.g. it was refreshed file by file
+        return {}
+
+    return content.get("directories", {})
+
+
+def save_manifest(
+    datastore_path: str, datastore: Datastore, manifest: Dict[str, Dict[str, Any]]
+) -> None:
+    """
+    Store the directory manifest for the current state of a datastore
+    Args:
+        datastore_path (str): datastore path without extension
+        datastore (Datastore): current datastore
+        manifest (dict): directory path to its properties
+    """
+    manifest_path = get_manifest_path(datastore_path)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {"items": len(datastore), "sequence": datastore.sequence, "directories": manifest}, f
+        )
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def migrate_pickle(datastore_path: str, silent: bool = False) -> Optional[Datastore]:
+    """
+    Convert a legacy pickle datastore into the columnar format if it exists
+    Args:
+        datastore_path (str): datastore path without extension
+        silent (bool): enable or disable informative logging
+    Returns:
+        datastore (Datastore): migrated datastore or None if there is no pickle
+    """
+    pickle_path = get_pickle_path(datastore_path)
+    if not os.path.exists(pickle_path):
+        return None
+
+    with open(pickle_path, "rb") as f:
+        representations = pickle.load(f)
+
+    # required columns for representations
+    df_cols = set(METADATA_COLUMNS) | {"embedding"}
+
+    # check each item of representations list has required keys
+    for i, current_representation in enumerate(representations):
+        missing_keys = df_cols - set(current_representation.keys())
+        if len(missing_keys) > 0:
+            raise ValueError(
+                f"{i}-th item does not have some required keys - {missing_keys}."
+                f"Consider to delete {pickle_path}"
+            )
+
+    datastore = from_representations(representations)
+    save(datastore, datastore_path)
+
+    if not silent:
+        logger.info(
+            f"{pickle_path} migrated to {get_snapshot_path(datastore_path)}. "
+            "You may delete the pickle file."
+        )
+
+    return datastore
@@ -1,9 +1,12 @@
 # built-in dependencies
 import os
 import io
-from typing import Generator, IO, List, Union, Tuple
+from typing import Any, Dict, Generator, IO, List, Optional, Set, Union, Tuple
 import hashlib
 import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
 
 # 3rd party dependencies
@@ -17,6 +20,14 @@ from werkzeug.datastructures import FileStorage
 IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
 PIL_EXTS = {"jpeg", "png"}
 
+# number of scanned paths whose format check results are kept, least recently scanned first
+FORMAT_CACHE_PATHS = 16
+
+# format check results of the files found in the last scan of a path, keyed on file path
+# and valid while (inode, size, mtime) is unchanged
+_format_cache: "OrderedDict[str, Dict[str, Tuple[Tuple[int, int, int], bool]]]" = OrderedDict()
+_format_cache_lock = threading.Lock()
+
 
 def list_images(path: str) -> List[str]:
     """
@@ -54,16 +65,277 @@ def yield_images(path: str) -> Generator[str, None, None]:
                         yield exact_path
 
 
-def find_image_hash(file_path: str) -> str:
+def scan_images(path: str, workers: Optional[int] = None) -> Dict[str, os.stat_result]:
+    """
+    Find images in a given path with their file properties. Directories are scanned
+        concurrently and a file is opened to confirm its format only if it was not checked
+        in the previous scan of the path with the same inode, size and modification time.
+        Directories and files removed while scanning are skipped.
+    Args:
+        path (str): path's location
+        workers (int): number of threads (default is ThreadPoolExecutor's default)
+    Returns:
+        images (dict): exact image path to its stat result
+    """
+    candidates: Dict[str, os.stat_result] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        directories = [path]
+        while len(directories) > 0:
+            sub_directories = []
+            for directory_dirs, directory_files in executor.map(
+                __scan_directory, directories
+            ):
+                sub_directories.extend(directory_dirs)
+                candidates.update(directory_files)
+            directories = sub_directories
+
+        return __filter_images(executor, path, candidates)
+
+
+def scan_changed_images(
+    path: str, manifest: Dict[str, Dict[str, Any]], workers: Optional[int] = None
+) -> Tuple[Dict[str, os.stat_result], Set[str], Dict[str, Dict[str, Any]]]:
+    """
+    Find images in directories changed since a previous scan. A directory whose modification
+        time is the same as in the manifest is not listed, its sub directories are taken from
+        the manifest instead. A directory whose image file names are the same as before is
+        considered unchanged although its modification time changed. Images overwritten in
+        place, without changing their directory's entries, are not detected.
+    Args:
+        path (str): path's location
+        manifest (dict): directory path to its properties found in the previous scan
+        workers (int): number of threads (default is ThreadPoolExecutor's default)
+    Returns:
+        images (dict): exact image path to its stat result for images in changed directories
+        changed directories (set): directories added, removed or changed since previous scan
+        manifest (dict): directory path to its modification time, digest of image file names,
+            number of image files and sub directories
+    """
+    new_manifest: Dict[str, Dict[str, Any]] = {}
+    changed_directories: Set[str] = set()
+    candidates: Dict[str, os.stat_result] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        directories = [path]
+        while len(directories) > 0:
+            sub_directories = []
+            for directory, (properties, directory_files) in zip(
+                directories,
+                executor.map(
+                    __scan_directory_if_changed,
+                    directories,
+                    [manifest.get(directory) for directory in directories],
+                ),
+            ):
+                if properties is None:
+                    continue  # removed while scanning
+                new_manifest[directory] = properties
+                sub_directories.extend(properties["directories"])
+                if directory_files is not None:
+                    changed_directories.add(directory)
+                    candidates.update(directory_files)
+            directories = sub_directories
+
+        changed_directories.update(set(manifest.keys()) - set(new_manifest.keys()))
+        images = __filter_images(executor, path, candidates, changed_directories)
+
+    return images, changed_directories, new_manifest
+
+
+def __filter_images(
+    executor: Executor,
+    path: str,
+    candidates: Dict[str, os.stat_result],
+    scanned_directories: Optional[Set[str]] = None,
+) -> Dict[str, os.stat_result]:
+    """
+    Keep the files whose content is an image in supported formats. Format check results are
+        kept for the files found in the last scan of a path, so that only new or modified
+        files are opened in the next scan of the same path.
+    Args:
+        executor (Executor): executor opening files concurrently
+        path (str): scanned path
+        candidates (dict): file paths having image extensions with their stat results
+        scanned_directories (set): directories whose files are all amongst the candidates,
+            results of files in other directories are kept. All directories if not given.
+    Returns:
+        images (dict): exact image path to its stat result
+    """
+    key = os.path.abspath(path)
+    with _format_cache_lock:
+        previous = _format_cache.get(key, {})
+
+    formats = {}
+    if scanned_directories is not None:
+        scanned_directories = {os.path.normpath(directory) for directory in scanned_directories}
+        formats = {
+            exact_path: result
+            for exact_path, result in previous.items()
+            if os.path.normpath(os.path.dirname(exact_path)) not in scanned_directories
+        }
+
+    exact_paths = list(candidates.keys())
+    results = executor.map(
+        __is_image,
+        exact_paths,
+        [candidates[exact_path] for exact_path in exact_paths],
+        [previous.get(exact_path) for exact_path in exact_paths],
+    )
+
+    images = {}
+    for exact_path, result in zip(exact_paths, results):
+        if result is None:
+            continue  # removed while scanning
+        formats[exact_path] = result
+        if result[1]:
+            images[exact_path] = candidates[exact_path]
+
+    with _format_cache_lock:
+        _format_cache[key] = formats
+        _format_cache.move_to_end(key)
+        while len(_format_cache) > FORMAT_CACHE_PATHS:
+            _format_cache.popitem(last=False)
+    return images
+
+
+def __list_directory(directory: str) -> Optional[Tuple[List[str], List[os.DirEntry]]]:
+    """
+    List sub directories and files having image extensions in a directory
+    Args:
+        directory (str): directory to list
+    Returns:
+        sub directories (list) and entries of files (list), None if the directory does not
+            exist anymore
+    """
+    sub_directories = []
+    files = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    # symbolic links to directories are not followed, similar to os.walk
+                    if not entry.is_symlink():
+                        sub_directories.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTS and entry.is_file():
+                    files.append(entry)
+    except (FileNotFoundError, NotADirectoryError):
+        # removed while scanning
+        return None
+    return sub_directories, files
+
+
+def __stat_files(files: List[os.DirEntry]) -> Dict[str, os.stat_result]:
+    """
+    Find the stat results of listed files, skipping the ones removed since listing
+    """
+    file_stats = {}
+    for entry in files:
+        try:
+            file_stats[entry.path] = entry.stat()
+        except FileNotFoundError:
+            continue
+    return file_stats
+
+
+def __scan_directory(directory: str) -> Tuple[List[str], Dict[str, os.stat_result]]:
+    """
+    List sub directories and files having image extensions in a directory
+    Args:
+        directory (str): directory to scan
+    Returns:
+        sub directories (list) and file paths with their stat results (dict), both empty
+            if the directory was removed while scanning
+    """
+    listing = __list_directory(directory)
+    if listing is None:
+        return [], {}
+    sub_directories, files = listing
+    return sub_directories, __stat_files(files)
+
+
+def __scan_directory_if_changed(
+    directory: str, previous: Optional[Dict[str, Any]]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, os.stat_result]]]:
+    """
+    Scan a directory if its entries changed since the previous scan
+    Args:
+        directory (str): directory to scan
+        previous (dict): properties of the directory in the previous scan
+    Returns:
+        properties (dict): current properties of the directory or None if it does not exist
+        files (dict): file paths with their stat results if the directory changed, otherwise None
+    """
+    try:
+        # stat before listing, so that changes while listing are caught in the next scan
+        directory_stats = os.stat(directory)
+    except FileNotFoundError:
+        return None, None
+
+    if previous is not None and previous["mtime_ns"] == directory_stats.st_mtime_ns:
+        return previous, None
+
+    listing = __list_directory(directory)
+    if listing is None:
+        return None, None
+    sub_directories, files = listing
+    digest = hashlib.sha1(
+        "\n".join(sorted(entry.name for entry in files)).encode("utf-8")
+    ).hexdigest()
+    properties = {
+        "mtime_ns": directory_stats.st_mtime_ns,
+        "digest": digest,
+        "images": len(files),
+        "directories": sub_directories,
+    }
+
+    if previous is not None and previous["digest"] == digest:
+        return properties, None
+
+    return properties, __stat_files(files)
+
+
+def __is_image(
+    exact_path: str,
+    file_stats: os.stat_result,
+    previous: Optional[Tuple[Tuple[int, int, int], bool]] = None,
+) -> Optional[Tuple[Tuple[int, int, int], bool]]:
+    """
+    Check a file's content is an image in supported formats. The previous result is reused
+        if the file's inode, size and modification time are unchanged.
+    Args:
+        exact_path (str): exact file path
+        file_stats (os.stat_result): file properties
+        previous (tuple): file properties and result of the previous check
+    Returns:
+        result (tuple): file properties and whether the file is an image,
+            None if the file was removed
+    """
+    key = (file_stats.st_ino, file_stats.st_size, file_stats.st_mtime_ns)
+    if previous is not None and previous[0] == key:
+        return previous
+
+    try:
+        with Image.open(exact_path) as img:  # lazy
+            is_image = img.format.lower() in PIL_EXTS
+    except FileNotFoundError:
+        return None
+    return key, is_image
+
+
+def find_image_hash(file_path: str, file_stats: Optional[os.stat_result] = None) -> str:
     """
     Find the hash of given image file with its properties
         finding the hash of image content is costly operation
     Args:
         file_path (str): exact image path
+        file_stats (os.stat_result): already known properties of the file, e.g. from
+            scan_images. Default is None to find them.
     Returns:
         hash (str): digest with sha1 algorithm
     """
-    file_stats = os.stat(file_path)
+    if file_stats is None:
+        file_stats = os.stat(file_path)
 
     # some properties
     file_size = file_stats.st_size
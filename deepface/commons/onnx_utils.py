@@ -0,0 +1,179 @@
+# built-in dependencies
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons import folder_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# opset supported by onnxruntime releases of the last years
+OPSET = 13
+
+# serializes exports, so that concurrent builds do not convert the same model twice
+_export_lock = threading.Lock()
+
+
+class OnnxOutput:  # pylint: disable=too-few-public-methods
+    """
+    Outputs of an onnx model, exposing numpy like outputs of a keras model call
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def numpy(self) -> np.ndarray:
+        return self.values
+
+
+class OnnxModel:  # pylint: disable=too-few-public-methods
+    """
+    Keras model exported to onnx and run with onnx runtime on cpu. Calling it mirrors calling
+        a keras model, so that clients feed it as they feed their keras model.
+    """
+
+    def __init__(self, model_path: str):
+        ort = _import_onnxruntime()
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0]
+        self.output_names = [self.session.get_outputs()[0].name]
+
+    def __call__(self, inputs: Any, training: bool = False) -> OnnxOutput:
+        """
+        Run the forward pass
+        Args:
+            inputs (np.ndarray): batch of inputs
+            training (bool): kept for parity with keras models, onnx models run in
+                inference mode only
+        Returns:
+            outputs (OnnxOutput): outputs of the batch, see its numpy method
+        """
+        inputs = np.asarray(inputs, dtype=np.float32)
+
+        # keras accepts inputs missing trailing unit dimensions, e.g. gray scale channels
+        rank = len(self.input.shape)
+        if inputs.ndim < rank:
+            inputs = inputs.reshape(inputs.shape + (1,) * (rank - inputs.ndim))
+
+        outputs = self.session.run(self.output_names, {self.input.name: inputs})[0]
+        return OnnxOutput(outputs)
+
+
+def get_model_path(task: str, model_name: str) -> str:
+    """
+    Find where the onnx export of a model is stored
+    Args:
+        task (str): facial_recognition or facial_attribute
+        model_name (str): model identifier, e.g. VGG-Face or Age
+    Returns:
+        model_path (str): path under the weights folder of the deepface home
+    """
+    file_name = f"{task}_{model_name}.onnx".lower().replace("-", "_")
+    return os.path.normpath(
+        os.path.join(folder_utils.get_deepface_home(), ".deepface/weights", file_name)
+    )
+
+
+def get_attributes_path(model_path: str) -> str:
+    """
+    Find where the attributes of the client owning an onnx model are stored
+    Args:
+        model_path (str): path of the onnx model
+    Returns:
+        attributes_path (str): json file next to the onnx model
+    """
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def load_attributes(model_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the attributes of the client owning an onnx model, e.g. its model_name, input_shape
+        and output_shape, so that the client is restored without building its keras model
+    Args:
+        model_path (str): path of the onnx model
+    Returns:
+        attributes (dict): attribute name to value or None if the model is not exported yet
+    """
+    if not os.path.isfile(model_path):
+        return None
+    try:
+        with open(get_attributes_path(model_path), "r", encoding="utf-8") as f:
+            attributes = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # json stores tuples, e.g. input shapes, as lists
+    return {
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in attributes.items()
+    }
+
+
+def export(model: Any, model_path: str, attributes: Dict[str, Any]) -> str:
+    """
+    Export a keras model to onnx if it is not exported yet
+    Args:
+        model (keras.Model): built keras model
+        model_path (str): target path of the onnx model
+        attributes (dict): attributes of the client owning the model except the model itself,
+            stored next to the onnx model
+    Returns:
+        model_path (str): path of the onnx model
+    """
+    with _export_lock:
+        if load_attributes(model_path) is not None:
+            logger.debug(f"{model_path} is already available")
+            return model_path
+
+        import tensorflow as tf  # pylint: disable=import-outside-toplevel
+
+        tf2onnx = _import_tf2onnx()
+
+        logger.info(f"🔄 {model.name} will be exported to {model_path}...")
+        spec = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input"),)
+
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        try:
+            tf2onnx.convert.from_keras(
+                model, input_signature=spec, opset=OPSET, output_path=tmp_path
+            )
+            # attributes are in place before the model, which marks the export as complete
+            attributes_path = get_attributes_path(model_path)
+            with open(attributes_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(attributes, f)
+            os.replace(attributes_path + ".tmp", attributes_path)
+            os.replace(tmp_path, model_path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    return model_path
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ModuleNotFoundError as e:
+        raise ImportError(
+            "onnxruntime is an optional dependency for the onnx backend, ensure the library"
+            " is installed. Please install using 'pip install onnxruntime'"
+        ) from e
+    return onnxruntime
+
+
+def _import_tf2onnx():
+    try:
+        import tf2onnx
+    except ModuleNotFoundError as e:
+        raise ImportError(
+            "tf2onnx is an optional dependency to export models for the onnx backend, ensure"
+            " the library is installed. Please install using 'pip install tf2onnx'"
+        ) from e
+    return tf2onnx
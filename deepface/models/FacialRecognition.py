@@ -2,6 +2,7 @@ from abc import ABC
 from typing import Any, Union, List, Tuple
 import numpy as np
 from deepface.commons import package_utils
+from deepface.commons.onnx_utils import OnnxModel
 
 tf_version = package_utils.get_tf_major_version()
 if tf_version == 2:
@@ -19,7 +20,7 @@ class FacialRecognition(ABC):
     output_shape: int
 
     def forward(self, img: np.ndarray) -> List[float]:
-        if not isinstance(self.model, Model):
+        if not isinstance(self.model, (Model, OnnxModel)):
             raise ValueError(
                 "You must overwrite forward method if it is not a keras model,"
                 f"but {self.model_name} not overwritten!"
@@ -27,3 +28,18 @@ class FacialRecognition(ABC):
         # model.predict causes memory issue when it is called in a for loop
         # embedding = model.predict(img, verbose=0)[0].tolist()
         return self.model(img, training=False).numpy()[0].tolist()
+
+    def forward_batch(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Find embeddings of many images with a single forward pass
+        Args:
+            imgs (np.ndarray): pre-processed images stacked as (batch, height, width, channels)
+        Returns:
+            embeddings (np.ndarray): float32 embeddings with shape (batch, output_shape)
+        """
+        if type(self).forward is not FacialRecognition.forward or not isinstance(
+            self.model, (Model, OnnxModel)
+        ):
+            # models overwriting forward are fed one image at a time
+            return np.array([self.forward(img[np.newaxis]) for img in imgs], dtype=np.float32)
+        return self.model(imgs, training=False).numpy().astype(np.float32, copy=False)
@@ -56,6 +56,30 @@ class DlibClient(FacialRecognition):
         img_representation = np.expand_dims(img_representation, axis=0)
         return img_representation[0].tolist()
 
+    def forward_batch(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Find embeddings of many images with a single call of the Dlib model.
+        Args:
+            imgs (np.ndarray): pre-processed images stacked as (batch, height, width, channels)
+        Returns
+            embeddings (np.ndarray): float32 embeddings with shape (batch, 128)
+        """
+        # bgr to rgb
+        imgs = imgs[:, :, :, ::-1]
+
+        # imgs are in scale of [0, 1] but expected [0, 255]
+        if imgs.max() <= 1:
+            imgs = imgs * 255
+
+        imgs = np.ascontiguousarray(imgs, dtype=np.uint8)
+
+        # dlib accepts a list of images and runs them through its network as one batch
+        img_representations = self.model.model.compute_face_descriptor(list(imgs))
+        return np.array(
+            [np.array(img_representation) for img_representation in img_representations],
+            dtype=np.float32,
+        )
+
 
 class DlibResNet:
     def __init__(self):
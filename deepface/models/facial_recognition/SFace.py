@@ -46,6 +46,23 @@ class SFaceClient(FacialRecognition):
 
         return embeddings[0].tolist()
 
+    def forward_batch(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Find embeddings of many images with SFace model
+        Args:
+            imgs (np.ndarray): pre-processed images stacked as (batch, height, width, channels)
+        Returns
+            embeddings (np.ndarray): float32 embeddings with shape (batch, 128)
+        """
+        # opencv's recognizer has no batch entry point, the batch is converted at once instead
+        input_blobs = (imgs * 255).astype(np.uint8)
+
+        embeddings = np.concatenate(
+            [self.model.model.feature(input_blob) for input_blob in input_blobs]
+        )
+
+        return embeddings.astype(np.float32, copy=False)
+
 
 def load_model(
     url=WEIGHTS_URL,
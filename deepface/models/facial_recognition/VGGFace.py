@@ -74,6 +74,18 @@ class VggFaceClient(FacialRecognition):
         embedding = verification.l2_normalize(embedding)
         return embedding.tolist()
 
+    def forward_batch(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Generates embeddings of many images with a single forward pass of the VGG-Face model.
+        Args:
+            imgs (np.ndarray): pre-processed images stacked as (batch, height, width, channels)
+        Returns
+            embeddings (np.ndarray): float32 embeddings with shape (batch, 4096)
+        """
+        embeddings = self.model(imgs, training=False).numpy()
+        embeddings = verification.l2_normalize(embeddings, axis=1)
+        return embeddings.astype(np.float32, copy=False)
+
 
 def base_model() -> Sequential:
     """
@@ -0,0 +1,220 @@
+# built-in dependencies
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.models.FacialRecognition import FacialRecognition
+
+# max_batch_size and max_wait of enabled micro batching, None if disabled
+_settings: Optional[Tuple[int, float]] = None
+# batcher of each facial recognition model, keyed by id of the model
+_batchers: Dict[int, Tuple[FacialRecognition, "MicroBatcher"]] = {}
+_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    Merge forward passes of concurrent callers into larger batches. Callers submit
+        pre-processed images and wait for their outputs. A background thread collects queued
+        requests until max_batch_size images are gathered or max_wait seconds passed since
+        the oldest request was taken, runs a single forward pass and hands each caller back
+        its own rows.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(
+                f"max_batch_size must be a positive integer but it is {max_batch_size}"
+            )
+
+        if max_wait < 0:
+            raise ValueError(f"max_wait must be non-negative but it is {max_wait}")
+
+        self.forward = forward
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue: "queue.Queue[Optional[Tuple[np.ndarray, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, imgs: np.ndarray) -> Future:
+        """
+        Queue images for the next forward pass
+        Args:
+            imgs (np.ndarray): pre-processed images stacked on the first axis
+        Returns:
+            future (Future): resolves to the outputs of the images, in the same order
+        """
+        future: Future = Future()
+        with self._lock:
+            if not self._closed and len(imgs) > 0:
+                self._queue.put((imgs, future))
+                return future
+
+        # nothing to batch, or the batcher was closed while the caller was holding it
+        try:
+            future.set_result(self.forward(imgs))
+        except Exception as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+        return future
+
+    def __call__(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Run images through the shared forward pass and wait for their outputs
+        Args:
+            imgs (np.ndarray): pre-processed images stacked on the first axis
+        Returns:
+            outputs (np.ndarray): outputs of the images, in the same order
+        """
+        return self.submit(imgs).result()
+
+    def close(self) -> None:
+        """
+        Stop the background thread once the queued requests are served
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        carried: Optional[Tuple[np.ndarray, Future]] = None
+        while True:
+            request = carried if carried is not None else self._queue.get()
+            carried = None
+            if request is None:
+                return
+
+            requests = [request]
+            size = len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            closing = False
+
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        request = self._queue.get(timeout=timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if request is None:
+                    closing = True
+                    break
+
+                if size + len(request[0]) > self.max_batch_size:
+                    # keep batches bounded, the request opens the next one
+                    carried = request
+                    break
+
+                requests.append(request)
+                size += len(request[0])
+
+            self._forward(requests)
+
+            if closing:
+                return
+
+    def _forward(self, requests: List[Tuple[np.ndarray, Future]]) -> None:
+        """
+        Run one forward pass for the images of many requests and scatter the outputs
+        """
+        requests = [
+            (imgs, future) for imgs, future in requests if future.set_running_or_notify_cancel()
+        ]
+        if len(requests) == 0:
+            return
+
+        try:
+            outputs = self.forward(np.concatenate([imgs for imgs, _ in requests]))
+        except Exception as err:  # pylint: disable=broad-except
+            for _, future in requests:
+                future.set_exception(err)
+            return
+
+        offset = 0
+        for imgs, future in requests:
+            future.set_result(outputs[offset : offset + len(imgs)])
+            offset += len(imgs)
+
+
+def enable(max_batch_size: int = 32, max_wait: float = 0.005) -> None:
+    """
+    Merge forward passes of facial recognition models requested concurrently from many
+        threads, e.g. by the requests of a threaded web server, into shared batches.
+    Args:
+        max_batch_size (int): maximum number of faces of a shared forward pass
+        max_wait (float): maximum seconds a face waits for others to join its batch
+    """
+    global _settings
+
+    if max_batch_size < 1:
+        raise ValueError(f"max_batch_size must be a positive integer but it is {max_batch_size}")
+
+    if max_wait < 0:
+        raise ValueError(f"max_wait must be non-negative but it is {max_wait}")
+
+    disable()
+    with _lock:
+        _settings = (max_batch_size, max_wait)
+
+
+def disable() -> None:
+    """
+    Run forward passes of facial recognition models in the calling thread again
+    """
+    global _settings
+
+    with _lock:
+        _settings = None
+        batchers = [batcher for _, batcher in _batchers.values()]
+        _batchers.clear()
+
+    for batcher in batchers:
+        batcher.close()
+
+
+def forward_batch(model: FacialRecognition, imgs: np.ndarray) -> np.ndarray:
+    """
+    Find embeddings of pre-processed images with a facial recognition model, sharing the
+        forward pass with concurrent callers if micro batching is enabled
+    Args:
+        model (FacialRecognition): facial recognition model
+        imgs (np.ndarray): pre-processed images stacked as (batch, height, width, channels)
+    Returns:
+        embeddings (np.ndarray): float32 embeddings with shape (batch, output_shape)
+    """
+    with _lock:
+        if _settings is None:
+            batcher = None
+        elif id(model) in _batchers:
+            batcher = _batchers[id(model)][1]
+        else:
+            max_batch_size, max_wait = _settings
+            batcher = MicroBatcher(
+                forward=model.forward_batch, max_batch_size=max_batch_size, max_wait=max_wait
+            )
+            # model is kept alongside, so that its id is not reused while the batcher lives
+            _batchers[id(model)] = (model, batcher)
+
+    if batcher is None:
+        return model.forward_batch(imgs)
+    return batcher(imgs)
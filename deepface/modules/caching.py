@@ -0,0 +1,281 @@
+# built-in dependencies
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons import folder_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# rough memory held by a cached face besides its embedding, e.g. its facial area
+FACE_OVERHEAD_BYTES = 512
+
+# memory budget of enabled embedding cache, None if disabled
+_max_bytes: Optional[int] = None
+# on-disk tier of enabled embedding cache, None if it is kept in memory only
+_disk_path: Optional[str] = None
+_cache: "OrderedDict[str, Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+def enable(max_bytes: int = 256 * 1024**2, disk: bool = False) -> None:
+    """
+    Cache the embeddings of represented images, so that resubmitted images skip detection,
+        alignment and the facial recognition model. Images are identified by a hash of their
+        decoded pixels, so the same photo is found whether it is passed as a path, a file
+        object, a base64 string or a numpy array.
+    Args:
+        max_bytes (int): memory budget in bytes, least recently used images are evicted
+            when it is exceeded
+        disk (bool): also store embeddings under the .deepface/embeddings folder of the
+            deepface home, which survives restarts and is shared amongst processes
+    """
+    global _max_bytes, _disk_path
+
+    if max_bytes < 0:
+        raise ValueError(f"max_bytes must be non-negative but it is {max_bytes}")
+
+    disk_path = None
+    if disk:
+        disk_path = os.path.join(folder_utils.get_deepface_home(), ".deepface", "embeddings")
+        os.makedirs(disk_path, exist_ok=True)
+
+    with _lock:
+        _max_bytes = int(max_bytes)
+        _disk_path = disk_path
+        __evict()
+
+
+def disable() -> None:
+    """
+    Stop caching embeddings and drop the ones held in memory. Files of the disk tier are kept.
+    """
+    global _max_bytes, _disk_path
+
+    with _lock:
+        _max_bytes = None
+        _disk_path = None
+        __clear_memory()
+
+
+def clear(disk: bool = False) -> None:
+    """
+    Drop cached embeddings
+    Args:
+        disk (bool): also remove the files of the disk tier
+    """
+    with _lock:
+        __clear_memory()
+        if disk:
+            disk_path = os.path.join(folder_utils.get_deepface_home(), ".deepface", "embeddings")
+            shutil.rmtree(disk_path, ignore_errors=True)
+            if _disk_path is not None:
+                os.makedirs(_disk_path, exist_ok=True)
+
+
+def is_enabled() -> bool:
+    """
+    Returns:
+        enabled (bool): True if embeddings are cached
+    """
+    return _max_bytes is not None
+
+
+def get_key(img: np.ndarray, **settings: Any) -> str:
+    """
+    Identify the faces of an image found with the given settings
+    Args:
+        img (np.ndarray): decoded image
+        settings: arguments of represent changing its result, e.g. model_name and
+            detector_backend
+    Returns:
+        key (str): hex digest of the image pixels and the settings
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(settings.items())).encode())
+    digest.update(f"{img.shape}{img.dtype}".encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+
+def get(key: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Find the cached faces of an image
+    Args:
+        key (str): key of the image, see get_key
+    Returns:
+        faces (list): embedding, facial_area and face_confidence of each face, None if the
+            image is not cached
+    """
+    with _lock:
+        if _max_bytes is None:
+            return None
+
+        if key in _cache:
+            _cache.move_to_end(key)
+            return __copy(_cache[key][0])
+
+        disk_path = _disk_path
+
+    if disk_path is None:
+        return None
+
+    faces = __read(os.path.join(disk_path, key[:2], f"{key}.npz"))
+    if faces is not None:
+        with _lock:
+            __remember(key, faces)
+        faces = __copy(faces)
+    return faces
+
+
+def put(key: str, faces: List[Dict[str, Any]]) -> None:
+    """
+    Cache the faces of an image
+    Args:
+        key (str): key of the image, see get_key
+        faces (list): embedding, facial_area and face_confidence of each face
+    """
+    faces = [
+        {
+            "embedding": np.array(face["embedding"], dtype=np.float32),
+            "facial_area": dict(face["facial_area"]),
+            "face_confidence": face["face_confidence"],
+        }
+        for face in faces
+    ]
+    for face in faces:
+        # cached arrays are shared amongst callers
+        face["embedding"].flags.writeable = False
+
+    with _lock:
+        if _max_bytes is None:
+            return
+        __remember(key, faces)
+        disk_path = _disk_path
+
+    if disk_path is not None:
+        try:
+            __write(os.path.join(disk_path, key[:2], f"{key}.npz"), faces)
+        except OSError as err:
+            logger.warn(f"Embeddings could not be cached on disk: {str(err)}")
+
+
+def __remember(key: str, faces: List[Dict[str, Any]]) -> None:
+    """
+    Keep faces in memory if they fit into the budget. Caller must hold the lock.
+    """
+    global _cache_bytes
+
+    if key in _cache:
+        _cache_bytes -= _cache.pop(key)[1]
+
+    size = sum(face["embedding"].nbytes + FACE_OVERHEAD_BYTES for face in faces)
+    if _max_bytes is None or size > _max_bytes:
+        return
+
+    _cache[key] = (faces, size)
+    _cache_bytes += size
+    __evict()
+
+
+def __evict() -> None:
+    """
+    Drop least recently used images until the cache fits into its budget.
+        Caller must hold the lock.
+    """
+    global _cache_bytes
+    while _cache and _max_bytes is not None and _cache_bytes > _max_bytes:
+        _, (_, size) = _cache.popitem(last=False)
+        _cache_bytes -= size
+
+
+def __clear_memory() -> None:
+    """
+    Drop images held in memory. Caller must hold the lock.
+    """
+    global _cache_bytes
+    _cache.clear()
+    _cache_bytes = 0
+
+
+def __copy(faces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Copy cached faces for a caller, so that it gets writable embeddings as on a cache miss
+    """
+    return [
+        {
+            **face,
+            "embedding": np.array(face["embedding"]),
+            "facial_area": dict(face["facial_area"]),
+        }
+        for face in faces
+    ]
+
+
+def __write(path: str, faces: List[Dict[str, Any]]) -> None:
+    """
+    Store faces as a npz file, written to a temporary location first and then moved
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    metadata = [
+        {"facial_area": face["facial_area"], "face_confidence": face["face_confidence"]}
+        for face in faces
+    ]
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            embeddings=np.array([face["embedding"] for face in faces], dtype=np.float32),
+            metadata=np.array(json.dumps(metadata, default=__to_builtin)),
+        )
+    os.replace(tmp_path, path)
+
+
+def __read(path: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Load faces stored with __write, None if the file does not exist or is broken
+    """
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        with np.load(path) as npz:
+            embeddings = npz["embeddings"]
+            metadata = json.loads(str(npz["metadata"]))
+    except Exception as err:  # pylint: disable=broad-except
+        logger.warn(f"Ignoring broken cached embeddings {path}: {str(err)}")
+        return None
+
+    faces = []
+    for embedding, item in zip(embeddings, metadata):
+        embedding.flags.writeable = False
+        faces.append(
+            {
+                "embedding": embedding,
+                # eye coordinates are tuples, json stores them as lists
+                "facial_area": {
+                    key: tuple(value) if isinstance(value, list) else value
+                    for key, value in item["facial_area"].items()
+                },
+                "face_confidence": item["face_confidence"],
+            }
+        )
+    return faces
+
+
+def __to_builtin(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value)} is not serializable")
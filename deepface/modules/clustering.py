@@ -0,0 +1,228 @@
+# built-in dependencies
+import os
+import time
+from typing import List, Optional
+
+# 3rd party dependencies
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+# project dependencies
+from deepface.commons import datastore_utils
+from deepface.modules import recognition, verification
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+def cluster(
+    db_path: str,
+    model_name: str = "VGG-Face",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    threshold: Optional[float] = None,
+    normalization: str = "base",
+    silent: bool = False,
+    refresh_database: bool = True,
+    min_size: int = 2,
+    block_size: int = 4096,
+) -> List[pd.DataFrame]:
+    """
+    Group the faces of a database into clusters of the same person. Faces closer than the
+        threshold are linked, and faces linked directly or through other faces form a cluster.
+
+    Args:
+        db_path (string): Path to the folder containing image files.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        distance_metric (string): Metric for measuring similarity. Options: 'cosine',
+            'euclidean', 'euclidean_l2'.
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+
+        detector_backend (string): face detector backend.
+
+        align (boolean): Perform alignment based on the eye positions.
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        threshold (float): Maximum distance of linked faces. If left unset, the pre-tuned
+            threshold of the model and distance metric is used (default is None).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process.
+
+        refresh_database (boolean): Synchronize the datastore with the images in db_path
+            first. If set to false, the existing datastore is clustered as is (default is True).
+
+        min_size (int): Minimum number of faces of a returned cluster. Default is 2 to return
+            duplicates only, set to 1 to return every face.
+
+        block_size (int): Number of faces compared against each other at once. Memory is
+            bounded by the square of the block size instead of the database size
+            (default is 4096).
+
+    Returns:
+        clusters (List[pd.DataFrame]): a dataframe for each cluster, largest first, with
+            identity, hash and target_x, target_y, target_w, target_h columns of its faces.
+    """
+    tic = time.time()
+
+    if min_size < 1:
+        raise ValueError(f"min_size must be a positive integer but it is {min_size}")
+
+    if not os.path.isdir(db_path):
+        raise ValueError(f"Passed path {db_path} does not exist!")
+
+    if refresh_database:
+        datastore = recognition.refresh_datastore(
+            db_path=db_path,
+            model_name=model_name,
+            detector_backend=detector_backend,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            silent=silent,
+        )
+    else:
+        datastore_path = os.path.join(
+            db_path,
+            datastore_utils.get_datastore_name(
+                model_name=model_name,
+                detector_backend=detector_backend,
+                align=align,
+                normalization=normalization,
+                expand_percentage=expand_percentage,
+            ),
+        )
+        if not datastore_utils.exists(datastore_path):
+            raise ValueError(f"Nothing is found in {datastore_path}")
+        datastore = datastore_utils.load(datastore_path)
+
+    labels = find_clusters(
+        datastore=datastore,
+        distance_metric=distance_metric,
+        threshold=(
+            threshold
+            if threshold is not None
+            else verification.find_threshold(model_name, distance_metric)
+        ),
+        block_size=block_size,
+        silent=silent,
+    )
+
+    # rows grouped by cluster, largest clusters first
+    rows = np.flatnonzero(labels >= 0)
+    _, inverse, counts = np.unique(labels[rows], return_inverse=True, return_counts=True)
+    order = np.lexsort((rows, labels[rows], -counts[inverse]))
+    rows, sizes = rows[order], counts[inverse][order]
+    starts = np.flatnonzero(np.r_[True, labels[rows][1:] != labels[rows][:-1]])
+
+    clusters = []
+    for start in starts:
+        if sizes[start] < min_size:
+            break
+        members = rows[start : start + sizes[start]]
+        clusters.append(
+            pd.DataFrame({key: value[members] for key, value in datastore.metadata.items()})
+        )
+
+    if not silent:
+        toc = time.time()
+        logger.info(f"cluster function duration {toc - tic} seconds")
+
+    return clusters
+
+
+def find_clusters(
+    datastore: datastore_utils.Datastore,
+    distance_metric: str,
+    threshold: float,
+    block_size: int = 4096,
+    silent: bool = True,
+) -> np.ndarray:
+    """
+    Find connected faces of a datastore. Distances are calculated in tiles of block_size
+        by block_size faces over the upper triangle of the distance matrix, and pairs closer
+        than the threshold are merged with union-find.
+    Args:
+        datastore (Datastore): facial database
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        threshold (float): maximum distance of linked faces
+        block_size (int): number of faces compared against each other at once
+        silent (bool): enable or disable the progress bar
+    Returns:
+        labels (np.ndarray): cluster label of each row with shape (N,), the smallest row
+            index in its cluster. -1 for rows without embedding.
+    """
+    if block_size < 1:
+        raise ValueError(f"block_size must be a positive integer but it is {block_size}")
+
+    size = len(datastore)
+    parents = np.arange(size, dtype=np.int64)
+    bound = threshold + recognition.THRESHOLD_TOLERANCE
+
+    starts = range(0, size, block_size) if datastore.dimensions > 0 else range(0)
+    for start in tqdm(starts, desc="Clustering", disable=silent):
+        end = min(start + block_size, size)
+        valid = datastore.valid[start:end]
+        # original embeddings of the block, norms are required by the euclidean distance
+        targets = np.asarray(datastore.embeddings[start:end], dtype=np.float32)
+        targets = targets * datastore.norms[start:end][:, None]
+
+        for other_start in range(start, size, block_size):
+            other_end = min(other_start + block_size, size)
+            distances = verification.find_normalized_distance(
+                datastore.embeddings[other_start:other_end],
+                datastore.norms[other_start:other_end],
+                targets,
+                distance_metric,
+            )  # (B, B)
+            distances[~valid, :] = np.inf
+            distances[:, ~datastore.valid[other_start:other_end]] = np.inf
+            if other_start == start:
+                # each pair once, without self pairs
+                distances[np.tril_indices(end - start)] = np.inf
+
+            alphas, betas = np.nonzero(distances <= bound)
+            linked = np.round(distances[alphas, betas].astype(np.float64), 6) <= threshold
+            __union(parents, alphas[linked] + start, betas[linked] + other_start)
+
+    labels = __find(parents, np.arange(size, dtype=np.int64))
+    labels[~datastore.valid] = -1
+    return labels
+
+
+def __find(parents: np.ndarray, items: np.ndarray) -> np.ndarray:
+    """
+    Find the root of each item, halving paths on the way
+    """
+    roots = parents[items]
+    while True:
+        grandparents = parents[roots]
+        if np.array_equal(grandparents, roots):
+            return roots
+        parents[roots] = parents[grandparents]
+        roots = grandparents
+
+
+def __union(parents: np.ndarray, alphas: np.ndarray, betas: np.ndarray) -> None:
+    """
+    Merge the sets of paired items. Roots always point to a smaller index, so that
+        conflicting merges of the same root resolve in the next round without cycles.
+    """
+    while alphas.shape[0] > 0:
+        alpha_roots = __find(parents, alphas)
+        beta_roots = __find(parents, betas)
+        pending = alpha_roots != beta_roots
+        alpha_roots, beta_roots = alpha_roots[pending], beta_roots[pending]
+        parents[np.maximum(alpha_roots, beta_roots)] = np.minimum(alpha_roots, beta_roots)
+        alphas, betas = alphas[pending], betas[pending]
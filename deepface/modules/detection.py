@@ -1,5 +1,7 @@
 # built-in dependencies
-from typing import Any, Dict, IO, List, Tuple, Union, Optional
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, IO, List, Tuple, Union, Optional
 
 # 3rd part dependencies
 from heapq import nlargest
@@ -15,6 +17,22 @@ from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# detectors keeping state between calls, e.g. the input of an opencv network, must not be
+# called from many threads at once. shared instances are called under a lock of their backend.
+THREAD_UNSAFE_DETECTORS = {
+    "opencv",
+    "ssd",
+    "yunet",
+    "mediapipe",
+    "yolov8",
+    "yolov11n",
+    "yolov11s",
+    "yolov11m",
+}
+_detector_locks = {backend: threading.Lock() for backend in THREAD_UNSAFE_DETECTORS}
+# instances of threads using private_detectors
+_thread_detectors = threading.local()
+
 # pylint: disable=no-else-raise
 
 
@@ -220,9 +238,7 @@ def detect_faces(
         - confidence (float): The confidence score associated with the detected face.
     """
     height, width, _ = img.shape
-    face_detector: Detector = modeling.build_model(
-        task="face_detector", model_name=detector_backend
-    )
+    face_detector, detector_lock = __get_detector(detector_backend)
 
     # validate expand percentage score
     if expand_percentage < 0:
@@ -248,7 +264,11 @@ def detect_faces(
         )
 
     # find facial areas of given image
-    facial_areas = face_detector.detect_faces(img)
+    if detector_lock is None:
+        facial_areas = face_detector.detect_faces(img)
+    else:
+        with detector_lock:
+            facial_areas = face_detector.detect_faces(img)
 
     if max_faces is not None and max_faces < len(facial_areas):
         facial_areas = nlargest(
@@ -268,6 +288,46 @@ def detect_faces(
     ]
 
 
+@contextmanager
+def private_detectors() -> Generator[None, None, None]:
+    """
+    Build own instances of the detectors which are not thread safe for the calling thread
+        while in this context, so that it does not wait for other threads calling the shared
+        instances, e.g. in a long running background thread. Instances are released on exit.
+    """
+    _thread_detectors.detectors = {}
+    try:
+        yield
+    finally:
+        del _thread_detectors.detectors
+
+
+def __get_detector(detector_backend: str) -> Tuple[Detector, Optional[threading.Lock]]:
+    """
+    Find the face detector of the calling thread. Detectors are built once and shared,
+        the ones which are not thread safe must be called under the returned lock unless
+        the thread uses private_detectors.
+    Args:
+        detector_backend (str): face detector backend
+    Returns:
+        face_detector (Detector)
+        detector_lock (threading.Lock): lock to hold while calling the detector, if any
+    """
+    face_detector: Detector = modeling.build_model(
+        task="face_detector", model_name=detector_backend
+    )
+    if detector_backend not in THREAD_UNSAFE_DETECTORS:
+        return face_detector, None
+
+    detectors = getattr(_thread_detectors, "detectors", None)
+    if detectors is None:
+        return face_detector, _detector_locks[detector_backend]
+
+    if detector_backend not in detectors:
+        detectors[detector_backend] = type(face_detector)()
+    return detectors[detector_backend], None
+
+
 def extract_face(
     facial_area: FacialAreaRegion,
     img: np.ndarray,
@@ -0,0 +1,1193 @@
+# built-in dependencies
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons import datastore_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# loaded indexes keyed on index path
+_index_cache: Dict[str, Tuple[Tuple, "AnnIndex"]] = {}
+_index_cache_lock = threading.Lock()
+
+# rows processed at once while assigning vectors
+CHUNK_SIZE = 65536
+
+# rows of codes converted at once while scanning, small enough to stay in cpu caches
+SCAN_CHUNK_SIZE = 4096
+
+# dimensions of each subvector quantized by the pq index
+SUBVECTOR_SIZE = 8
+
+# margin covering float32 rounding of distances to identity centroids
+RADIUS_SLACK = 1e-3
+
+
+# pylint: disable=too-few-public-methods, unused-argument
+class AnnIndex(ABC):
+    """
+    Approximate nearest neighbour index over the rows of a datastore. It only nominates
+        candidate rows, distances of the candidates are calculated exactly afterwards.
+    """
+
+    index_type: str
+    space: str
+    # whether candidates are scanned on a compressed copy of the embeddings, so that the
+    # float32 embeddings are only read for the rows nominated
+    compressed = False
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """
+        Number of datastore rows covered by the index, including the ones without embedding
+        """
+
+    @abstractmethod
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        """
+        Build the index from scratch
+        Args:
+            embeddings (np.ndarray): embeddings of the datastore with shape (N, D)
+            valid (np.ndarray): boolean array of shape (N,) for rows having embeddings
+            identities (np.ndarray): image path of each row with shape (N,)
+        """
+
+    @abstractmethod
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        """
+        Synchronize the index with a changed datastore. Rows not kept are dropped first,
+            then rows appended to the datastore are added.
+        Args:
+            keep_mask (np.ndarray): boolean array with the size of the index before change
+            embeddings (np.ndarray): embeddings of the changed datastore with shape (N, D)
+            valid (np.ndarray): boolean array of shape (N,) for rows having embeddings
+            identities (np.ndarray): image path of each row with shape (N,)
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        """
+        Find candidate rows for some target embeddings
+        Args:
+            target_embeddings (np.ndarray): embeddings with shape (M, D)
+            nprobe (int): search effort, higher values increase recall and latency
+            k (int): number of nearest neighbours required at least, if known
+            radius (float): euclidean distance in the space of the index beyond which
+                rows cannot match, if known
+        Returns:
+            candidates (List[np.ndarray]): sorted row indices for each target embedding
+        """
+
+    @staticmethod
+    @abstractmethod
+    def get_files(index_path: str) -> List[str]:
+        """
+        Files storing the index
+        """
+
+    @abstractmethod
+    def save(self, index_path: str) -> None:
+        """
+        Store the index on disk
+        """
+
+    @classmethod
+    @abstractmethod
+    def load(cls, index_path: str) -> "AnnIndex":
+        """
+        Restore the index from disk
+        """
+
+    def prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Convert embeddings to the vector space of the index
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.space == "cosine":
+            norm = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / (norm + 1e-10)
+        return vectors
+
+
+class IvfIndex(AnnIndex):
+    """
+    Inverted file index. Vectors are clustered with k-means and only the clusters
+        closest to a target embedding are scanned.
+    """
+
+    index_type = "ivf"
+
+    def __init__(self, space: str):
+        self.space = space
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        # cluster of each row, -1 for rows without embedding
+        self.assignments = np.zeros((0,), dtype=np.int32)
+        # number of vectors when centroids were trained
+        self.trained_size = 0
+        self._inverted_lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def size(self) -> int:
+        return int(self.assignments.shape[0])
+
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        rows = np.flatnonzero(valid)
+        self.trained_size = int(rows.shape[0])
+        self._inverted_lists = None
+
+        if self.trained_size == 0:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.assignments = np.full(valid.shape[0], -1, dtype=np.int32)
+            return
+
+        # at least 39 training points per cluster as a rule of thumb
+        nlist = max(1, min(int(np.sqrt(self.trained_size)), self.trained_size // 39))
+
+        rng = np.random.default_rng(0)
+        sample_size = min(self.trained_size, max(CHUNK_SIZE, 39 * nlist))
+        sample = np.sort(rng.choice(rows, size=sample_size, replace=False))
+
+        self.centroids = _kmeans(self.prepare(embeddings[sample]), nlist, self.space)
+        self.assignments = self.__assign(embeddings, valid)
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        self.assignments = self.assignments[keep_mask]
+        self._inverted_lists = None
+
+        # retrain centroids if the gallery outgrew the data they were trained on
+        if self.centroids.shape[0] == 0 or valid.sum() > 8 * self.trained_size:
+            self.build(embeddings, valid, identities)
+            return
+
+        start = self.assignments.shape[0]
+        self.assignments = np.concatenate(
+            [self.assignments, self.__assign(embeddings[start:], valid[start:])]
+        )
+
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        nlist = self.centroids.shape[0]
+        if nlist == 0:
+            return [np.zeros((0,), dtype=np.int64) for _ in range(len(target_embeddings))]
+
+        nprobe = min(nprobe or 8, nlist)
+        order, offsets = self.__get_inverted_lists()
+
+        distances = _squared_distances(self.prepare(target_embeddings), self.centroids)
+        probes = np.argpartition(distances, nprobe - 1, axis=1)[:, :nprobe]
+
+        candidates = []
+        for target_probes in probes:
+            rows = np.concatenate(
+                [order[offsets[probe] : offsets[probe + 1]] for probe in target_probes]
+            )
+            candidates.append(np.sort(rows))
+        return candidates
+
+    @staticmethod
+    def get_files(index_path: str) -> List[str]:
+        return [index_path + ".npz"]
+
+    def save(self, index_path: str) -> None:
+        file_path = self.get_files(index_path)[0]
+        with open(file_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                space=np.array(self.space),
+                centroids=self.centroids,
+                assignments=self.assignments,
+                trained_size=np.array(self.trained_size),
+            )
+        os.replace(file_path + ".tmp", file_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "IvfIndex":
+        with np.load(cls.get_files(index_path)[0], allow_pickle=False) as npz:
+            index = cls(space=str(npz["space"]))
+            index.centroids = npz["centroids"]
+            index.assignments = npz["assignments"]
+            index.trained_size = int(npz["trained_size"])
+        return index
+
+    def __assign(self, embeddings: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        assignments = np.full(valid.shape[0], -1, dtype=np.int32)
+        for start in range(0, valid.shape[0], CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            vectors = self.prepare(embeddings[start:end])
+            distances = _squared_distances(vectors, self.centroids)
+            assignments[start:end] = np.argmin(distances, axis=1)
+        assignments[~valid] = -1
+        return assignments
+
+    def __get_inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows grouped by cluster and the start offset of each cluster
+        """
+        if self._inverted_lists is None:
+            nlist = self.centroids.shape[0]
+            order = np.argsort(self.assignments, kind="stable")
+            # rows without embedding come first with -1 assignments
+            counts = np.bincount(self.assignments + 1, minlength=nlist + 1)
+            offsets = np.cumsum(counts)
+            self._inverted_lists = (order, offsets)
+        return self._inverted_lists
+
+
+class HnswIndex(AnnIndex):
+    """
+    Hierarchical navigable small world graph index backed by hnswlib. Rows dropped from the
+        datastore are marked deleted in the graph, and their slots are reused by rows added
+        afterwards, so the graph does not grow beyond the largest datastore it indexed.
+    """
+
+    index_type = "hnsw"
+
+    def __init__(self, space: str):
+        self.space = space
+        self.index = None
+        self.dimensions = 0
+        # label of each row in the graph, -1 for rows without embedding
+        self.labels = np.zeros((0,), dtype=np.int64)
+        self.next_label = 0
+
+    @property
+    def size(self) -> int:
+        return int(self.labels.shape[0])
+
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        self.index = None
+        self.dimensions = 0
+        self.labels = np.full(valid.shape[0], -1, dtype=np.int64)
+        self.next_label = 0
+        self.__add(embeddings, valid, offset=0)
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        for label in self.labels[~keep_mask]:
+            if label >= 0:
+                self.index.mark_deleted(int(label))
+        self.labels = self.labels[keep_mask]
+
+        offset = self.labels.shape[0]
+        self.labels = np.concatenate(
+            [self.labels, np.full(valid.shape[0] - offset, -1, dtype=np.int64)]
+        )
+        self.__add(embeddings[offset:], valid[offset:], offset=offset)
+
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        ef = max(nprobe or 64, k or 0)
+        k = min(ef, int((self.labels >= 0).sum()))
+        if self.index is None or k == 0:
+            return [np.zeros((0,), dtype=np.int64) for _ in range(len(target_embeddings))]
+
+        self.index.set_ef(max(ef, k))
+        found_labels, _ = self.index.knn_query(self.prepare(target_embeddings), k=k)
+
+        sorter = np.argsort(self.labels)
+        sorted_labels = self.labels[sorter]
+        return [
+            np.sort(sorter[np.searchsorted(sorted_labels, target_labels.astype(np.int64))])
+            for target_labels in found_labels
+        ]
+
+    @staticmethod
+    def get_files(index_path: str) -> List[str]:
+        return [index_path + ".bin", index_path + ".npz"]
+
+    def save(self, index_path: str) -> None:
+        graph_path, labels_path = self.get_files(index_path)
+        if self.index is not None:
+            self.index.save_index(graph_path + ".tmp")
+            os.replace(graph_path + ".tmp", graph_path)
+        else:
+            with open(graph_path, "wb"):
+                pass
+        with open(labels_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                space=np.array(self.space),
+                dimensions=np.array(self.dimensions),
+                labels=self.labels,
+                next_label=np.array(self.next_label),
+            )
+        os.replace(labels_path + ".tmp", labels_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "HnswIndex":
+        graph_path, labels_path = cls.get_files(index_path)
+        with np.load(labels_path, allow_pickle=False) as npz:
+            index = cls(space=str(npz["space"]))
+            index.dimensions = int(npz["dimensions"])
+            index.labels = npz["labels"]
+            index.next_label = int(npz["next_label"])
+
+        if index.dimensions > 0:
+            hnswlib = _import_hnswlib()
+            index.index = hnswlib.Index(space=index.space, dim=index.dimensions)
+            index.index.load_index(graph_path, allow_replace_deleted=True)
+        return index
+
+    def __add(self, embeddings: np.ndarray, valid: np.ndarray, offset: int) -> None:
+        rows = np.flatnonzero(valid)
+        if rows.shape[0] == 0:
+            return
+
+        if self.index is None:
+            hnswlib = _import_hnswlib()
+            self.dimensions = int(embeddings.shape[1])
+            self.index = hnswlib.Index(space=self.space, dim=self.dimensions)
+            self.index.init_index(
+                max_elements=rows.shape[0], ef_construction=200, M=16, allow_replace_deleted=True
+            )
+        else:
+            # slots of deleted rows are replaced first, the graph only grows for the remainder
+            live = int((self.labels >= 0).sum())
+            required = max(self.index.get_current_count(), live + rows.shape[0])
+            if required > self.index.get_max_elements():
+                self.index.resize_index(required)
+
+        for start in range(0, rows.shape[0], CHUNK_SIZE):
+            chunk = rows[start : start + CHUNK_SIZE]
+            labels = np.arange(self.next_label, self.next_label + chunk.shape[0], dtype=np.int64)
+            self.index.add_items(self.prepare(embeddings[chunk]), labels, replace_deleted=True)
+            self.labels[offset + chunk] = labels
+            self.next_label += chunk.shape[0]
+
+
+class IdentityIndex(AnnIndex):
+    """
+    Index of identities, grouping images by the directory they are in. Each identity is
+        summarized by the centroid of its vectors and the radius around the centroid covering
+        all of them. Target embeddings are scored against centroids first and only members
+        of the closest identities are nominated. Identities too far away to have any member
+        within the search radius are skipped, by the triangle inequality.
+    """
+
+    index_type = "identity"
+
+    def __init__(self, space: str):
+        self.space = space
+        self.names = np.zeros((0,), dtype=str)
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        # distance from each centroid to its farthest member, -inf for identities without one
+        self.radii = np.zeros((0,), dtype=np.float64)
+        # identity of each row, -1 for rows without embedding
+        self.assignments = np.zeros((0,), dtype=np.int32)
+        self._inverted_lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def size(self) -> int:
+        return int(self.assignments.shape[0])
+
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        self.names = np.zeros((0,), dtype=str)
+        self.centroids = np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+        self.radii = np.zeros((0,), dtype=np.float64)
+        self.assignments = np.zeros((0,), dtype=np.int32)
+        self.__add(embeddings, valid, identities)
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        removed = np.unique(self.assignments[~keep_mask])
+        self.assignments = self.assignments[keep_mask]
+        self.__add(embeddings, valid, identities, changed=removed[removed >= 0])
+
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        if self.centroids.shape[0] == 0:
+            return [np.zeros((0,), dtype=np.int64) for _ in range(len(target_embeddings))]
+
+        nprobe = min(nprobe or 8, self.centroids.shape[0])
+        order, offsets = self.__get_inverted_lists()
+
+        vectors = self.prepare(target_embeddings)
+        distances = np.sqrt(
+            np.maximum(
+                _squared_distances(vectors, self.centroids)
+                + np.sum(vectors**2, axis=1)[:, None],
+                0,
+            )
+        )
+        # the closest member of an identity is at least this far away
+        lower_bounds = distances - self.radii[None, :]
+
+        candidates = []
+        for target_distances, target_bounds in zip(distances, lower_bounds):
+            probes = np.argpartition(target_distances, nprobe - 1)[:nprobe]
+            probes = probes[np.isfinite(target_bounds[probes])]
+            if radius is not None:
+                probes = probes[target_bounds[probes] <= radius + RADIUS_SLACK]
+            rows = [order[offsets[probe] : offsets[probe + 1]] for probe in probes]
+            candidates.append(
+                np.sort(np.concatenate(rows)) if rows else np.zeros((0,), dtype=np.int64)
+            )
+        return candidates
+
+    @staticmethod
+    def get_files(index_path: str) -> List[str]:
+        return [index_path + ".npz"]
+
+    def save(self, index_path: str) -> None:
+        file_path = self.get_files(index_path)[0]
+        with open(file_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                space=np.array(self.space),
+                names=self.names,
+                centroids=self.centroids,
+                radii=self.radii,
+                assignments=self.assignments,
+            )
+        os.replace(file_path + ".tmp", file_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "IdentityIndex":
+        with np.load(cls.get_files(index_path)[0], allow_pickle=False) as npz:
+            index = cls(space=str(npz["space"]))
+            index.names = npz["names"]
+            index.centroids = npz["centroids"]
+            index.radii = npz["radii"]
+            index.assignments = npz["assignments"]
+        return index
+
+    def __add(
+        self,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+        changed: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Assign rows appended after the current assignments to their identities, then
+            summarize the identities whose members changed again
+        """
+        start = self.assignments.shape[0]
+        names = np.array([os.path.dirname(identity) for identity in identities[start:]], dtype=str)
+
+        # register identities seen for the first time
+        new_names = np.setdiff1d(names[valid[start:]], self.names)
+        if new_names.shape[0] > 0:
+            self.names = np.concatenate([self.names, new_names])
+            self.centroids = np.concatenate(
+                [
+                    self.centroids,
+                    np.zeros((new_names.shape[0], embeddings.shape[1]), dtype=np.float32),
+                ]
+            )
+            self.radii = np.concatenate([self.radii, np.full(new_names.shape[0], -np.inf)])
+
+        sorter = np.argsort(self.names)
+        assignments = np.full(names.shape[0], -1, dtype=np.int32)
+        if self.names.shape[0] > 0:
+            positions = np.searchsorted(self.names, names, sorter=sorter)
+            assignments = sorter[np.minimum(positions, sorter.shape[0] - 1)].astype(np.int32)
+        assignments[~valid[start:]] = -1
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self._inverted_lists = None
+
+        changed = np.unique(assignments[assignments >= 0]) if changed is None else np.union1d(
+            changed, assignments[assignments >= 0]
+        )
+        order, offsets = self.__get_inverted_lists()
+        for identity in changed:
+            rows = order[offsets[identity] : offsets[identity + 1]]
+            if rows.shape[0] == 0:
+                self.radii[identity] = -np.inf
+                continue
+            members = self.prepare(embeddings[rows]).astype(np.float64)
+            centroid = members.mean(axis=0)
+            self.centroids[identity] = centroid
+            self.radii[identity] = np.sqrt(np.max(np.sum((members - centroid) ** 2, axis=1)))
+
+    def __get_inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows grouped by identity and the start offset of each identity
+        """
+        if self._inverted_lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            # rows without embedding come first with -1 assignments
+            counts = np.bincount(self.assignments + 1, minlength=self.names.shape[0] + 1)
+            offsets = np.cumsum(counts)
+            self._inverted_lists = (order, offsets)
+        return self._inverted_lists
+
+
+class PqIndex(AnnIndex):
+    """
+    Product quantization index. Vectors are split into subvectors of SUBVECTOR_SIZE dimensions
+        and each subvector is replaced by the closest of 256 centroids trained for its subspace,
+        so a vector is stored in one byte per subspace. Distances to a target embedding are
+        summed from lookup tables of distances between its subvectors and all centroids,
+        and the closest rows are nominated. Codes of two subspaces are looked up at once,
+        with a table of every combination of their centroids.
+    """
+
+    index_type = "pq"
+    compressed = True
+
+    def __init__(self, space: str):
+        self.space = space
+        # centroids with shape (subspaces, 256, SUBVECTOR_SIZE)
+        self.codebooks = np.zeros((0, 256, SUBVECTOR_SIZE), dtype=np.float32)
+        # codes of subspace pairs with shape (subspaces / 2, N), first subspace in low byte
+        self.codes = np.zeros((0, 0), dtype=np.uint16)
+        self.valid = np.zeros((0,), dtype=bool)
+        # number of vectors when codebooks were trained
+        self.trained_size = 0
+
+    @property
+    def size(self) -> int:
+        return int(self.valid.shape[0])
+
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        rows = np.flatnonzero(valid)
+        self.trained_size = int(rows.shape[0])
+        # an even number of subspaces to pair them
+        subspaces = 2 * -(-embeddings.shape[1] // (2 * SUBVECTOR_SIZE))
+        self.codebooks = np.zeros((subspaces, 256, SUBVECTOR_SIZE), dtype=np.float32)
+        self.codes = np.zeros((subspaces // 2, 0), dtype=np.uint16)
+        self.valid = np.zeros((0,), dtype=bool)
+
+        if self.trained_size > 0:
+            # 39 training points per centroid as a rule of thumb
+            rng = np.random.default_rng(0)
+            sample_size = min(self.trained_size, 39 * 256)
+            sample = np.sort(rng.choice(rows, size=sample_size, replace=False))
+            subvectors = self.__split(self.prepare(embeddings[sample]))
+            for subspace in range(subspaces):
+                codebook = _kmeans(subvectors[:, subspace], min(256, sample_size), "l2")
+                # unused codes of small galleries repeat the first centroid
+                self.codebooks[subspace] = codebook[np.arange(256) % codebook.shape[0]]
+
+        self.__add(embeddings, valid)
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        # retrain codebooks if the gallery outgrew the data they were trained on
+        if self.trained_size == 0 or valid.sum() > 8 * self.trained_size:
+            self.build(embeddings, valid, identities)
+            return
+
+        self.codes = self.codes[:, keep_mask]
+        self.valid = self.valid[keep_mask]
+        self.__add(embeddings, valid)
+
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        available = int(self.valid.sum())
+        if available == 0:
+            return [np.zeros((0,), dtype=np.int64) for _ in range(len(target_embeddings))]
+
+        shortlist = min(max(nprobe or 256, k or 0), available)
+
+        # squared distances between subvectors of targets and centroids (M, subspaces, 256)
+        subvectors = self.__split(self.prepare(target_embeddings))
+        tables = np.sum((subvectors[:, :, None, :] - self.codebooks[None]) ** 2, axis=3)
+
+        candidates = []
+        for table in tables:
+            distances = np.zeros(self.size, dtype=np.float32)
+            for pair, codes in enumerate(self.codes):
+                # distances of every combination, indexed by first + 256 * second code
+                pair_table = (table[2 * pair + 1][:, None] + table[2 * pair][None, :]).ravel()
+                distances += pair_table[codes]
+            distances[~self.valid] = np.inf
+            closest = np.argpartition(distances, shortlist - 1)[:shortlist]
+            candidates.append(np.sort(closest))
+        return candidates
+
+    @staticmethod
+    def get_files(index_path: str) -> List[str]:
+        return [index_path + ".npz"]
+
+    def save(self, index_path: str) -> None:
+        file_path = self.get_files(index_path)[0]
+        with open(file_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                space=np.array(self.space),
+                codebooks=self.codebooks,
+                codes=self.codes,
+                valid=self.valid,
+                trained_size=np.array(self.trained_size),
+            )
+        os.replace(file_path + ".tmp", file_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "PqIndex":
+        with np.load(cls.get_files(index_path)[0], allow_pickle=False) as npz:
+            index = cls(space=str(npz["space"]))
+            index.codebooks = npz["codebooks"]
+            index.codes = npz["codes"]
+            index.valid = npz["valid"]
+            index.trained_size = int(npz["trained_size"])
+        return index
+
+    def __split(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Zero pad vectors to whole subvectors and split them with shape (n, subspaces, size)
+        """
+        subspaces = self.codebooks.shape[0]
+        padded = np.zeros((vectors.shape[0], subspaces * SUBVECTOR_SIZE), dtype=np.float32)
+        padded[:, : vectors.shape[1]] = vectors
+        return padded.reshape((vectors.shape[0], subspaces, SUBVECTOR_SIZE))
+
+    def __add(self, embeddings: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Encode rows appended after the current codes
+        """
+        start = self.size
+        codes = np.zeros((self.codes.shape[0], valid.shape[0] - start), dtype=np.uint16)
+        if self.trained_size > 0:
+            for offset in range(0, codes.shape[1], CHUNK_SIZE):
+                vectors = self.prepare(embeddings[start + offset : start + offset + CHUNK_SIZE])
+                subvectors = self.__split(vectors)
+                for pair in range(codes.shape[0]):
+                    first, second = [
+                        np.argmin(_squared_distances(subvectors[:, subspace], codebook), axis=1)
+                        for subspace, codebook in [
+                            (2 * pair, self.codebooks[2 * pair]),
+                            (2 * pair + 1, self.codebooks[2 * pair + 1]),
+                        ]
+                    ]
+                    codes[pair, offset : offset + CHUNK_SIZE] = first + 256 * second
+        self.codes = np.concatenate([self.codes, codes], axis=1)
+        self.valid = np.concatenate([self.valid, valid[start:]])
+
+
+class QuantizedIndex(AnnIndex):
+    """
+    Compact copy of the embeddings with scalar quantized codes. Every row is scanned on the
+        codes instead of the float32 embeddings. The quantization error of each row is stored
+        too, so that rows which may be within the search radius or amongst the k closest ones
+        are all nominated, and exact distances of the shortlist yield exact results.
+    """
+
+    index_type: str
+    dtype: Type[np.generic]
+    compressed = True
+
+    def __init__(self, space: str):
+        self.space = space
+        self.codes = np.zeros((0, 0), dtype=self.dtype)
+        # squared norm of each decoded vector
+        self.squared_norms = np.zeros((0,), dtype=np.float32)
+        # distance between each vector and its decoded vector, inf for rows without embedding
+        self.errors = np.zeros((0,), dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return int(self.errors.shape[0])
+
+    def build(self, embeddings: np.ndarray, valid: np.ndarray, identities: np.ndarray) -> None:
+        self.train(embeddings, valid)
+        self.codes = np.zeros((0, embeddings.shape[1]), dtype=self.dtype)
+        self.squared_norms = np.zeros((0,), dtype=np.float32)
+        self.errors = np.zeros((0,), dtype=np.float32)
+        self.__add(embeddings, valid)
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        self.codes = self.codes[keep_mask]
+        self.squared_norms = self.squared_norms[keep_mask]
+        self.errors = self.errors[keep_mask]
+        self.__add(embeddings, valid)
+
+    def search(
+        self,
+        target_embeddings: np.ndarray,
+        nprobe: Optional[int] = None,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        vectors = self.prepare(target_embeddings)
+        rows = np.flatnonzero(np.isfinite(self.errors))
+        if rows.shape[0] == 0:
+            return [np.zeros((0,), dtype=np.int64) for _ in range(len(target_embeddings))]
+
+        # contiguous blocks of codes are scanned, rows without embedding are dropped afterwards
+        products = np.empty((vectors.shape[0], self.size), dtype=np.float32)
+        for start in range(0, self.size, SCAN_CHUNK_SIZE):
+            end = start + SCAN_CHUNK_SIZE
+            products[:, start:end] = self.inner_products(vectors, self.codes[start:end])
+        target_norms = np.linalg.norm(vectors, axis=1)
+
+        candidates = []
+        for target_norm, target_products in zip(target_norms, products):
+            target_distances = np.sqrt(
+                np.maximum(
+                    self.squared_norms[rows] - 2 * target_products[rows] + target_norm**2, 0
+                )
+            )
+            slack = RADIUS_SLACK * (1 + target_norm)
+            lower_bounds = target_distances - self.errors[rows] - slack
+
+            bound = np.inf if radius is None else radius
+            if k is not None and k < rows.shape[0]:
+                upper_bounds = target_distances + self.errors[rows] + slack
+                bound = min(bound, np.partition(upper_bounds, k - 1)[k - 1])
+
+            if np.isfinite(bound):
+                selected = np.flatnonzero(lower_bounds <= bound)
+            else:
+                shortlist = min(nprobe or 64, rows.shape[0])
+                selected = np.argpartition(target_distances, shortlist - 1)[:shortlist]
+            candidates.append(np.sort(rows[selected]))
+        return candidates
+
+    def train(self, embeddings: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Fit quantization parameters to the embeddings
+        """
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Quantize float32 vectors with shape (n, D)
+        """
+
+    @abstractmethod
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Restore float32 vectors from codes with shape (n, D)
+        """
+
+    @abstractmethod
+    def inner_products(self, vectors: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Inner products with shape (m, n) of float32 vectors with shape (m, D) and the decoded
+            vectors of codes with shape (n, D), calculated without decoding the codes
+        """
+
+    @staticmethod
+    def get_files(index_path: str) -> List[str]:
+        return [index_path + ".npz"]
+
+    def save(self, index_path: str) -> None:
+        file_path = self.get_files(index_path)[0]
+        with open(file_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                space=np.array(self.space),
+                codes=self.codes,
+                squared_norms=self.squared_norms,
+                errors=self.errors,
+                **self.get_parameters(),
+            )
+        os.replace(file_path + ".tmp", file_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "QuantizedIndex":
+        with np.load(cls.get_files(index_path)[0], allow_pickle=False) as npz:
+            index = cls(space=str(npz["space"]))
+            index.codes = npz["codes"]
+            index.squared_norms = npz["squared_norms"]
+            index.errors = npz["errors"]
+            index.set_parameters({key: npz[key] for key in npz.files})
+        return index
+
+    def get_parameters(self) -> Dict[str, np.ndarray]:
+        """
+        Quantization parameters to store
+        """
+        return {}
+
+    def set_parameters(self, parameters: Dict[str, np.ndarray]) -> None:
+        """
+        Restore stored quantization parameters
+        """
+
+    def __add(self, embeddings: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Quantize rows appended after the current codes
+        """
+        start = self.size
+        codes = np.zeros((valid.shape[0] - start, embeddings.shape[1]), dtype=self.dtype)
+        squared_norms = np.zeros(codes.shape[0], dtype=np.float32)
+        errors = np.full(codes.shape[0], np.inf, dtype=np.float32)
+
+        for offset in range(0, codes.shape[0], CHUNK_SIZE):
+            chunk = slice(offset, offset + CHUNK_SIZE)
+            vectors = self.prepare(embeddings[start + offset : start + offset + CHUNK_SIZE])
+            codes[chunk] = self.encode(vectors)
+            decoded = self.decode(codes[chunk])
+            squared_norms[chunk] = np.einsum("ij,ij->i", decoded, decoded)
+            errors[chunk] = np.linalg.norm(vectors - decoded, axis=1)
+
+        errors[~valid[start:]] = np.inf
+        self.codes = np.concatenate([self.codes, codes])
+        self.squared_norms = np.concatenate([self.squared_norms, squared_norms])
+        self.errors = np.concatenate([self.errors, errors])
+
+
+class Int8Index(QuantizedIndex):
+    """
+    Embeddings quantized to 256 levels between the minimum and maximum of each dimension,
+        quartering the memory scanned
+    """
+
+    index_type = "int8"
+    dtype = np.int8
+
+    def __init__(self, space: str):
+        super().__init__(space)
+        self.minimums = np.zeros((0,), dtype=np.float32)
+        self.scales = np.zeros((0,), dtype=np.float32)
+        # number of vectors when quantization ranges were fit
+        self.trained_size = 0
+
+    def update(
+        self,
+        keep_mask: np.ndarray,
+        embeddings: np.ndarray,
+        valid: np.ndarray,
+        identities: np.ndarray,
+    ) -> None:
+        # fit ranges again if the gallery outgrew the data they were fit on
+        if self.trained_size == 0 or valid.sum() > 8 * self.trained_size:
+            self.build(embeddings, valid, identities)
+            return
+        super().update(keep_mask, embeddings, valid, identities)
+
+    def train(self, embeddings: np.ndarray, valid: np.ndarray) -> None:
+        minimums = np.full(embeddings.shape[1], np.inf, dtype=np.float32)
+        maximums = np.full(embeddings.shape[1], -np.inf, dtype=np.float32)
+        for start in range(0, valid.shape[0], CHUNK_SIZE):
+            chunk_valid = valid[start : start + CHUNK_SIZE]
+            if not chunk_valid.any():
+                continue
+            vectors = self.prepare(embeddings[start : start + CHUNK_SIZE])[chunk_valid]
+            minimums = np.minimum(minimums, vectors.min(axis=0))
+            maximums = np.maximum(maximums, vectors.max(axis=0))
+
+        self.trained_size = int(valid.sum())
+        if self.trained_size == 0:
+            minimums = maximums = np.zeros(embeddings.shape[1], dtype=np.float32)
+        self.minimums = minimums
+        spans = maximums - minimums
+        self.scales = np.where(spans > 0, spans / 255, 1).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        levels = np.rint((vectors - self.minimums) / self.scales)
+        # vectors added after training may fall out of the range, error bounds cover them
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128) * self.scales + self.minimums
+
+    def inner_products(self, vectors: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # scales are folded into the vectors and the offset of the levels into one term per
+        # vector, so that codes are only converted to float32 for the matrix product
+        offsets = vectors @ (self.minimums + 128 * self.scales)
+        return (vectors * self.scales) @ codes.astype(np.float32).T + offsets[:, None]
+
+    def get_parameters(self) -> Dict[str, np.ndarray]:
+        return {
+            "minimums": self.minimums,
+            "scales": self.scales,
+            "trained_size": np.array(self.trained_size),
+        }
+
+    def set_parameters(self, parameters: Dict[str, np.ndarray]) -> None:
+        self.minimums = parameters["minimums"]
+        self.scales = parameters["scales"]
+        self.trained_size = int(parameters["trained_size"])
+
+
+INDEXES: Dict[str, Type[AnnIndex]] = {
+    "ivf": IvfIndex,
+    "hnsw": HnswIndex,
+    "identity": IdentityIndex,
+    "int8": Int8Index,
+    "pq": PqIndex,
+}
+
+
+def get_space(distance_metric: str) -> str:
+    """
+    Find the vector space of an index serving a distance metric. Cosine and euclidean_l2
+        distances rank normalized vectors in the same order, so they share an index.
+    Args:
+        distance_metric (str): cosine, euclidean or euclidean_l2
+    Returns:
+        space (str): cosine or l2
+    """
+    if distance_metric in ("cosine", "euclidean_l2"):
+        return "cosine"
+    if distance_metric == "euclidean":
+        return "l2"
+    raise ValueError("Invalid distance_metric passed - ", distance_metric)
+
+
+def get_radius(distance_metric: str, threshold: float) -> float:
+    """
+    Convert a distance threshold to the euclidean distance in the vector space of an index
+    Args:
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        threshold (float): maximum distance of a match
+    Returns:
+        radius (float): maximum euclidean distance of a match in the space of the index
+    """
+    if distance_metric == "cosine":
+        # squared euclidean distance between unit vectors is twice their cosine distance
+        return float(np.sqrt(2 * max(threshold, 0)))
+    if distance_metric in ("euclidean", "euclidean_l2"):
+        return float(threshold)
+    raise ValueError("Invalid distance_metric passed - ", distance_metric)
+
+
+def get_index_path(datastore_path: str, index_type: str, space: str) -> str:
+    """
+    Find the path of an index stored next to the datastore, without extension
+    """
+    return f"{datastore_path}_{index_type}_{space}"
+
+
+def load_index(
+    datastore_path: str,
+    datastore: datastore_utils.Datastore,
+    index_type: str,
+    distance_metric: str,
+    silent: bool = False,
+) -> AnnIndex:
+    """
+    Load the index of a datastore, build and store it first if it does not exist yet
+    Args:
+        datastore_path (str): datastore path without extension
+        datastore (Datastore): datastore in sync with the files on disk
+        index_type (str): ivf, hnsw, identity, int8 or pq
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        silent (bool): enable or disable informative logging
+    Returns:
+        index (AnnIndex)
+    """
+    index_class = INDEXES.get(index_type)
+    if index_class is None:
+        raise ValueError(
+            f"Invalid index passed - {index_type}. Options: {', '.join(INDEXES.keys())}"
+        )
+
+    space = get_space(distance_metric)
+    index_path = get_index_path(datastore_path, index_type, space)
+
+    index = __get_index(index_class, index_path)
+    if index is not None and index.size == len(datastore):
+        return index
+
+    if not silent:
+        logger.info(f"Building {index_type} index for {len(datastore)} representations")
+
+    index = index_class(space=space)
+    index.build(_DatastoreVectors(datastore, space), datastore.valid, datastore.identities)
+    __put_index(index, index_path)
+    return index
+
+
+def update_indexes(
+    datastore_path: str, keep_mask: Optional[np.ndarray], datastore: datastore_utils.Datastore
+) -> None:
+    """
+    Synchronize every index stored next to a datastore with its latest changes
+    Args:
+        datastore_path (str): datastore path without extension
+        keep_mask (np.ndarray): rows kept from the datastore before change. None if rows
+            changed in an unknown way, e.g. by another writer as well.
+        datastore (Datastore): changed datastore. Its rows are the kept rows
+            followed by the newly added ones.
+    """
+    for index_type, index_class in INDEXES.items():
+        for space in ["cosine", "l2"]:
+            index_path = get_index_path(datastore_path, index_type, space)
+            index = __get_index(index_class, index_path)
+            if index is None:
+                continue
+
+            if keep_mask is None or index.size != keep_mask.shape[0]:
+                # out of sync, it will be rebuilt when it is required next time
+                for file_path in index_class.get_files(index_path):
+                    os.remove(file_path)
+                with _index_cache_lock:
+                    _index_cache.pop(index_path, None)
+                continue
+
+            index.update(
+                keep_mask,
+                _DatastoreVectors(datastore, space),
+                datastore.valid,
+                datastore.identities,
+            )
+            __put_index(index, index_path)
+
+
+class _DatastoreVectors:
+    """
+    Embeddings of a datastore as an index expects them, read on slicing. Datastores keep
+        normalized embeddings, which are scaled back by their norms for the l2 space.
+    """
+
+    def __init__(self, datastore: datastore_utils.Datastore, space: str):
+        self.datastore = datastore
+        self.space = space
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.datastore.embeddings.shape
+
+    def __len__(self) -> int:
+        return len(self.datastore)
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        vectors = np.asarray(self.datastore.embeddings[key], dtype=np.float32)
+        if self.space == "cosine":
+            return vectors
+        return vectors * self.datastore.norms[key][:, None]
+
+
+def __get_index(index_class: Type[AnnIndex], index_path: str) -> Optional[AnnIndex]:
+    """
+    Load an index from the in-memory cache if its files have not changed, otherwise from disk
+    """
+    signature = datastore_utils.find_signature(index_class.get_files(index_path))
+    if signature is None:
+        return None
+
+    with _index_cache_lock:
+        cached = _index_cache.get(index_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    index = index_class.load(index_path)
+    with _index_cache_lock:
+        _index_cache[index_path] = (signature, index)
+    return index
+
+
+def __put_index(index: AnnIndex, index_path: str) -> None:
+    """
+    Store an index on disk and keep it in memory
+    """
+    index.save(index_path)
+    signature = datastore_utils.find_signature(index.get_files(index_path))
+    with _index_cache_lock:
+        _index_cache[index_path] = (signature, index)
+
+
+def _squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Squared euclidean distances between rows of two matrices, up to a per-row constant
+        which does not change the order of centroids
+    """
+    return np.sum(centroids**2, axis=1)[None, :] - 2 * np.dot(vectors, centroids.T)
+
+
+def _kmeans(vectors: np.ndarray, k: int, space: str, iterations: int = 10) -> np.ndarray:
+    """
+    Cluster vectors with Lloyd's algorithm
+    Args:
+        vectors (np.ndarray): training vectors with shape (n, D)
+        k (int): number of clusters
+        space (str): cosine for spherical k-means, l2 otherwise
+        iterations (int): number of iterations
+    Returns:
+        centroids (np.ndarray): cluster centers with shape (k, D)
+    """
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(vectors.shape[0], size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = np.argmin(_squared_distances(vectors, centroids), axis=1)
+
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        starts = np.cumsum(counts) - counts
+        filled = counts > 0
+
+        sums = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled][:, None]
+
+        # restart empty clusters from random points
+        if not filled.all():
+            centroids[~filled] = vectors[rng.choice(vectors.shape[0], size=(~filled).sum())]
+
+        if space == "cosine":
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-10
+
+    return centroids.astype(np.float32)
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+    except ModuleNotFoundError as e:
+        raise ImportError(
+            "hnswlib is an optional dependency for the hnsw index, ensure the library"
+            " is installed. Please install using 'pip install hnswlib'"
+        ) from e
+    return hnswlib
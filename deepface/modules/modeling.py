@@ -1,7 +1,9 @@
 # built-in dependencies
-from typing import Any
+import os
+from typing import Any, Optional
 
 # project dependencies
+from deepface.commons import onnx_utils, package_utils
 from deepface.models.facial_recognition import (
     VGGFace,
     OpenFace,
@@ -28,8 +30,18 @@ from deepface.models.face_detection import (
 from deepface.models.demography import Age, Gender, Race, Emotion
 from deepface.models.spoofing import FasNet
 
+tf_version = package_utils.get_tf_major_version()
+if tf_version == 2:
+    from tensorflow.keras.models import Model
+else:
+    from keras.models import Model
 
-def build_model(task: str, model_name: str) -> Any:
+BACKENDS = ["tensorflow", "onnx"]
+# tasks whose keras models can be exported to onnx
+ONNX_TASKS = ["facial_recognition", "facial_attribute"]
+
+
+def build_model(task: str, model_name: str, backend: Optional[str] = None) -> Any:
     """
     This function loads a pre-trained models as singletonish way
     Parameters:
@@ -41,6 +53,12 @@ def build_model(task: str, model_name: str) -> Any:
             - opencv, mtcnn, ssd, dlib, retinaface, mediapipe, yolov8, 'yolov11n',
                 'yolov11s', 'yolov11m', yunet, fastmtcnn or centerface for face detectors
             - Fasnet for spoofing
+        backend (str): inference backend of keras models, tensorflow or onnx. Onnx backend
+            exports facial recognition and facial attribute models to onnx once, stores the
+            export in the weights folder and runs it with onnx runtime on cpu. Once exported,
+            the keras model is not built anymore. Models not built with keras, e.g. Dlib and
+            SFace, keep their own runtime. Default is the DEEPFACE_INFERENCE_BACKEND
+            environment variable, or tensorflow if it is not set.
     Returns:
             built model class
     """
@@ -90,14 +108,75 @@ def build_model(task: str, model_name: str) -> Any:
     if models.get(task) is None:
         raise ValueError(f"unimplemented task - {task}")
 
+    backend = get_backend(backend)
+
+    # detectors and spoofing models are built once whatever the backend is
+    if task not in ONNX_TASKS:
+        backend = "tensorflow"
+
     if not "cached_models" in globals():
         cached_models = {current_task: {} for current_task in models.keys()}
 
-    if cached_models[task].get(model_name) is None:
+    key = model_name if backend == "tensorflow" else (model_name, backend)
+
+    if cached_models[task].get(key) is None:
         model = models[task].get(model_name)
         if model:
-            cached_models[task][model_name] = model()
+            if backend == "onnx":
+                cached_models[task][key] = __build_onnx_client(model, task, model_name)
+            else:
+                cached_models[task][key] = model()
         else:
             raise ValueError(f"Invalid model_name passed - {task}/{model_name}")
 
-    return cached_models[task][model_name]
+    return cached_models[task][key]
+
+
+def get_backend(backend: Optional[str] = None) -> str:
+    """
+    Find the inference backend of keras models
+    Parameters:
+        backend (str): tensorflow or onnx. Default is the DEEPFACE_INFERENCE_BACKEND
+            environment variable, or tensorflow if it is not set.
+    Returns:
+        backend (str): tensorflow or onnx
+    """
+    if backend is None:
+        backend = os.getenv("DEEPFACE_INFERENCE_BACKEND", "tensorflow")
+
+    if backend not in BACKENDS:
+        raise ValueError(f"unimplemented backend - {backend}, must be one of {BACKENDS}")
+
+    return backend
+
+
+def __build_onnx_client(client_class: Any, task: str, model_name: str) -> Any:
+    """
+    Build a client running its model with onnx runtime. The keras model is built and exported
+        on first use only, later the client is restored from the export.
+    Args:
+        client_class (type): FacialRecognition or Demography subclass
+        task (str): facial_recognition or facial_attribute
+        model_name (str): model identifier
+    Returns:
+        client (FacialRecognition or Demography): built client
+    """
+    model_path = onnx_utils.get_model_path(task, model_name)
+
+    attributes = onnx_utils.load_attributes(model_path)
+    if attributes is not None:
+        # skip building the keras graph and loading its weights
+        client = client_class.__new__(client_class)
+        vars(client).update(attributes)
+        client.model = onnx_utils.OnnxModel(model_path)
+        return client
+
+    client = client_class()
+    if not isinstance(client.model, Model):
+        # e.g. Dlib and SFace run with their own libraries already
+        return client
+
+    attributes = {key: value for key, value in vars(client).items() if key != "model"}
+    onnx_utils.export(client.model, model_path, attributes)
+    client.model = onnx_utils.OnnxModel(model_path)
+    return client
@@ -1,21 +1,35 @@
 # built-in dependencies
 import os
-import pickle
-from typing import List, Union, Optional, Dict, Any, Set
+import dataclasses
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import List, Union, Optional, Dict, Any, Set, Tuple, Iterable, Iterator
 import time
 
 # 3rd party dependencies
+import cv2
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 # project dependencies
-from deepface.commons import image_utils
-from deepface.modules import representation, detection, verification
+from deepface.commons import image_utils, datastore_utils
+from deepface.modules import representation, detection, verification, indexing, modeling
 from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# in-memory datastores keyed on datastore path, least recently used first
+_datastore_cache: "OrderedDict[str, Tuple[Tuple, datastore_utils.Datastore, int]]" = OrderedDict()
+_datastore_cache_lock = threading.Lock()
+_datastore_cache_max_bytes = int(os.getenv("DEEPFACE_DATASTORE_CACHE_BYTES", str(2 * 1024**3)))
+
+# distances are reported rounded to 6 decimals, thresholds are compared at that precision
+THRESHOLD_TOLERANCE = 5e-7
+
 
 def find(
     img_path: Union[str, np.ndarray],
@@ -32,7 +46,15 @@ def find(
     refresh_database: bool = True,
     anti_spoofing: bool = False,
     batched: bool = False,
-) -> Union[List[pd.DataFrame], List[List[Dict[str, Any]]]]:
+    index: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    workers: int = 1,
+    block_size: Optional[int] = None,
+    return_format: str = "dicts",
+) -> Union[List[pd.DataFrame], List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
     """
     Identify individuals in a database
 
@@ -71,15 +93,62 @@ def find(
 
         silent (boolean): Suppress or allow some log messages for a quieter analysis process.
 
-        refresh_database (boolean): Synchronizes the images representation (pkl) file with the
-            directory/db files, if set to false, it will ignore any file changes inside the db_path
-            directory (default is True).
+        refresh_database (boolean): Synchronizes the images representation (datastore) files
+            with the directory/db files, if set to false, it will ignore any file changes inside
+            the db_path directory (default is True).
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        index (string): Approximate nearest neighbour index to nominate candidates instead of
+            comparing against every item in the database. Options: 'ivf', 'hnsw', 'identity',
+            'int8', 'pq'. The identity index groups images by their directory, e.g. one folder
+            per person, and only compares against members of the people with the closest
+            centroids. The int8 index scans embeddings quantized to one byte per dimension,
+            4 times smaller, and compares the shortlist exactly without losing any match.
+            The pq index scans product quantized codes of one byte per 8 dimensions.
+            With int8 and pq the float32 embeddings are not kept in memory, they
+            stay memory mapped and only the rows of the shortlist are read from disk.
+            Changes recorded since the last snapshot are compacted into it first.
+            The index is stored next to the representations and kept in sync with them.
+            Default is None for exact search.
+
+        nprobe (int): Search effort of the index. Number of clusters to scan for ivf
+            (default is 8), size of the dynamic candidate list for hnsw (default is 64) or
+            number of people to scan for identity (default is 8). People too far away to
+            have any image under the threshold are never scanned. Number of closest items
+            compared exactly for pq (default is 256). Not used by int8.
+            Higher values increase recall and latency.
+
+        top_k (int): Return at most this many closest identities under the threshold for each
+            detected face. Default is None to return all of them.
+
+        refresh_mode (string): How refresh_database detects changes. Options: 'files' checks
+            every image's properties, 'directories' skips directories whose entries did not
+            change since the previous call, using a manifest stored next to the representations.
+            The latter does not detect images overwritten in place under the same name
+            (default is files).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass while
+            representing new images in db_path (default is 32).
+
+        workers (int): Number of processes representing new images in db_path. Each process
+            loads its own detector and facial recognition model. Processes are spawned, so the
+            calling script must be guarded with `if __name__ == "__main__":` (default is 1).
+
+        block_size (int): Number of items in db_path compared at once. If set, the database
+            is scanned block by block, keeping only the matches of each face found so far,
+            so that memory is bounded by the block size and the number of matches instead
+            of the database size. Representations are read from disk as they are scanned,
+            use refresh_database=False for databases larger than memory. Default is None to
+            compare against all items at once.
+
+        return_format (string): Format of the matches of each face if batched is True.
+            Options: 'dicts' returns a list of dicts, one for each match. 'arrays' returns
+            a single dict of numpy arrays, one for each key, where source_x, source_y,
+            source_w, source_h and threshold are stored once as scalars (default is dicts).
 
     Returns:
-        results (List[pd.DataFrame] or List[List[Dict[str, Any]]]):
+        results (List[pd.DataFrame] or List[List[Dict[str, Any]]] or List[Dict[str, Any]]):
             A list of pandas dataframes (if `batched=False`) or
             a list of dicts (if `batched=True`).
             Each dataframe or dict corresponds to the identity information for
@@ -109,137 +178,33 @@ def find(
 
     tic = time.time()
 
-    if not os.path.isdir(db_path):
-        raise ValueError(f"Passed path {db_path} does not exist!")
+    __validate_search_arguments(
+        db_path, top_k, refresh_mode, batch_size, workers, block_size, return_format
+    )
 
     img, _ = image_utils.load_image(img_path)
     if img is None:
         raise ValueError(f"Passed image path {img_path} does not exist!")
 
-    file_parts = [
-        "ds",
-        "model",
-        model_name,
-        "detector",
-        detector_backend,
-        "aligned" if align else "unaligned",
-        "normalization",
-        normalization,
-        "expand",
-        str(expand_percentage),
-    ]
-
-    file_name = "_".join(file_parts) + ".pkl"
-    file_name = file_name.replace("-", "").lower()
-
-    datastore_path = os.path.join(db_path, file_name)
-    representations = []
-
-    # required columns for representations
-    df_cols = {
-        "identity",
-        "hash",
-        "embedding",
-        "target_x",
-        "target_y",
-        "target_w",
-        "target_h",
-    }
-
-    # Ensure the proper pickle file exists
-    if not os.path.exists(datastore_path):
-        with open(datastore_path, "wb") as f:
-            pickle.dump([], f, pickle.HIGHEST_PROTOCOL)
-
-    # Load the representations from the pickle file
-    with open(datastore_path, "rb") as f:
-        representations = pickle.load(f)
-
-    # check each item of representations list has required keys
-    for i, current_representation in enumerate(representations):
-        missing_keys = df_cols - set(current_representation.keys())
-        if len(missing_keys) > 0:
-            raise ValueError(
-                f"{i}-th item does not have some required keys - {missing_keys}."
-                f"Consider to delete {datastore_path}"
-            )
-
-    # Get the list of images on storage
-    storage_images = set(image_utils.yield_images(path=db_path))
-
-    if len(storage_images) == 0 and refresh_database is True:
-        raise ValueError(f"No item found in {db_path}")
-    if len(representations) == 0 and refresh_database is False:
-        raise ValueError(f"Nothing is found in {datastore_path}")
-
-    must_save_pickle = False
-    new_images, old_images, replaced_images = set(), set(), set()
-
-    if not refresh_database:
-        logger.info(
-            f"Could be some changes in {db_path} not tracked."
-            "Set refresh_database to true to assure that any changes will be tracked."
-        )
-
-    # Enforce data consistency amongst on disk images and pickle file
-    if refresh_database:
-        # embedded images
-        pickled_images = {
-            representation["identity"] for representation in representations
-        }
-
-        new_images = storage_images - pickled_images  # images added to storage
-        old_images = pickled_images - storage_images  # images removed from storage
-
-        # detect replaced images
-        for current_representation in representations:
-            identity = current_representation["identity"]
-            if identity in old_images:
-                continue
-            alpha_hash = current_representation["hash"]
-            beta_hash = image_utils.find_image_hash(identity)
-            if alpha_hash != beta_hash:
-                logger.debug(f"Even though {identity} represented before, it's replaced later.")
-                replaced_images.add(identity)
-
-    if not silent and (len(new_images) > 0 or len(old_images) > 0 or len(replaced_images) > 0):
-        logger.info(
-            f"Found {len(new_images)} newly added image(s)"
-            f", {len(old_images)} removed image(s)"
-            f", {len(replaced_images)} replaced image(s)."
-        )
-
-    # append replaced images into both old and new images. these will be dropped and re-added.
-    new_images.update(replaced_images)
-    old_images.update(replaced_images)
-
-    # remove old images first
-    if len(old_images) > 0:
-        representations = [rep for rep in representations if rep["identity"] not in old_images]
-        must_save_pickle = True
-
-    # find representations for new images
-    if len(new_images) > 0:
-        representations += __find_bulk_embeddings(
-            employees=new_images,
-            model_name=model_name,
-            detector_backend=detector_backend,
-            enforce_detection=enforce_detection,
-            align=align,
-            expand_percentage=expand_percentage,
-            normalization=normalization,
-            silent=silent,
-        )  # add new images
-        must_save_pickle = True
-
-    if must_save_pickle:
-        with open(datastore_path, "wb") as f:
-            pickle.dump(representations, f, pickle.HIGHEST_PROTOCOL)
-        if not silent:
-            logger.info(f"There are now {len(representations)} representations in {file_name}")
+    datastore, ann_index, file_name = __prepare_search(
+        db_path=db_path,
+        model_name=model_name,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        silent=silent,
+        refresh_database=refresh_database,
+        index=index,
+        refresh_mode=refresh_mode,
+        batch_size=batch_size,
+        workers=workers,
+    )
 
     # Should we have no representations bailout
-    if len(representations) == 0:
+    if len(datastore) == 0:
         if not silent:
             toc = time.time()
             logger.info(f"find function duration {toc - tic} seconds")
@@ -261,7 +226,7 @@ def find(
 
     if batched:
         return find_batched(
-            representations,
+            datastore,
             source_objs,
             model_name,
             distance_metric,
@@ -270,12 +235,15 @@ def find(
             threshold,
             normalization,
             anti_spoofing,
+            ann_index,
+            nprobe,
+            top_k,
+            block_size,
+            return_format,
         )
 
-    df = pd.DataFrame(representations)
-
     if silent is False:
-        logger.info(f"Searching {img_path} in {df.shape[0]} length datastore")
+        logger.info(f"Searching {img_path} in {len(datastore)} length datastore")
 
     resp_obj = []
 
@@ -291,58 +259,951 @@ def find(
             detector_backend="skip",
             align=align,
             normalization=normalization,
+            output="numpy",
         )
 
-        target_representation = target_embedding_obj[0]["embedding"]
+        target_representation = np.asarray(target_embedding_obj[0]["embedding"])
+        __validate_dimensions(target_representation[None, :], datastore, file_name)
 
-        result_df = df.copy()  # df will be filtered in each img
-        result_df["source_x"] = source_region["x"]
-        result_df["source_y"] = source_region["y"]
-        result_df["source_w"] = source_region["w"]
-        result_df["source_h"] = source_region["h"]
-
-        distances = []
-        for _, instance in df.iterrows():
-            source_representation = instance["embedding"]
-            if source_representation is None:
-                distances.append(float("inf"))  # no representation for this image
-                continue
+        target_threshold = threshold or verification.find_threshold(model_name, distance_metric)
 
-            target_dims = len(list(target_representation))
-            source_dims = len(list(source_representation))
-            if target_dims != source_dims:
-                raise ValueError(
-                    "Source and target embeddings must have same dimensions but "
-                    + f"{target_dims}:{source_dims}. Model structure may change"
-                    + " after pickle created. Delete the {file_name} and re-run."
+        rows, distances = __find_distances(
+            datastore=datastore,
+            target_embeddings=target_representation[None, :],
+            distance_metric=distance_metric,
+            ann_index=ann_index,
+            nprobe=nprobe,
+            top_k=top_k,
+            threshold=target_threshold,
+            block_size=block_size,
+        )[0]
+
+        # build the dataframe for matching rows only
+        resp_obj.append(
+            pd.DataFrame(
+                __match_columns(
+                    datastore, rows, distances, source_region, target_threshold, top_k
                 )
+            )
+        )
+
+    # -----------------------------------
+
+    if not silent:
+        toc = time.time()
+        logger.info(f"find function duration {toc - tic} seconds")
 
-            distance = verification.find_distance(
-                source_representation, target_representation, distance_metric
+    return resp_obj
+
+
+def find_many(
+    img_paths: Iterable[Union[str, np.ndarray]],
+    db_path: str,
+    model_name: str = "VGG-Face",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    threshold: Optional[float] = None,
+    normalization: str = "base",
+    silent: bool = False,
+    refresh_database: bool = True,
+    anti_spoofing: bool = False,
+    batched: bool = False,
+    index: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    workers: int = 1,
+    block_size: Optional[int] = None,
+    chunk_size: int = 256,
+    return_format: str = "dicts",
+) -> Iterator[Union[List[pd.DataFrame], List[List[Dict[str, Any]]], List[Dict[str, Any]]]]:
+    """
+    Identify individuals of many probe images in a database. The database is loaded and
+        refreshed once, then probes are processed in chunks: faces of a chunk are represented
+        in batches and compared against the database with a single distance matrix.
+
+    Args:
+        img_paths (iterable): probe images, each one is an exact path to the image,
+            a numpy array in BGR format, or a base64 encoded image. The iterable is consumed
+            lazily, chunk by chunk.
+
+        chunk_size (int): Number of probes searched together (default is 256).
+
+        Other arguments are the same as find's.
+
+    Returns:
+        results (iterator): yields what find returns for each probe, in the order of
+            img_paths, as soon as the chunk of the probe is searched.
+    """
+    __validate_search_arguments(
+        db_path, top_k, refresh_mode, batch_size, workers, block_size, return_format
+    )
+
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer but it is {chunk_size}")
+
+    datastore, ann_index, file_name = __prepare_search(
+        db_path=db_path,
+        model_name=model_name,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        silent=silent,
+        refresh_database=refresh_database,
+        index=index,
+        refresh_mode=refresh_mode,
+        batch_size=batch_size,
+        workers=workers,
+    )
+
+    return __find_many(
+        img_paths=iter(img_paths),
+        datastore=datastore,
+        ann_index=ann_index,
+        file_name=file_name,
+        model_name=model_name,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        threshold=threshold,
+        normalization=normalization,
+        anti_spoofing=anti_spoofing,
+        batched=batched,
+        nprobe=nprobe,
+        top_k=top_k,
+        batch_size=batch_size,
+        block_size=block_size,
+        chunk_size=chunk_size,
+        return_format=return_format,
+    )
+
+
+def __find_many(
+    img_paths: Iterator[Union[str, np.ndarray]],
+    datastore: datastore_utils.Datastore,
+    ann_index: Optional[indexing.AnnIndex],
+    file_name: str,
+    model_name: str,
+    distance_metric: str,
+    enforce_detection: bool,
+    detector_backend: str,
+    align: bool,
+    expand_percentage: int,
+    threshold: Optional[float],
+    normalization: str,
+    anti_spoofing: bool,
+    batched: bool,
+    nprobe: Optional[int],
+    top_k: Optional[int],
+    batch_size: int,
+    block_size: Optional[int],
+    chunk_size: int,
+    return_format: str,
+) -> Iterator[Union[List[pd.DataFrame], List[List[Dict[str, Any]]], List[Dict[str, Any]]]]:
+    """
+    Search chunks of probes in a loaded datastore, see find_many
+    """
+    target_threshold = threshold or verification.find_threshold(model_name, distance_metric)
+
+    while True:
+        chunk = list(islice(img_paths, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        if len(datastore) == 0:
+            for _ in chunk:
+                yield []
+            continue
+
+        # faces of all probes in the chunk, and the probe each face belongs to
+        source_objs = []
+        owners = []
+        for i, img_path in enumerate(chunk):
+            img, _ = image_utils.load_image(img_path)
+            if img is None:
+                raise ValueError(f"Passed image path {img_path} does not exist!")
+
+            for source_obj in detection.extract_faces(
+                img_path=img,
+                detector_backend=detector_backend,
+                grayscale=False,
+                enforce_detection=enforce_detection,
+                align=align,
+                expand_percentage=expand_percentage,
+                anti_spoofing=anti_spoofing,
+            ):
+                if anti_spoofing is True and source_obj.get("is_real", True) is False:
+                    raise ValueError("Spoof detected in the given image.")
+                source_objs.append(source_obj)
+                owners.append(i)
+
+        results: List[list] = [[] for _ in chunk]
+        if len(source_objs) > 0:
+            target_embeddings = np.asarray(
+                representation.represent_faces(
+                    faces=[source_obj["face"] for source_obj in source_objs],
+                    model_name=model_name,
+                    normalization=normalization,
+                    batch_size=batch_size,
+                )
+            )  # (M, D)
+            __validate_dimensions(target_embeddings, datastore, file_name)
+
+            candidates = __find_distances(
+                datastore=datastore,
+                target_embeddings=target_embeddings,
+                distance_metric=distance_metric,
+                ann_index=ann_index,
+                nprobe=nprobe,
+                top_k=top_k,
+                threshold=target_threshold,
+                block_size=block_size,
             )
 
-            distances.append(distance)
+            for owner, source_obj, (rows, distances) in zip(owners, source_objs, candidates):
+                columns = __match_columns(
+                    datastore,
+                    rows,
+                    distances,
+                    source_obj["facial_area"],
+                    target_threshold,
+                    top_k,
+                )
+                if batched:
+                    results[owner].append(__format_matches(columns, return_format))
+                else:
+                    results[owner].append(pd.DataFrame(columns))
 
-            # ---------------------------
-        target_threshold = threshold or verification.find_threshold(model_name, distance_metric)
+        yield from results
 
-        result_df["threshold"] = target_threshold
-        result_df["distance"] = distances
 
-        result_df = result_df.drop(columns=["embedding"])
-        # pylint: disable=unsubscriptable-object
-        result_df = result_df[result_df["distance"] <= target_threshold]
-        result_df = result_df.sort_values(by=["distance"], ascending=True).reset_index(drop=True)
+def __validate_search_arguments(
+    db_path: str,
+    top_k: Optional[int],
+    refresh_mode: str,
+    batch_size: int,
+    workers: int,
+    block_size: Optional[int],
+    return_format: str,
+) -> None:
+    """
+    Raise ValueError for invalid arguments of find and find_many
+    """
+    if top_k is not None and top_k < 1:
+        raise ValueError(f"top_k must be a positive integer but it is {top_k}")
 
-        resp_obj.append(result_df)
+    if refresh_mode not in ("files", "directories"):
+        raise ValueError(
+            f"refresh_mode must be one of files or directories but it is {refresh_mode}"
+        )
 
-    # -----------------------------------
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer but it is {batch_size}")
 
-    if not silent:
-        toc = time.time()
-        logger.info(f"find function duration {toc - tic} seconds")
+    if workers < 1:
+        raise ValueError(f"workers must be a positive integer but it is {workers}")
 
-    return resp_obj
+    if block_size is not None and block_size < 1:
+        raise ValueError(f"block_size must be a positive integer but it is {block_size}")
+
+    __validate_return_format(return_format)
+
+    if not os.path.isdir(db_path):
+        raise ValueError(f"Passed path {db_path} does not exist!")
+
+
+def __validate_return_format(return_format: str) -> None:
+    """
+    Raise ValueError for an unknown format of batched results
+    """
+    if return_format not in ("dicts", "arrays"):
+        raise ValueError(f"return_format must be one of dicts or arrays but it is {return_format}")
+
+
+def __prepare_search(
+    db_path: str,
+    model_name: str,
+    distance_metric: str,
+    enforce_detection: bool,
+    detector_backend: str,
+    align: bool,
+    expand_percentage: int,
+    normalization: str,
+    silent: bool,
+    refresh_database: bool,
+    index: Optional[str],
+    refresh_mode: str,
+    batch_size: int,
+    workers: int,
+) -> Tuple[datastore_utils.Datastore, Optional[indexing.AnnIndex], str]:
+    """
+    Load the datastore of a database, refreshing it if requested, and its index
+    Returns:
+        datastore (Datastore): facial database
+        ann_index (AnnIndex): approximate nearest neighbour index if requested
+        file_name (str): file name prefix of the datastore
+    """
+    file_name = datastore_utils.get_datastore_name(
+        model_name=model_name,
+        detector_backend=detector_backend,
+        align=align,
+        normalization=normalization,
+        expand_percentage=expand_percentage,
+    )
+    datastore_path = os.path.join(db_path, file_name)
+
+    # compressed indexes scan their own codes, so the float32 embeddings are served from a
+    # compacted snapshot and stay memory mapped, only the rows nominated are read from disk
+    index_class = indexing.INDEXES.get(index) if index is not None else None
+    compressed = index_class is not None and index_class.compressed
+    if compressed:
+        datastore_utils.compact(datastore_path)
+
+    datastore = __load_datastore(datastore_path, silent=silent, materialize=not compressed)
+
+    if refresh_database:
+        # Enforce data consistency amongst on disk images and datastore
+        datastore = __refresh_datastore(
+            datastore_path=datastore_path,
+            datastore=datastore,
+            db_path=db_path,
+            model_name=model_name,
+            detector_backend=detector_backend,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            silent=silent,
+            refresh_mode=refresh_mode,
+            batch_size=batch_size,
+            workers=workers,
+            cache=not compressed,
+        )
+        if compressed:
+            # changes were recorded in the journal, whose items are held in memory
+            datastore_utils.compact(datastore_path)
+            datastore = __load_datastore(datastore_path, silent=silent, materialize=False)
+    else:
+        if len(datastore) == 0:
+            raise ValueError(f"Nothing is found in {datastore_path}")
+        logger.info(
+            f"Could be some changes in {db_path} not tracked."
+            "Set refresh_database to true to assure that any changes will be tracked."
+        )
+
+    ann_index = None
+    if index is not None and len(datastore) > 0:
+        ann_index = indexing.load_index(
+            datastore_path=datastore_path,
+            datastore=datastore,
+            index_type=index,
+            distance_metric=distance_metric,
+            silent=silent,
+        )
+
+    return datastore, ann_index, file_name
+
+
+def __validate_dimensions(
+    target_embeddings: np.ndarray, datastore: datastore_utils.Datastore, file_name: str
+) -> None:
+    """
+    Raise ValueError if embeddings of source faces and the datastore are not comparable
+    """
+    target_dims = target_embeddings.shape[1]
+    source_dims = datastore.dimensions
+    if source_dims not in (0, target_dims):
+        raise ValueError(
+            "Source and target embeddings must have same dimensions but "
+            + f"{target_dims}:{source_dims}. Model structure may change"
+            + f" after datastore created. Delete the {file_name} files and re-run."
+        )
+
+
+def __match_columns(
+    datastore: datastore_utils.Datastore,
+    rows: np.ndarray,
+    distances: np.ndarray,
+    source_region: Dict[str, Any],
+    threshold: float,
+    top_k: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Columns of the items matching a source face, sorted by distance
+    Args:
+        datastore (Datastore): facial database
+        rows (np.ndarray): compared row indices of the datastore
+        distances (np.ndarray): distances of the compared rows
+        source_region (dict): facial area of the source face
+        threshold (float): maximum distance of a match
+        top_k (int): maximum number of matches
+    Returns:
+        columns (dict): metadata of matching items, source region, threshold and distance.
+            Source region and threshold are the same for every match and stored once.
+    """
+    selected = __select_matches(distances, threshold, top_k)
+    columns: Dict[str, Any] = {
+        key: value[rows[selected]] for key, value in datastore.metadata.items()
+    }
+    columns.update(
+        {
+            "source_x": source_region["x"],
+            "source_y": source_region["y"],
+            "source_w": source_region["w"],
+            "source_h": source_region["h"],
+            "threshold": threshold,
+            "distance": __round_distances(distances[selected]),
+        }
+    )
+    return columns
+
+
+def __format_matches(
+    columns: Dict[str, Any], return_format: str
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Convert the columns of the matches of a source face into the batched result format
+    Args:
+        columns (dict): matches of a source face, see __match_columns
+        return_format (str): dicts or arrays
+    Returns:
+        matches (list or dict): a dict for each match if return_format is dicts,
+            the columns themselves if it is arrays
+    """
+    if return_format == "arrays":
+        return columns
+
+    matches = []
+    for j in range(columns["distance"].shape[0]):
+        matches.append(
+            {
+                key: value[j] if isinstance(value, np.ndarray) else value
+                for key, value in columns.items()
+            }
+        )
+    return matches
+
+
+def __find_distances(
+    datastore: datastore_utils.Datastore,
+    target_embeddings: np.ndarray,
+    distance_metric: str,
+    ann_index: Optional[indexing.AnnIndex] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    threshold: Optional[float] = None,
+    block_size: Optional[int] = None,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Find distances between target embeddings and the items of a datastore
+    Args:
+        datastore (Datastore): facial database
+        target_embeddings (np.ndarray): embeddings with shape (M, D)
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        ann_index (AnnIndex): compare against the candidates of this index only if given
+        nprobe (int): search effort of the index
+        top_k (int): number of closest items required
+        threshold (float): maximum distance of a match, required with block_size
+        block_size (int): scan the datastore in blocks of this many items, keeping only
+            the items which may be selected as matches
+    Returns:
+        results (List[Tuple[np.ndarray, np.ndarray]]): compared row indices of the datastore
+            and their distances for each target embedding. Distance is infinite for rows
+            without embedding.
+    """
+    if datastore.dimensions == 0:
+        # no face detected in any image of the datastore
+        rows = np.arange(len(datastore))
+        return [(rows, np.full(len(datastore), np.inf)) for _ in target_embeddings]
+
+    if ann_index is None and block_size is not None:
+        return __scan_distances(
+            datastore, target_embeddings, distance_metric, threshold, top_k, block_size
+        )
+
+    if ann_index is None:
+        rows = np.arange(len(datastore))
+        distances = verification.find_normalized_distance(
+            datastore.embeddings, datastore.norms, target_embeddings, distance_metric
+        )  # (M, N)
+        distances[:, ~datastore.valid] = np.inf
+        return [(rows, target_distances) for target_distances in distances]
+
+    radius = None
+    if threshold is not None:
+        radius = indexing.get_radius(distance_metric, threshold)
+
+    results = []
+    for target_embedding, candidates in zip(
+        target_embeddings, ann_index.search(target_embeddings, nprobe, top_k, radius)
+    ):
+        candidates = candidates[datastore.valid[candidates]]
+        distances = verification.find_normalized_distance(
+            datastore.embeddings[candidates],
+            datastore.norms[candidates],
+            target_embedding[None, :],
+            distance_metric,
+        )[0]
+        results.append((candidates, distances))
+    return results
+
+
+def __scan_distances(
+    datastore: datastore_utils.Datastore,
+    target_embeddings: np.ndarray,
+    distance_metric: str,
+    threshold: float,
+    top_k: Optional[int],
+    block_size: int,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Find distances between target embeddings and a datastore block by block. Only items
+        under the threshold, and amongst the closest k if top_k is given, are kept for each
+        target, so that memory is bounded by the block size instead of the datastore size.
+        Blocks of a memory mapped datastore are read from disk as they are scanned.
+    Returns:
+        results (List[Tuple[np.ndarray, np.ndarray]]): kept row indices of the datastore
+            in ascending order and their distances for each target embedding
+    """
+    bound = threshold + THRESHOLD_TOLERANCE
+    kept_rows: List[List[np.ndarray]] = [[] for _ in target_embeddings]
+    kept_distances: List[List[np.ndarray]] = [[] for _ in target_embeddings]
+
+    for start in range(0, len(datastore), block_size):
+        end = min(start + block_size, len(datastore))
+        block_distances = verification.find_normalized_distance(
+            datastore.embeddings[start:end],
+            datastore.norms[start:end],
+            target_embeddings,
+            distance_metric,
+        )  # (M, B)
+        block_distances[:, ~datastore.valid[start:end]] = np.inf
+
+        for i, distances in enumerate(block_distances):
+            rows = np.flatnonzero(distances <= bound)
+            kept_rows[i].append(rows + start)
+            kept_distances[i].append(distances[rows])
+
+            if top_k is not None and sum(part.shape[0] for part in kept_rows[i]) > top_k:
+                rows = np.concatenate(kept_rows[i])
+                distances = np.concatenate(kept_distances[i])
+                closest = np.sort(np.argpartition(distances, top_k - 1)[:top_k])
+                kept_rows[i] = [rows[closest]]
+                kept_distances[i] = [distances[closest]]
+
+    return [
+        (
+            np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+            np.concatenate(distances) if distances else np.empty(0, dtype=np.float32),
+        )
+        for rows, distances in zip(kept_rows, kept_distances)
+    ]
+
+
+def __select_matches(
+    distances: np.ndarray, threshold: float, top_k: Optional[int] = None
+) -> np.ndarray:
+    """
+    Select the items under threshold sorted by distance. If top_k is given, the
+        closest k items are partitioned in linear time and only those are sorted.
+    Args:
+        distances (np.ndarray): distances with shape (N,)
+        threshold (float): maximum distance of a match
+        top_k (int): maximum number of matches
+    Returns:
+        indices (np.ndarray): indices of matching items in distances
+    """
+    bound = threshold + THRESHOLD_TOLERANCE
+    if top_k is not None and top_k < distances.shape[0]:
+        candidates = np.argpartition(distances, top_k - 1)[:top_k]
+        candidates = candidates[distances[candidates] <= bound]
+    else:
+        candidates = np.flatnonzero(distances <= bound)
+    candidates = candidates[__round_distances(distances[candidates]) <= threshold]
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+
+def __round_distances(distances: np.ndarray) -> np.ndarray:
+    """
+    Round distances of matches as verification does, instead of the whole distance matrix
+    """
+    return np.round(distances.astype(np.float64), 6)
+
+
+def set_datastore_cache_size(max_bytes: int) -> None:
+    """
+    Set the memory budget of the in-memory datastore cache used by find.
+        Least recently used datastores are evicted when the budget is exceeded.
+        The default budget is 2 GB and it can also be set with the
+        DEEPFACE_DATASTORE_CACHE_BYTES environment variable.
+    Args:
+        max_bytes (int): budget in bytes. Set to 0 to disable caching.
+    """
+    global _datastore_cache_max_bytes
+    with _datastore_cache_lock:
+        _datastore_cache_max_bytes = max(int(max_bytes), 0)
+        __evict_datastores()
+
+
+def clear_datastore_cache() -> None:
+    """
+    Drop all datastores held in memory by find
+    """
+    with _datastore_cache_lock:
+        _datastore_cache.clear()
+
+
+def __get_datastore_size(datastore: datastore_utils.Datastore, materialize: bool = True) -> int:
+    arrays = [datastore.embeddings, datastore.norms, datastore.valid]
+    arrays.extend(datastore.metadata.values())
+    # memory mapped columns left as they are are paged in and out by the os
+    return sum(
+        array.nbytes for array in arrays if materialize or not isinstance(array, np.memmap)
+    )
+
+
+def __evict_datastores() -> None:
+    """
+    Drop least recently used datastores until the cache fits into its budget.
+        Caller must hold the cache lock.
+    """
+    total_bytes = sum(item[2] for item in _datastore_cache.values())
+    while _datastore_cache and total_bytes > _datastore_cache_max_bytes:
+        _, (_, _, size) = _datastore_cache.popitem(last=False)
+        total_bytes -= size
+
+
+def __cache_datastore(
+    datastore_path: str,
+    datastore: datastore_utils.Datastore,
+    signature: Optional[Tuple] = None,
+    materialize: bool = True,
+) -> None:
+    """
+    Keep a datastore in memory if it fits into the cache budget
+    Args:
+        datastore_path (str): datastore path without extension
+        datastore (Datastore): datastore in sync with the files on disk
+        signature (tuple): signature of the files on disk found before the datastore was
+            loaded from them. Files are checked now if it is not given.
+        materialize (bool): read memory mapped columns into memory, otherwise they are
+            cached as memory maps and do not count against the budget
+    """
+    key = os.path.abspath(datastore_path)
+    if signature is None:
+        signature = datastore_utils.find_datastore_signature(datastore_path)
+    size = __get_datastore_size(datastore, materialize)
+
+    with _datastore_cache_lock:
+        _datastore_cache.pop(key, None)
+        if signature is None or size > _datastore_cache_max_bytes:
+            return
+
+        if materialize:
+            # materialize memory mapped columns so that cache hits skip disk reads
+            datastore = dataclasses.replace(
+                datastore,
+                embeddings=__materialize(datastore.embeddings),
+                norms=__materialize(datastore.norms),
+                valid=__materialize(datastore.valid),
+                metadata={
+                    key: __materialize(value) for key, value in datastore.metadata.items()
+                },
+            )
+
+        # cached arrays are shared amongst callers
+        datastore.embeddings.flags.writeable = False
+
+        _datastore_cache[key] = (signature, datastore, size)
+        __evict_datastores()
+
+
+def __materialize(array: np.ndarray) -> np.ndarray:
+    return np.array(array) if isinstance(array, np.memmap) else array
+
+
+def __load_datastore(
+    datastore_path: str, silent: bool = False, materialize: bool = True
+) -> datastore_utils.Datastore:
+    """
+    Load the datastore from the in-memory cache if files on disk have not changed since
+        it was cached, otherwise from disk. The legacy pickle file is migrated if there is one.
+    Args:
+        datastore_path (str): datastore path without extension
+        silent (bool): enable or disable informative logging
+        materialize (bool): read memory mapped columns into memory, otherwise they stay
+            memory mapped in the cache
+    Returns:
+        datastore (Datastore)
+    """
+    key = os.path.abspath(datastore_path)
+    signature = datastore_utils.find_datastore_signature(datastore_path)
+
+    if signature is not None:
+        with _datastore_cache_lock:
+            cached = _datastore_cache.get(key)
+            if (
+                cached is not None
+                and cached[0] == signature
+                and (not materialize or not isinstance(cached[1].embeddings, np.memmap))
+            ):
+                _datastore_cache.move_to_end(key)
+                return cached[1]
+
+    if signature is not None:
+        datastore = datastore_utils.load(datastore_path)
+    else:
+        datastore = datastore_utils.migrate_pickle(datastore_path, silent=silent)
+        if datastore is None:
+            return datastore_utils.empty()
+
+    # files changed while loading are detected by the next call, as the signature predates them
+    __cache_datastore(datastore_path, datastore, signature, materialize)
+    return datastore
+
+
+def refresh_datastore(
+    db_path: str,
+    model_name: str = "VGG-Face",
+    detector_backend: str = "opencv",
+    enforce_detection: bool = True,
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    silent: bool = False,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    changed_paths: Optional[Set[str]] = None,
+) -> datastore_utils.Datastore:
+    """
+    Synchronize the datastore of a database with the images in it, and make the
+        synchronized datastore available to find calls in this process.
+
+    Args:
+        db_path (string): Path to the folder containing image files.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        detector_backend (string): face detector backend.
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+
+        align (boolean): Perform alignment based on the eye positions.
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process.
+
+        refresh_mode (string): How changes are detected. Options: 'files', 'directories'.
+
+        batch_size (int): Number of faces fed to the model in a single forward pass.
+
+        changed_paths (set): Images known to be modified, checked even if their directory
+            did not change. Useful to catch images overwritten in place with 'directories'.
+
+    Returns:
+        datastore (Datastore): synchronized datastore
+    """
+    file_name = datastore_utils.get_datastore_name(
+        model_name=model_name,
+        detector_backend=detector_backend,
+        align=align,
+        normalization=normalization,
+        expand_percentage=expand_percentage,
+    )
+    datastore_path = os.path.join(db_path, file_name)
+
+    return __refresh_datastore(
+        datastore_path=datastore_path,
+        datastore=__load_datastore(datastore_path, silent=silent),
+        db_path=db_path,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        enforce_detection=enforce_detection,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        silent=silent,
+        refresh_mode=refresh_mode,
+        batch_size=batch_size,
+        changed_paths=changed_paths,
+    )
+
+
+def __refresh_datastore(
+    datastore_path: str,
+    datastore: datastore_utils.Datastore,
+    db_path: str,
+    model_name: str,
+    detector_backend: str,
+    enforce_detection: bool,
+    align: bool,
+    expand_percentage: int,
+    normalization: str,
+    silent: bool,
+    refresh_mode: str = "files",
+    batch_size: int = 32,
+    workers: int = 1,
+    changed_paths: Optional[Set[str]] = None,
+    cache: bool = True,
+) -> datastore_utils.Datastore:
+    """
+    Add, remove and replace representations of images changed in a database, then store
+        and cache the datastore
+    Args:
+        datastore_path (str): datastore path without extension
+        datastore (Datastore): current datastore
+        db_path (str): path to the folder containing image files
+        model_name (str): model for face recognition
+        detector_backend (str): face detector model name
+        enforce_detection (bool): set this to False if you
+            want to proceed when you cannot detect any face
+        align (bool): enable or disable alignment of image
+        expand_percentage (int): expand detected facial area with a percentage
+        normalization (str): normalization technique
+        silent (bool): enable or disable informative logging
+        refresh_mode (str): files or directories
+        batch_size (int): number of faces fed to the model in a single forward pass
+        workers (int): number of processes representing new images
+        changed_paths (set): images known to be modified
+        cache (bool): keep the synchronized datastore in the in-memory cache
+    Returns:
+        datastore (Datastore): synchronized datastore
+    """
+    # Get the list of images on storage with their file properties
+    manifest, changed_directories = None, None
+    if refresh_mode == "directories":
+        previous_manifest = datastore_utils.load_manifest(datastore_path, datastore)
+        storage_stats, changed_directories, manifest = image_utils.scan_changed_images(
+            path=db_path, manifest=previous_manifest
+        )
+        storage_count = sum(properties["images"] for properties in manifest.values())
+        if len(previous_manifest) == 0:
+            # nothing to compare against, every directory is checked
+            changed_directories = None
+    else:
+        storage_stats = image_utils.scan_images(path=db_path)
+        storage_count = len(storage_stats)
+
+    if storage_count == 0:
+        raise ValueError(f"No item found in {db_path}")
+
+    must_save_datastore = False
+    keep_mask = np.ones(len(datastore), dtype=bool)
+    added = datastore_utils.empty()
+    replaced_images = set()
+
+    # embedded images
+    pickled_images = set(datastore.identities.tolist())
+
+    # images in directories not changed since the previous scan are known to be in sync
+    scanned_images = pickled_images
+    if changed_directories is not None:
+        # directories are compared normalized, e.g. db_path with a trailing separator
+        changed_directories = {os.path.normpath(directory) for directory in changed_directories}
+        scanned_images = {
+            identity
+            for identity in pickled_images
+            if os.path.normpath(os.path.dirname(identity)) in changed_directories
+        }
+        # images modified in place do not change their directory
+        for identity in (changed_paths or set()) & (pickled_images - scanned_images):
+            try:
+                storage_stats[identity] = os.stat(identity)
+            except FileNotFoundError:
+                continue
+            scanned_images.add(identity)
+
+    storage_images = set(storage_stats.keys())
+    new_images = storage_images - pickled_images  # images added to storage
+    old_images = scanned_images - storage_images  # images removed from storage
+
+    # detect replaced images
+    for identity, alpha_hash in zip(
+        datastore.identities.tolist(), datastore.metadata["hash"].tolist()
+    ):
+        if identity in old_images or identity not in scanned_images:
+            continue
+        beta_hash = image_utils.find_image_hash(identity, storage_stats.get(identity))
+        if alpha_hash != beta_hash:
+            logger.debug(f"Even though {identity} represented before, it's replaced later.")
+            replaced_images.add(identity)
+
+    if not silent and (len(new_images) > 0 or len(old_images) > 0 or len(replaced_images) > 0):
+        logger.info(
+            f"Found {len(new_images)} newly added image(s)"
+            f", {len(old_images)} removed image(s)"
+            f", {len(replaced_images)} replaced image(s)."
+        )
+
+    # append replaced images into both old and new images. these will be dropped and re-added.
+    new_images.update(replaced_images)
+    old_images.update(replaced_images)
+
+    # remove old images first
+    if len(old_images) > 0:
+        keep_mask = ~np.isin(datastore.identities, list(old_images))
+        datastore = datastore_utils.subset(datastore, keep_mask)
+        must_save_datastore = True
+
+    # find representations for new images
+    if len(new_images) > 0:
+        representations = __find_bulk_embeddings(
+            employees=new_images,
+            model_name=model_name,
+            detector_backend=detector_backend,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            silent=silent,
+            batch_size=batch_size,
+            workers=workers,
+        )  # add new images
+        added = datastore_utils.from_representations(representations)
+        datastore = datastore_utils.concat(datastore, added)
+        must_save_datastore = True
+
+    if must_save_datastore:
+        if datastore_utils.exists(datastore_path):
+            # record changes only instead of rewriting the whole datastore
+            datastore.sequence, in_sync = datastore_utils.append_journal(
+                datastore_path=datastore_path,
+                sequence=datastore.sequence,
+                removed_identities=old_images,
+                added=added,
+            )
+            if not in_sync:
+                # another writer changed the datastore meanwhile, its changes are on disk only
+                datastore = datastore_utils.load(datastore_path)
+                keep_mask = None
+        else:
+            datastore_utils.save(datastore, datastore_path)
+        if cache:
+            __cache_datastore(datastore_path, datastore)
+        indexing.update_indexes(datastore_path, keep_mask, datastore)
+        if not silent:
+            logger.info(
+                f"There are now {len(datastore)} representations in "
+                f"{os.path.basename(datastore_path)}"
+            )
+
+    if manifest is not None:
+        datastore_utils.save_manifest(datastore_path, datastore, manifest)
+
+    return datastore
 
 
 def __find_bulk_embeddings(
@@ -354,6 +1215,8 @@ def __find_bulk_embeddings(
     expand_percentage: int = 0,
     normalization: str = "base",
     silent: bool = False,
+    batch_size: int = 32,
+    workers: int = 1,
 ) -> List[Dict["str", Any]]:
     """
     Find embeddings of a list of images
@@ -378,11 +1241,31 @@ def __find_bulk_embeddings(
         normalization (bool): normalization technique
 
         silent (bool): enable or disable informative logging
+
+        batch_size (int): number of faces fed to the model in a single forward pass
+
+        workers (int): number of processes sharing the images
     Returns:
         representations (list): pivot list of dict with
             image name, hash, embedding and detected face area's coordinates
     """
+    if workers > 1:
+        return __find_bulk_embeddings_in_processes(
+            employees=list(employees),
+            model_name=model_name,
+            detector_backend=detector_backend,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            silent=silent,
+            batch_size=batch_size,
+            workers=workers,
+        )
+
     representations = []
+    pending_faces: List[np.ndarray] = []
+    pending_representations: List[Dict[str, Any]] = []
     for employee in tqdm(
         employees,
         desc="Finding representations",
@@ -418,35 +1301,159 @@ def __find_bulk_embeddings(
             )
         else:
             for img_obj in img_objs:
-                img_content = img_obj["face"]
                 img_region = img_obj["facial_area"]
-                embedding_obj = representation.represent(
-                    img_path=img_content,
-                    model_name=model_name,
-                    enforce_detection=enforce_detection,
-                    detector_backend="skip",
-                    align=align,
-                    normalization=normalization,
-                )
-
-                img_representation = embedding_obj[0]["embedding"]
-                representations.append(
+                # embedding is set once the batch of this face is represented
+                pending_faces.append(img_obj["face"])
+                pending_representations.append(
                     {
                         "identity": employee,
                         "hash": file_hash,
-                        "embedding": img_representation,
+                        "embedding": None,
                         "target_x": img_region["x"],
                         "target_y": img_region["y"],
                         "target_w": img_region["w"],
                         "target_h": img_region["h"],
                     }
                 )
+                representations.append(pending_representations[-1])
+
+        if len(pending_faces) >= batch_size:
+            __represent_pending_faces(
+                pending_faces, pending_representations, model_name, normalization, batch_size
+            )
+
+    __represent_pending_faces(
+        pending_faces, pending_representations, model_name, normalization, batch_size
+    )
 
     return representations
 
 
-def find_batched(
+def __find_bulk_embeddings_in_processes(
+    employees: List[str],
+    model_name: str,
+    detector_backend: str,
+    enforce_detection: bool,
+    align: bool,
+    expand_percentage: int,
+    normalization: str,
+    silent: bool,
+    batch_size: int,
+    workers: int,
+) -> List[Dict["str", Any]]:
+    """
+    Find embeddings of a list of images by sharding them across a pool of processes.
+        Each process builds the detector and the facial recognition model once, and
+        representations are returned in the order of the given images.
+    Args:
+        employees (list): list of exact image paths
+        model_name (str): model for face recognition
+        detector_backend (str): face detector model name
+        enforce_detection (bool): set this to False if you
+            want to proceed when you cannot detect any face
+        align (bool): enable or disable alignment of image
+        expand_percentage (int): expand detected facial area with a percentage
+        normalization (str): normalization technique
+        silent (bool): enable or disable informative logging
+        batch_size (int): number of faces fed to the model in a single forward pass,
+            also the number of images sent to a process at once
+        workers (int): number of processes
+    Returns:
+        representations (list): pivot list of dict with
+            image name, hash, embedding and detected face area's coordinates
+    """
+    shards = [employees[i : i + batch_size] for i in range(0, len(employees), batch_size)]
+    results: List[List[Dict[str, Any]]] = [[] for _ in shards]
+
+    # tensorflow is not fork safe once initialized
+    with ProcessPoolExecutor(
+        max_workers=min(workers, max(len(shards), 1)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=__initialize_worker,
+        initargs=(model_name, detector_backend, workers),
+    ) as executor:
+        futures = {
+            executor.submit(
+                __find_bulk_embeddings,
+                employees=shard,
+                model_name=model_name,
+                detector_backend=detector_backend,
+                enforce_detection=enforce_detection,
+                align=align,
+                expand_percentage=expand_percentage,
+                normalization=normalization,
+                silent=True,
+                batch_size=batch_size,
+            ): idx
+            for idx, shard in enumerate(shards)
+        }
+        with tqdm(
+            total=len(employees), desc="Finding representations", disable=silent
+        ) as pbar:
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                pbar.update(len(shards[idx]))
+
+    return [item for result in results for item in result]
+
+
+def __initialize_worker(model_name: str, detector_backend: str, workers: int) -> None:
+    """
+    Build models once in a process of the pool finding embeddings, and share the cores
+        of the host amongst the processes instead of letting each one use all of them.
+    Args:
+        model_name (str): model for face recognition
+        detector_backend (str): face detector model name
+        workers (int): number of processes in the pool
+    """
+    import tensorflow as tf  # pylint: disable=import-outside-toplevel
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    cv2.setNumThreads(threads)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+    except RuntimeError:
+        # already initialized
+        pass
+
+    modeling.build_model(task="facial_recognition", model_name=model_name)
+    if detector_backend != "skip":
+        modeling.build_model(task="face_detector", model_name=detector_backend)
+
+
+def __represent_pending_faces(
+    faces: List[np.ndarray],
     representations: List[Dict[str, Any]],
+    model_name: str,
+    normalization: str,
+    batch_size: int,
+) -> None:
+    """
+    Represent collected faces in batches and set the embeddings of their representations.
+        Both lists are emptied afterwards.
+    Args:
+        faces (list): facial images waiting to be represented
+        representations (list): representation of each face, with embedding to be set
+        model_name (str): model for face recognition
+        normalization (str): normalization technique
+        batch_size (int): number of faces fed to the model in a single forward pass
+    """
+    embeddings = representation.represent_faces(
+        faces=faces,
+        model_name=model_name,
+        normalization=normalization,
+        batch_size=batch_size,
+    )
+    for item, embedding in zip(representations, embeddings):
+        item["embedding"] = embedding
+    faces.clear()
+    representations.clear()
+
+
+def find_batched(
+    representations: Union[datastore_utils.Datastore, List[Dict[str, Any]]],
     source_objs: List[Dict[str, Any]],
     model_name: str = "VGG-Face",
     distance_metric: str = "cosine",
@@ -455,7 +1462,12 @@ def find_batched(
     threshold: Optional[float] = None,
     normalization: str = "base",
     anti_spoofing: bool = False,
-) -> List[List[Dict[str, Any]]]:
+    ann_index: Optional[indexing.AnnIndex] = None,
+    nprobe: Optional[int] = None,
+    top_k: Optional[int] = None,
+    block_size: Optional[int] = None,
+    return_format: str = "dicts",
+) -> Union[List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
     """
     Perform batched face recognition by comparing source face embeddings with a set of
     target embeddings. It calculates pairwise distances between the source and target
@@ -463,9 +1475,11 @@ def find_batched(
     The function uses batch processing for efficient computation of distances.
 
     Args:
-        representations (List[Dict[str, Any]]):
-            A list of dictionaries containing precomputed target embeddings and associated metadata.
-            Each dictionary should have at least the key `embedding`.
+        representations (Datastore or List[Dict[str, Any]]):
+            The columnar datastore with precomputed target embeddings and associated metadata,
+            or a list of dictionaries in the legacy format. Each dictionary should have
+            the keys `identity`, `hash`, `embedding` and `target_x`, `target_y`, `target_w`,
+            `target_h`.
 
         source_objs (List[Dict[str, Any]]):
             A list of dictionaries representing the source images to compare against
@@ -503,34 +1517,33 @@ def find_batched(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
-    Returns:
-        List[List[Dict[str, Any]]]:
-            A list where each element corresponds to a source face and
-            contains a list of dictionaries with matching faces.
-    """
-    embeddings_list = []
-    valid_mask = []
-    metadata = set()
+        ann_index (AnnIndex): Approximate nearest neighbour index nominating the candidates
+            to compare. Default is None to compare against every item.
 
-    for item in representations:
-        emb = item.get("embedding")
-        if emb is not None:
-            embeddings_list.append(emb)
-            valid_mask.append(True)
-        else:
-            embeddings_list.append(np.zeros_like(representations[0]["embedding"]))
-            valid_mask.append(False)
+        nprobe (int): Search effort of the index.
 
-        metadata.update(item.keys())
+        top_k (int): Return at most this many closest matches for each source face.
+            Default is None to return all matches under the threshold.
 
-    # remove embedding key from other keys
-    metadata.discard("embedding")
-    metadata = list(metadata)
+        block_size (int): Scan the target embeddings in blocks of this many items, so that
+            memory is bounded by the block size instead of the number of targets.
+            Default is None to compare against all targets at once.
 
-    embeddings = np.array(embeddings_list)  # (N, D)
-    valid_mask = np.array(valid_mask)  # (N,)
+        return_format (str): 'dicts' for a list of dictionaries for each source face,
+            one for each match. 'arrays' for a single dictionary of numpy arrays for each
+            source face, where the source region and threshold are stored once as scalars
+            instead of being repeated for every match (default is dicts).
 
-    data = {key: np.array([item.get(key, None) for item in representations]) for key in metadata}
+    Returns:
+        List[List[Dict[str, Any]]] or List[Dict[str, Any]]:
+            A list where each element corresponds to a source face and
+            contains a list of dictionaries with matching faces, or a dictionary of
+            the columns of matching faces if return_format is arrays.
+    """
+    __validate_return_format(return_format)
+
+    if isinstance(representations, list):
+        representations = datastore_utils.from_representations(representations)
 
     target_embeddings = []
     source_regions = []
@@ -550,6 +1563,7 @@ def find_batched(
             detector_backend="skip",
             align=align,
             normalization=normalization,
+            output="numpy",
         )
         # it is safe to access 0 index because we already fed detected face to represent function
         target_representation = target_embedding_obj[0]["embedding"]
@@ -561,45 +1575,29 @@ def find_batched(
         target_thresholds.append(target_threshold)
 
     target_embeddings = np.array(target_embeddings)  # (M, D)
-    target_thresholds = np.array(target_thresholds)  # (M,)
-    source_regions_arr = {
-        "source_x": np.array([region["x"] for region in source_regions]),
-        "source_y": np.array([region["y"] for region in source_regions]),
-        "source_w": np.array([region["w"] for region in source_regions]),
-        "source_h": np.array([region["h"] for region in source_regions]),
-    }
 
-    distances = verification.find_distance(embeddings, target_embeddings, distance_metric)  # (M, N)
-    distances[:, ~valid_mask] = np.inf
+    candidates = __find_distances(
+        datastore=representations,
+        target_embeddings=target_embeddings,
+        distance_metric=distance_metric,
+        ann_index=ann_index,
+        nprobe=nprobe,
+        top_k=top_k,
+        threshold=threshold or verification.find_threshold(model_name, distance_metric),
+        block_size=block_size,
+    )
 
     resp_obj = []
 
-    for i in range(len(target_embeddings)):
-        target_distances = distances[i]  # (N,)
-        target_threshold = target_thresholds[i]
-
-        N = embeddings.shape[0]
-        result_data = dict(data)
-        result_data.update(
-            {
-                "source_x": np.full(N, source_regions_arr["source_x"][i]),
-                "source_y": np.full(N, source_regions_arr["source_y"][i]),
-                "source_w": np.full(N, source_regions_arr["source_w"][i]),
-                "source_h": np.full(N, source_regions_arr["source_h"][i]),
-                "threshold": np.full(N, target_threshold),
-                "distance": target_distances,
-            }
+    for i, (rows, target_distances) in enumerate(candidates):
+        # matching items sorted by distance
+        sorted_data = __match_columns(
+            representations,
+            rows,
+            target_distances,
+            source_regions[i],
+            target_thresholds[i],
+            top_k,
         )
-
-        mask = target_distances <= target_threshold
-        filtered_data = {key: value[mask] for key, value in result_data.items()}
-
-        sorted_indices = np.argsort(filtered_data["distance"])
-        sorted_data = {key: value[sorted_indices] for key, value in filtered_data.items()}
-
-        num_results = len(sorted_data["distance"])
-        result_dicts = [
-            {key: sorted_data[key][i] for key in sorted_data} for i in range(num_results)
-        ]
-        resp_obj.append(result_dicts)
+        resp_obj.append(__format_matches(sorted_data, return_format))
     return resp_obj
@@ -1,17 +1,17 @@
 # built-in dependencies
-from typing import Any, Dict, List, Union, Optional
+from typing import Any, Dict, List, Sequence, Tuple, Union, Optional
 
 # 3rd party dependencies
 import numpy as np
 
 # project dependencies
 from deepface.commons import image_utils
-from deepface.modules import modeling, detection, preprocessing
+from deepface.modules import modeling, detection, preprocessing, batching, caching
 from deepface.models.FacialRecognition import FacialRecognition
 
 
 def represent(
-    img_path: Union[str, np.ndarray],
+    img_path: Union[str, np.ndarray, Sequence[Union[str, np.ndarray]]],
     model_name: str = "VGG-Face",
     enforce_detection: bool = True,
     detector_backend: str = "opencv",
@@ -20,14 +20,18 @@ def represent(
     normalization: str = "base",
     anti_spoofing: bool = False,
     max_faces: Optional[int] = None,
-) -> List[Dict[str, Any]]:
+    batch_size: int = 32,
+    output: str = "list",
+) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
     """
     Represent facial images as multi-dimensional vector embeddings.
 
     Args:
-        img_path (str or np.ndarray): The exact path to the image, a numpy array in BGR format,
-            or a base64 encoded image. If the source image contains multiple faces, the result will
-            include information for each detected face.
+        img_path (str or np.ndarray or list): The exact path to the image, a numpy array in BGR
+            format, or a base64 encoded image. If the source image contains multiple faces,
+            the result will include information for each detected face. A list of images,
+            or a 4 dimensional numpy array of images stacked on the first axis, is represented
+            at once: faces of all images are fed to the model together in batches.
 
         model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
             OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet
@@ -48,13 +52,23 @@ def represent(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
-        max_faces (int): Set a limit on the number of faces to be processed (default is None).
+        max_faces (int): Set a limit on the number of faces to be processed for each image
+            (default is None).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass
+            (default is 32).
+
+        output (string): Type of the embeddings. Options: 'list' for lists of floats,
+            'numpy' for float32 numpy arrays, which avoids converting every dimension into
+            a Python float (default is list).
 
     Returns:
-        results (List[Dict[str, Any]]): A list of dictionaries, each containing the
-            following fields:
+        results (List[Dict[str, Any]] or List[List[Dict[str, Any]]]): A list of dictionaries,
+            each containing the following fields. If a list of images is given, a list of
+            such lists in the order of the images.
 
-        - embedding (List[float]): Multidimensional vector representing facial features.
+        - embedding (List[float] or np.ndarray): Multidimensional vector representing facial
+            features.
             The number of dimensions varies based on the reference model
             (e.g., FaceNet returns 128 dimensions, VGG-Face returns 4096 dimensions).
         - facial_area (dict): Detected facial area by face detection in dictionary format.
@@ -64,15 +78,100 @@ def represent(
         - face_confidence (float): Confidence score of face detection. If `detector_backend` is set
             to 'skip', the confidence will be 0 and is nonsensical.
     """
-    resp_objs = []
+    if output not in ("list", "numpy"):
+        raise ValueError(f"output must be one of list or numpy but it is {output}")
 
-    model: FacialRecognition = modeling.build_model(
-        task="facial_recognition", model_name=model_name
+    batched = isinstance(img_path, (list, tuple)) or (
+        isinstance(img_path, np.ndarray) and img_path.ndim == 4
     )
+    img_paths = list(img_path) if batched else [img_path]
+
+    # images represented before with the same settings are served from the cache
+    keys: List[Optional[str]] = [None] * len(img_paths)
+    cached_objs_list: List[Optional[List[Dict[str, Any]]]] = [None] * len(img_paths)
+    if caching.is_enabled():
+        for i, img in enumerate(img_paths):
+            # decode once, the decoded image is what gets hashed and fed to the detector
+            img_paths[i], _ = image_utils.load_image(img)
+            keys[i] = caching.get_key(
+                img_paths[i],
+                model_name=model_name,
+                enforce_detection=enforce_detection,
+                detector_backend=detector_backend,
+                align=align,
+                expand_percentage=expand_percentage,
+                normalization=normalization,
+                anti_spoofing=anti_spoofing,
+                max_faces=max_faces,
+                inference_backend=modeling.get_backend(),
+            )
+            cached_objs_list[i] = caching.get(keys[i])
+
+    # faces of all images, fed to the model together
+    img_objs_list = [
+        (
+            __extract_faces(
+                img_path=img,
+                enforce_detection=enforce_detection,
+                detector_backend=detector_backend,
+                align=align,
+                expand_percentage=expand_percentage,
+                anti_spoofing=anti_spoofing,
+                max_faces=max_faces,
+            )
+            if cached_objs is None
+            else []
+        )
+        for img, cached_objs in zip(img_paths, cached_objs_list)
+    ]
+
+    embeddings = represent_faces(
+        faces=[img_obj["face"] for img_objs in img_objs_list for img_obj in img_objs],
+        model_name=model_name,
+        normalization=normalization,
+        batch_size=batch_size,
+    )
+
+    resp_objs_list = []
+    offset = 0
+    for key, img_objs, cached_objs in zip(keys, img_objs_list, cached_objs_list):
+        resp_objs = cached_objs
+        if resp_objs is None:
+            resp_objs = [
+                {
+                    "embedding": embedding,
+                    "facial_area": img_obj["facial_area"],
+                    "face_confidence": img_obj["confidence"],
+                }
+                for img_obj, embedding in zip(img_objs, embeddings[offset:])
+            ]
+            offset += len(img_objs)
+            if key is not None:
+                caching.put(key, resp_objs)
+
+        if output == "list":
+            for resp_obj in resp_objs:
+                resp_obj["embedding"] = resp_obj["embedding"].tolist()
+        resp_objs_list.append(resp_objs)
 
-    # ---------------------------------
+    return resp_objs_list if batched else resp_objs_list[0]
+
+
+def __extract_faces(
+    img_path: Union[str, np.ndarray],
+    enforce_detection: bool,
+    detector_backend: str,
+    align: bool,
+    expand_percentage: int,
+    anti_spoofing: bool,
+    max_faces: Optional[int],
+) -> List[Dict[str, Any]]:
+    """
+    Extract the faces of an image to represent, see represent for the arguments
+    Returns:
+        img_objs (list): facial images with their facial area and confidence
+    """
     # we have run pre-process in verification. so, this can be skipped if it is coming from verify.
-    target_size = model.input_shape
     if detector_backend != "skip":
         img_objs = detection.extract_faces(
             img_path=img_path,
@@ -99,7 +198,6 @@ def represent(
                 "confidence": 0,
             }
         ]
-    # ---------------------------------
 
     if max_faces is not None and max_faces < len(img_objs):
         # sort as largest facial areas come first
@@ -114,32 +212,79 @@ def represent(
     for img_obj in img_objs:
         if anti_spoofing is True and img_obj.get("is_real", True) is False:
             raise ValueError("Spoof detected in the given image.")
-        img = img_obj["face"]
 
-        # bgr to rgb
-        img = img[:, :, ::-1]
+    return img_objs
 
-        region = img_obj["facial_area"]
-        confidence = img_obj["confidence"]
 
-        # resize to expected shape of ml model
-        img = preprocessing.resize_image(
-            img=img,
-            # thanks to DeepId (!)
-            target_size=(target_size[1], target_size[0]),
-        )
+def represent_faces(
+    faces: List[np.ndarray],
+    model_name: str = "VGG-Face",
+    normalization: str = "base",
+    batch_size: int = 32,
+) -> np.ndarray:
+    """
+    Represent already extracted facial images as vector embeddings, feeding them to the model
+        in batches instead of one by one.
 
-        # custom normalization
-        img = preprocessing.normalize_input(img=img, normalization=normalization)
+    Args:
+        faces (List[np.ndarray]): facial images as returned by extract_faces
 
-        embedding = model.forward(img)
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet
 
-        resp_objs.append(
-            {
-                "embedding": embedding,
-                "facial_area": region,
-                "face_confidence": confidence,
-            }
+        normalization (string): Normalize the input image before feeding it to the model.
+            Default is base. Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace
+
+        batch_size (int): Number of faces fed to the model in a single forward pass
+            (default is 32).
+
+    Returns:
+        embeddings (np.ndarray): float32 embeddings of the faces with shape (N, D)
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer but it is {batch_size}")
+
+    model: FacialRecognition = modeling.build_model(
+        task="facial_recognition", model_name=model_name
+    )
+    target_size = model.input_shape
+
+    if len(faces) == 0:
+        return np.empty((0, model.output_shape), dtype=np.float32)
+
+    embeddings = []
+    for start in range(0, len(faces), batch_size):
+        imgs = np.concatenate(
+            [
+                __preprocess_face(img=face, target_size=target_size, normalization=normalization)
+                for face in faces[start : start + batch_size]
+            ]
         )
+        embeddings.append(batching.forward_batch(model, imgs))
+    return np.concatenate(embeddings)
+
+
+def __preprocess_face(
+    img: np.ndarray, target_size: Tuple[int, int], normalization: str
+) -> np.ndarray:
+    """
+    Prepare a facial image for the facial recognition model
+    Args:
+        img (np.ndarray): facial image in BGR
+        target_size (tuple): input shape of the model
+        normalization (str): normalization technique
+    Returns:
+        img (np.ndarray): 4 dimensional pre-processed image
+    """
+    # bgr to rgb
+    img = img[:, :, ::-1]
+
+    # resize to expected shape of ml model
+    img = preprocessing.resize_image(
+        img=img,
+        # thanks to DeepId (!)
+        target_size=(target_size[1], target_size[0]),
+    )
 
-    return resp_objs
+    # custom normalization
+    return preprocessing.normalize_input(img=img, normalization=normalization)
@@ -6,12 +6,18 @@ from typing import Any, Dict, Optional, Union, List, Tuple
 import numpy as np
 
 # project dependencies
-from deepface.modules import representation, detection, modeling
+from deepface.modules import representation, detection, modeling, caching
 from deepface.models.FacialRecognition import FacialRecognition
 from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# memory budget of temporary arrays while finding distances between batches of vectors
+DISTANCE_CHUNK_BYTES = 64 * 1024**2
+
+# squared distances under this ratio of the sum of squared norms are computed directly
+NEAR_DUPLICATE_RATIO = 1e-3
+
 
 def verify(
     img1_path: Union[str, np.ndarray, List[float]],
@@ -37,11 +43,11 @@ def verify(
     Args:
         img1_path (str or np.ndarray or List[float]): Path to the first image.
             Accepts exact image path as a string, numpy array (BGR), base64 encoded images
-            or pre-calculated embeddings.
+            or pre-calculated embeddings, as a list of floats or a 1 dimensional numpy array.
 
         img2_path (str or np.ndarray or  or List[float]): Path to the second image.
             Accepts exact image path as a string, numpy array (BGR), base64 encoded images
-            or pre-calculated embeddings.
+            or pre-calculated embeddings, as a list of floats or a 1 dimensional numpy array.
 
         model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
             OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
@@ -116,7 +122,7 @@ def verify(
 
     def extract_embeddings_and_facial_areas(
         img_path: Union[str, np.ndarray, List[float]], index: int
-    ) -> Tuple[List[List[float]], List[dict]]:
+    ) -> Tuple[List[np.ndarray], List[dict]]:
         """
         Extracts facial embeddings and corresponding facial areas from an
         image or returns pre-calculated embeddings.
@@ -130,18 +136,19 @@ def verify(
             img_path (Union[str, np.ndarray, List[float]]):
                 - A string representing the file path to an image,
                 - A NumPy array containing the image data,
-                - Or a list of pre-calculated embedding values (of type `float`).
+                - Or a list of pre-calculated embedding values (of type `float`),
+                  or a 1 dimensional NumPy array of them.
             index (int): An index value used in error messages and logging
             to identify the number of the image.
 
         Returns:
-            Tuple[List[List[float]], List[dict]]:
-                - A list containing lists of facial embeddings for each detected face.
+            Tuple[List[np.ndarray], List[dict]]:
+                - A list containing facial embeddings for each detected face.
                 - A list of dictionaries where each dictionary contains facial area information.
         """
-        if isinstance(img_path, list):
+        if isinstance(img_path, list) or (isinstance(img_path, np.ndarray) and img_path.ndim == 1):
             # given image is already pre-calculated embedding
-            if not all(isinstance(dim, float) for dim in img_path):
+            if isinstance(img_path, list) and not all(isinstance(dim, float) for dim in img_path):
                 raise ValueError(
                     f"When passing img{index}_path as a list,"
                     " ensure that all its items are of type float."
@@ -160,7 +167,7 @@ def verify(
                     f" but {index}-th image has {len(img_path)} dimensions input"
                 )
 
-            img_embeddings = [img_path]
+            img_embeddings = [np.asarray(img_path, dtype=np.float64)]
             img_facial_areas = [no_facial_area]
         else:
             try:
@@ -221,15 +228,31 @@ def __extract_faces_and_embeddings(
     expand_percentage: int = 0,
     normalization: str = "base",
     anti_spoofing: bool = False,
-) -> Tuple[List[List[float]], List[dict]]:
+) -> Tuple[List[np.ndarray], List[dict]]:
     """
     Extract facial areas and find corresponding embeddings for given image
     Returns:
-        embeddings (List[float])
+        embeddings (List[np.ndarray])
         facial areas (List[dict])
     """
-    embeddings = []
-    facial_areas = []
+    if caching.is_enabled() and detector_backend != "skip":
+        # embeddings of images represented before are served from the cache, represent
+        # reports a dummy facial area for skip but the one of extract_faces is kept here
+        img_embedding_objs = representation.represent(
+            img_path=img_path,
+            model_name=model_name,
+            enforce_detection=enforce_detection,
+            detector_backend=detector_backend,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            anti_spoofing=anti_spoofing,
+            output="numpy",
+        )
+        return (
+            [np.asarray(obj["embedding"], dtype=np.float64) for obj in img_embedding_objs],
+            [obj["facial_area"] for obj in img_embedding_objs],
+        )
 
     img_objs = detection.extract_faces(
         img_path=img_path,
@@ -241,24 +264,20 @@ def __extract_faces_and_embeddings(
         anti_spoofing=anti_spoofing,
     )
 
-    # find embeddings for each face
     for img_obj in img_objs:
         if anti_spoofing is True and img_obj.get("is_real", True) is False:
             raise ValueError("Spoof detected in given image.")
-        img_embedding_obj = representation.represent(
-            img_path=img_obj["face"],
-            model_name=model_name,
-            enforce_detection=enforce_detection,
-            detector_backend="skip",
-            align=align,
-            normalization=normalization,
-        )
-        # already extracted face given, safe to access its 1st item
-        img_embedding = img_embedding_obj[0]["embedding"]
-        embeddings.append(img_embedding)
-        facial_areas.append(img_obj["facial_area"])
 
-    return embeddings, facial_areas
+    # find embeddings of all faces at once
+    embeddings = representation.represent_faces(
+        faces=[img_obj["face"] for img_obj in img_objs],
+        model_name=model_name,
+        normalization=normalization,
+    )
+    facial_areas = [img_obj["facial_area"] for img_obj in img_objs]
+
+    # distances are calculated in double precision as they were for lists of floats
+    return list(embeddings.astype(np.float64)), facial_areas
 
 
 def find_cosine_distance(
@@ -298,7 +317,9 @@ def find_cosine_distance(
 
 
 def find_euclidean_distance(
-    source_representation: Union[np.ndarray, list], test_representation: Union[np.ndarray, list]
+    source_representation: Union[np.ndarray, list],
+    test_representation: Union[np.ndarray, list],
+    source_squared_norms: Optional[np.ndarray] = None,
 ) -> Union[np.float64, np.ndarray]:
     """
     Find Euclidean distance between two vectors or batches of vectors.
@@ -306,10 +327,13 @@ def find_euclidean_distance(
     Args:
         source_representation (np.ndarray or list): 1st vector or batch of vectors.
         test_representation (np.ndarray or list): 2nd vector or batch of vectors.
+        source_squared_norms (np.ndarray): precomputed squared norms of the batch of
+            source vectors (optional).
 
     Returns:
         np.float64 or np.ndarray: Euclidean distance(s).
-            Returns a np.float64 for single embeddings and np.ndarray for batch embeddings.
+            Returns a np.float64 for single embeddings and float32 np.ndarray of shape (M, N)
+            for batch embeddings.
     """
     # Convert inputs to numpy arrays if necessary
     source_representation = np.asarray(source_representation)
@@ -320,10 +344,9 @@ def find_euclidean_distance(
         distances = np.linalg.norm(source_representation - test_representation)
     # Batch embeddings case (2D arrays)
     elif source_representation.ndim == 2 and test_representation.ndim == 2:
-        diff = (
-            source_representation[None, :, :] - test_representation[:, None, :]
-        )  # (N, D) - (M, D)  = (M, N, D)
-        distances = np.linalg.norm(diff, axis=2)  # (M, N)
+        distances = __find_batch_euclidean_distance(
+            source_representation, test_representation, source_squared_norms=source_squared_norms
+        )  # (M, N)
     else:
         raise ValueError(
             f"Embeddings must be 1D or 2D, but received "
@@ -332,6 +355,121 @@ def find_euclidean_distance(
     return distances
 
 
+def find_normalized_distance(
+    normalized_embeddings: np.ndarray,
+    norms: np.ndarray,
+    target_embeddings: Union[np.ndarray, list],
+    distance_metric: str,
+) -> np.ndarray:
+    """
+    Find distances between target embeddings and a batch of l2 normalized embeddings
+        stored with their original norms, as in a datastore. Each metric is a single
+        matrix product against the normalized embeddings, without normalizing them again.
+
+    Args:
+        normalized_embeddings (np.ndarray): l2 normalized vectors with shape (N, D)
+        norms (np.ndarray): norms of the vectors before normalization with shape (N,)
+        target_embeddings (np.ndarray or list): batch of vectors with shape (M, D)
+        distance_metric (str): The type of distance to compute
+            ('cosine', 'euclidean', or 'euclidean_l2').
+
+    Returns:
+        np.ndarray: float32 distances with shape (M, N)
+    """
+    target_embeddings = np.asarray(target_embeddings, dtype=np.float32)
+    if target_embeddings.ndim != 2 or normalized_embeddings.ndim != 2:
+        raise ValueError(
+            f"Embeddings must be 2D, but received normalized shape: "
+            f"{normalized_embeddings.shape}, target shape: {target_embeddings.shape}"
+        )
+
+    if distance_metric == "cosine":
+        normalized_targets = l2_normalize(target_embeddings, axis=1).astype(np.float32)
+        distances = normalized_targets @ np.asarray(normalized_embeddings, dtype=np.float32).T
+        return np.subtract(1, distances, out=distances)
+    if distance_metric == "euclidean":
+        return __find_batch_euclidean_distance(
+            normalized_embeddings,
+            target_embeddings,
+            source_squared_norms=np.square(norms, dtype=np.float32),
+            source_scales=norms,
+        )
+    if distance_metric == "euclidean_l2":
+        return __find_batch_euclidean_distance(
+            normalized_embeddings,
+            l2_normalize(target_embeddings, axis=1),
+            # zero vectors stay zero after normalization
+            source_squared_norms=(np.asarray(norms) > 0).astype(np.float32),
+        )
+    raise ValueError("Invalid distance_metric passed - ", distance_metric)
+
+
+def __find_batch_euclidean_distance(
+    source_representation: np.ndarray,
+    test_representation: np.ndarray,
+    source_squared_norms: Optional[np.ndarray] = None,
+    source_scales: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Find Euclidean distances between batches of vectors in float32 as
+        sqrt(||a||^2 + ||b||^2 - 2ab), so that no (M, N, D) difference tensor is built.
+        Source vectors are processed in chunks keeping temporary arrays within
+        DISTANCE_CHUNK_BYTES. Squared distances of near duplicates lose precision
+        in this form, so they are computed directly.
+
+    Args:
+        source_representation (np.ndarray): batch of vectors with shape (N, D)
+        test_representation (np.ndarray): batch of vectors with shape (M, D)
+        source_squared_norms (np.ndarray): squared norms of source vectors with shape (N,)
+        source_scales (np.ndarray): factors of source vectors with shape (N,), if the
+            source vectors are stored divided by them
+
+    Returns:
+        np.ndarray: float32 distances with shape (M, N)
+    """
+    test_representation = np.asarray(test_representation, dtype=np.float32)
+    test_squared_norms = np.einsum("ij,ij->i", test_representation, test_representation)
+
+    n, dimensions = source_representation.shape
+    m = test_representation.shape[0]
+    distances = np.empty((m, n), dtype=np.float32)
+
+    # a chunk of source vectors in float32, its product with test vectors and its tolerances
+    chunk_size = max(1, DISTANCE_CHUNK_BYTES // (4 * (dimensions + 2 * m)))
+    for start in range(0, n, chunk_size):
+        chunk = np.asarray(source_representation[start : start + chunk_size], dtype=np.float32)
+        if source_scales is not None:
+            chunk_scales = np.asarray(source_scales[start : start + chunk_size], dtype=np.float32)
+        if source_squared_norms is None:
+            chunk_squared_norms = np.einsum("ij,ij->i", chunk, chunk)
+        else:
+            chunk_squared_norms = np.asarray(
+                source_squared_norms[start : start + chunk_size], dtype=np.float32
+            )
+
+        block = test_representation @ chunk.T  # (M, chunk)
+        if source_scales is not None:
+            block *= chunk_scales[None, :]
+        block *= -2
+        block += test_squared_norms[:, None]
+        block += chunk_squared_norms[None, :]
+
+        tolerance = test_squared_norms[:, None] + chunk_squared_norms[None, :]
+        tolerance *= NEAR_DUPLICATE_RATIO
+        rows, cols = np.nonzero(block < tolerance)
+        if rows.shape[0] > 0:
+            if source_scales is None:
+                diff = test_representation[rows] - chunk[cols]
+            else:
+                diff = test_representation[rows] - chunk[cols] * chunk_scales[cols, None]
+            block[rows, cols] = np.einsum("ij,ij->i", diff, diff)
+
+        np.maximum(block, 0, out=block)
+        distances[:, start : start + chunk_size] = np.sqrt(block, out=block)
+
+    return distances
+
+
 def l2_normalize(
     x: Union[np.ndarray, list], axis: Union[int, None] = None, epsilon: float = 1e-10
 ) -> np.ndarray:
@@ -353,6 +491,7 @@ def find_distance(
     alpha_embedding: Union[np.ndarray, list],
     beta_embedding: Union[np.ndarray, list],
     distance_metric: str,
+    alpha_squared_norms: Optional[np.ndarray] = None,
 ) -> Union[np.float64, np.ndarray]:
     """
     Wrapper to find the distance between vectors based on the specified distance metric.
@@ -362,6 +501,8 @@ def find_distance(
         beta_embedding (np.ndarray or list): 2nd vector or batch of vectors.
         distance_metric (str): The type of distance to compute
             ('cosine', 'euclidean', or 'euclidean_l2').
+        alpha_squared_norms (np.ndarray): precomputed squared norms of the batch of
+            alpha vectors, used by euclidean (optional).
 
     Returns:
         np.float64 or np.ndarray: The calculated distance(s).
@@ -380,7 +521,7 @@ def find_distance(
     if distance_metric == "cosine":
         distance = find_cosine_distance(alpha_embedding, beta_embedding)
     elif distance_metric == "euclidean":
-        distance = find_euclidean_distance(alpha_embedding, beta_embedding)
+        distance = find_euclidean_distance(alpha_embedding, beta_embedding, alpha_squared_norms)
     elif distance_metric == "euclidean_l2":
         axis = None if alpha_embedding.ndim == 1 else 1
         normalized_alpha = l2_normalize(alpha_embedding, axis=axis)
@@ -0,0 +1,204 @@
+# built-in dependencies
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+# project dependencies
+from deepface.commons import image_utils
+from deepface.modules import detection, recognition
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+BACKENDS = ["auto", "events", "polling"]
+
+
+class Watcher:  # pylint: disable=too-many-instance-attributes
+    """
+    Keep the datastore of a database in sync with its images from a background thread, so that
+        find can be called with refresh_database=False without serving stale results.
+        Changes are noticed with file system events (inotify on linux) if watchdog is installed,
+        or by polling the modification times of directories otherwise. Polling does not notice
+        images overwritten in place under the same name.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        model_name: str = "VGG-Face",
+        detector_backend: str = "opencv",
+        enforce_detection: bool = True,
+        align: bool = True,
+        expand_percentage: int = 0,
+        normalization: str = "base",
+        silent: bool = False,
+        interval: float = 1.0,
+        backend: str = "auto",
+        batch_size: int = 32,
+    ):
+        if not os.path.isdir(db_path):
+            raise ValueError(f"Passed path {db_path} does not exist!")
+
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)} but it is {backend}")
+
+        if backend == "auto":
+            try:
+                _import_watchdog()
+                backend = "events"
+            except ImportError:
+                backend = "polling"
+
+        self.db_path = db_path
+        # arguments of every synchronization
+        self.settings: Dict[str, Any] = {
+            "model_name": model_name,
+            "detector_backend": detector_backend,
+            "enforce_detection": enforce_detection,
+            "align": align,
+            "expand_percentage": expand_percentage,
+            "normalization": normalization,
+            "silent": silent,
+            "batch_size": batch_size,
+        }
+        self.interval = interval
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pending = False
+        self._changed_paths: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._observer: Any = None
+
+    def start(self) -> "Watcher":
+        """
+        Synchronize the datastore once, then keep it in sync in the background
+        Returns:
+            watcher (Watcher): this watcher
+        """
+        if self._thread is not None:
+            return self
+
+        self.sync()
+
+        if self.backend == "events":
+            observers = _import_watchdog()
+            self._observer = observers.Observer()
+            self._observer.schedule(_EventHandler(self), self.db_path, recursive=True)
+            self._observer.start()
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self.__run, name=f"deepface-watcher-{self.db_path}", daemon=True
+        )
+        self._thread.start()
+        if not self.settings["silent"]:
+            logger.info(f"Watching {self.db_path} with {self.backend}")
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop watching. A synchronization in progress is completed first.
+        """
+        self._stopped.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sync(self, changed_paths: Optional[Set[str]] = None) -> None:
+        """
+        Synchronize the datastore with the images in the database now
+        Args:
+            changed_paths (set): images known to be modified in place
+        """
+        recognition.refresh_datastore(
+            db_path=self.db_path,
+            refresh_mode="directories",
+            changed_paths=changed_paths,
+            **self.settings,
+        )
+
+    def notify(self, path: str, modified: bool = False) -> None:
+        """
+        Mark the database as changed, it is synchronized in the next interval
+        Args:
+            path (str): changed file or directory
+            modified (bool): whether the content of an existing file changed
+        """
+        with self._lock:
+            self._pending = True
+            if modified:
+                self._changed_paths.add(path)
+
+    def __run(self) -> None:
+        # synchronizations do not wait for callers of find on detectors which are not thread safe
+        with detection.private_detectors():
+            while not self._stopped.wait(self.interval):
+                changed_paths = None
+                if self.backend == "events":
+                    with self._lock:
+                        if not self._pending:
+                            continue
+                        changed_paths, self._changed_paths = self._changed_paths, set()
+                        self._pending = False
+
+                try:
+                    self.sync(changed_paths=changed_paths)
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.error(f"Exception while synchronizing {self.db_path}: {str(err)}")
+                    if changed_paths is not None:
+                        # try again in the next interval
+                        for path in changed_paths:
+                            self.notify(path, modified=True)
+                        self.notify(self.db_path)
+
+    def __enter__(self) -> "Watcher":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+
+class _EventHandler:  # pylint: disable=too-few-public-methods
+    """
+    Forward file system events about images and directories to a watcher.
+        Events about the datastore files written into the database are ignored.
+    """
+
+    def __init__(self, watcher: Watcher):
+        self.watcher = watcher
+
+    def dispatch(self, event: Any) -> None:
+        if event.event_type not in ("created", "deleted", "modified", "moved", "closed"):
+            return
+
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        paths = [os.fsdecode(path) for path in paths if path]
+        if not event.is_directory:
+            paths = [
+                path
+                for path in paths
+                if os.path.splitext(path)[1].lower() in image_utils.IMAGE_EXTS
+            ]
+        elif event.event_type in ("modified", "closed"):
+            # entries of a directory changed, reported for the entries themselves
+            return
+
+        for path in paths:
+            self.watcher.notify(path, modified=event.event_type in ("modified", "closed"))
+
+
+def _import_watchdog():
+    try:
+        from watchdog import observers
+    except ModuleNotFoundError as e:
+        raise ImportError(
+            "watchdog is an optional dependency for watching file system events, ensure the"
+            " library is installed. Please install using 'pip install watchdog'"
+        ) from e
+    return observers
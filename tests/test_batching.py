@@ -0,0 +1,77 @@
+# built-in dependencies
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 3rd party dependencies
+import pytest
+import numpy as np
+
+# project dependencies
+from deepface import DeepFace
+from deepface.modules import batching
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+def test_micro_batcher():
+    batch_sizes = []
+    started = threading.Event()
+
+    def forward(imgs: np.ndarray) -> np.ndarray:
+        # block the first pass, so that the others queue up behind it
+        started.wait()
+        batch_sizes.append(len(imgs))
+        return imgs.reshape(len(imgs), -1).sum(axis=1, keepdims=True) * 2
+
+    batcher = batching.MicroBatcher(forward=forward, max_batch_size=8, max_wait=0.05)
+    requests = [np.full((1 + i % 3, 2, 2), i, dtype=np.float32) for i in range(12)]
+    futures = [batcher.submit(imgs) for imgs in requests]
+    started.set()
+
+    for imgs, future in zip(requests, futures):
+        expected = imgs.reshape(len(imgs), -1).sum(axis=1, keepdims=True) * 2
+        assert future.result().tolist() == expected.tolist()
+
+    # 24 images in passes of at most 8, never split a request
+    assert sum(batch_sizes) == 24
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < len(requests)
+
+    batcher.close()
+    # closed batcher still serves callers holding it
+    assert batcher(requests[0]).shape == (1, 1)
+    logger.info("✅ test micro batcher done")
+
+
+def test_micro_batcher_with_error():
+    def forward(imgs: np.ndarray) -> np.ndarray:
+        raise ValueError("broken model")
+
+    batcher = batching.MicroBatcher(forward=forward, max_batch_size=4, max_wait=0.01)
+    with pytest.raises(ValueError, match="broken model"):
+        batcher(np.zeros((2, 3), dtype=np.float32))
+    batcher.close()
+
+    with pytest.raises(ValueError, match="max_batch_size must be a positive integer"):
+        batching.MicroBatcher(forward=forward, max_batch_size=0)
+    logger.info("✅ test micro batcher with error done")
+
+
+def test_represent_with_micro_batching():
+    img_paths = ["dataset/img1.jpg", "dataset/img2.jpg", "dataset/img3.jpg", "dataset/img4.jpg"]
+    expected = [DeepFace.represent(img_path=img_path) for img_path in img_paths]
+
+    batching.enable(max_batch_size=4, max_wait=0.02)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda img_path: DeepFace.represent(img_path), img_paths))
+    finally:
+        batching.disable()
+
+    for result, expected_result in zip(results, expected):
+        assert len(result) == len(expected_result)
+        for embedding_obj, expected_obj in zip(result, expected_result):
+            assert embedding_obj["facial_area"] == expected_obj["facial_area"]
+            assert np.allclose(embedding_obj["embedding"], expected_obj["embedding"], atol=1e-4)
+    logger.info("✅ test represent with micro batching done")
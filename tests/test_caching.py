@@ -0,0 +1,100 @@
+# built-in dependencies
+import os
+
+# 3rd party dependencies
+import cv2
+import numpy as np
+
+# project dependencies
+from deepface import DeepFace
+from deepface.modules import caching, detection
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+def test_represent_with_embedding_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("DEEPFACE_HOME", str(tmp_path))
+    img_path = "dataset/couple.jpg"
+    expected = DeepFace.represent(img_path=img_path)
+
+    calls = []
+    extract_faces = detection.extract_faces
+
+    def counting_extract_faces(*args, **kwargs):
+        calls.append(1)
+        return extract_faces(*args, **kwargs)
+
+    monkeypatch.setattr(detection, "extract_faces", counting_extract_faces)
+
+    caching.enable(max_bytes=64 * 1024**2, disk=True)
+    try:
+        first = DeepFace.represent(img_path=img_path)
+        assert len(calls) == 1
+
+        # same pixels given as a path, a numpy array and a file object hit the cache
+        second = DeepFace.represent(img_path=img_path)
+        third = DeepFace.represent(img_path=cv2.imread(img_path), output="numpy")
+        with open(img_path, "rb") as f:
+            fourth = DeepFace.represent(img_path=f)
+        assert len(calls) == 1
+
+        for results in [first, second, fourth]:
+            assert results == expected
+        assert [obj["embedding"].tolist() for obj in third] == [
+            obj["embedding"] for obj in expected
+        ]
+
+        # other settings are cached separately
+        DeepFace.represent(img_path=img_path, align=False)
+        assert len(calls) == 2
+
+        # disk tier survives dropping the memory tier
+        caching.clear()
+        assert DeepFace.represent(img_path=img_path) == expected
+        assert len(calls) == 2
+        assert len(os.listdir(tmp_path / ".deepface" / "embeddings")) > 0
+
+        # verify reuses the embeddings of represent
+        DeepFace.verify(img1_path=img_path, img2_path=img_path)
+        assert len(calls) == 2
+    finally:
+        caching.disable()
+        caching.clear(disk=True)
+
+    DeepFace.represent(img_path=img_path)
+    assert len(calls) == 3
+    logger.info("✅ test represent with embedding cache done")
+
+
+def test_embedding_cache_budget():
+    caching.enable(max_bytes=3 * (4 * 128 + caching.FACE_OVERHEAD_BYTES))
+    try:
+        faces = [
+            {
+                "embedding": np.full(128, i, dtype=np.float32),
+                "facial_area": {"x": i, "y": 0, "w": 1, "h": 1},
+                "face_confidence": 1.0,
+            }
+            for i in range(4)
+        ]
+        for i, face in enumerate(faces):
+            caching.put(str(i), [face])
+            if i == 2:
+                # touch the oldest entry, so that the second one is evicted instead
+                assert caching.get("0") is not None
+
+        assert caching.get("1") is None
+        for key in ["0", "2", "3"]:
+            cached = caching.get(key)
+            assert cached[0]["embedding"].tolist() == [float(key)] * 128
+            # cached faces are copied for callers
+            cached[0]["facial_area"]["x"] = -1
+            cached[0]["embedding"][0] = -1
+            assert caching.get(key)[0]["facial_area"]["x"] == int(key)
+            assert caching.get(key)[0]["embedding"][0] == float(key)
+    finally:
+        caching.disable()
+
+    assert caching.get("0") is None
+    logger.info("✅ test embedding cache budget done")
@@ -0,0 +1,84 @@
+# built-in dependencies
+import shutil
+
+# 3rd party dependencies
+import pytest
+import numpy as np
+
+# project dependencies
+from deepface import DeepFace
+from deepface.modules import clustering, verification
+from deepface.commons import datastore_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+@pytest.mark.parametrize("distance_metric", ["cosine", "euclidean", "euclidean_l2"])
+def test_find_clusters(distance_metric):
+    rng = np.random.default_rng(0)
+    people = rng.standard_normal((30, 8))
+    labels = rng.integers(0, 30, 200)
+    embeddings = people[labels] + 0.3 * rng.standard_normal((200, 8))
+    representations = [
+        {
+            "identity": f"db/{i}.jpg",
+            "hash": str(i),
+            "embedding": None if i % 17 == 0 else embeddings[i].tolist(),
+            "target_x": 0,
+            "target_y": 0,
+            "target_w": 0,
+            "target_h": 0,
+        }
+        for i in range(200)
+    ]
+    datastore = datastore_utils.from_representations(representations)
+    threshold = {"cosine": 0.1, "euclidean": 1.5, "euclidean_l2": 0.45}[distance_metric]
+
+    # connected components of the brute force distance matrix
+    valid = datastore.valid
+    expected = np.where(valid, np.arange(200), -1)
+    original = embeddings.astype(np.float32)
+    linked = np.zeros((200, 200), dtype=bool)
+    distances = verification.find_distance(original[valid], original[valid], distance_metric)
+    linked[np.ix_(valid, valid)] = distances <= threshold
+    for _ in range(200):
+        reachable = np.where(linked, expected[None, :], 200).min(axis=1)
+        merged = np.where(valid, np.minimum(expected, reachable), -1)
+        if np.array_equal(merged, expected):
+            break
+        expected = merged
+
+    for block_size in [7, 64, 4096]:
+        actual = clustering.find_clusters(
+            datastore=datastore,
+            distance_metric=distance_metric,
+            threshold=threshold,
+            block_size=block_size,
+        )
+        assert actual.tolist() == expected.tolist()
+
+    logger.info(f"✅ test find clusters with {distance_metric} done")
+
+
+def test_cluster_with_duplicates(tmp_path):
+    for img_name in ["img1.jpg", "img3.jpg"]:
+        shutil.copy(f"dataset/{img_name}", tmp_path / img_name)
+    shutil.copy("dataset/img1.jpg", tmp_path / "copy.jpg")
+
+    clusters = DeepFace.cluster(db_path=str(tmp_path), silent=True, block_size=2)
+    assert len(clusters) > 0
+    identities = set(clusters[0]["identity"].tolist())
+    assert {str(tmp_path / "img1.jpg"), str(tmp_path / "copy.jpg")} <= identities
+
+    # every face is a cluster with min_size 1
+    clusters = DeepFace.cluster(
+        db_path=str(tmp_path), silent=True, refresh_database=False, min_size=1
+    )
+    assert sum(len(df) for df in clusters) == 3
+    assert [len(df) for df in clusters] == sorted((len(df) for df in clusters), reverse=True)
+
+    with pytest.raises(ValueError, match="min_size must be a positive integer"):
+        DeepFace.cluster(db_path=str(tmp_path), silent=True, min_size=0)
+
+    logger.info("✅ test cluster with duplicates done")
@@ -1,14 +1,19 @@
 # built-in dependencies
 import os
+import pickle
+import shutil
+import time
 
 # 3rd party dependencies
+import pytest
 import cv2
+import numpy as np
 import pandas as pd
 
 # project dependencies
 from deepface import DeepFace
-from deepface.modules import verification
-from deepface.commons import image_utils
+from deepface.modules import verification, recognition, indexing
+from deepface.commons import image_utils, datastore_utils
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -113,22 +118,40 @@ def test_filetype_for_find_bulk_embeddings():
 
     assert gen_imgs == list_imgs
 
+    # Concurrent scanner
+    scanned_imgs = image_utils.scan_images("dataset")
+
+    assert "dataset/img47.jpg" not in scanned_imgs
+    assert set(scanned_imgs.keys()) == set(list_imgs)
+    for img_path, file_stats in scanned_imgs.items():
+        assert image_utils.find_image_hash(img_path, file_stats) == image_utils.find_image_hash(
+            img_path
+        )
+
 
 def test_find_without_refresh_database():
     import shutil, hashlib
 
     img_path = os.path.join("dataset", "img1.jpg")
 
-    # 1. Calculate hash of the .pkl file;
+    # 1. Calculate hash of the datastore files;
     # 2. Move random image to the temporary created directory;
-    # 3. As a result, there will be a difference between the .pkl file and the disk files;
-    # 4. If refresh_database=False, then .pkl file should not be updated.
+    # 3. As a result, there will be a difference between the datastore and the disk files;
+    # 4. If refresh_database=False, then datastore files should not be updated.
     #    Recalculate hash and compare it with the hash from pt. 1;
     # 5. After successful check, the image will be moved back to the original destination;
 
-    pkl_path = "dataset/ds_model_vggface_detector_opencv_aligned_normalization_base_expand_0.pkl"
-    with open(pkl_path, "rb") as f:
-        hash_before = hashlib.sha256(f.read())
+    ds_path = "dataset/ds_model_vggface_detector_opencv_aligned_normalization_base_expand_0"
+    version = datastore_utils.get_version(ds_path)
+    ds_files = [
+        datastore_utils.get_snapshot_path(ds_path),
+        datastore_utils.get_embeddings_path(ds_path, version),
+        datastore_utils.get_metadata_path(ds_path, version),
+    ]
+    hash_before = hashlib.sha256()
+    for ds_file in ds_files:
+        with open(ds_file, "rb") as f:
+            hash_before.update(f.read())
 
     image_name = "img28.jpg"
     tmp_dir = "dataset/temp_image"
@@ -137,15 +160,17 @@ def test_find_without_refresh_database():
 
     dfs = DeepFace.find(img_path=img_path, db_path="dataset", silent=True, refresh_database=False)
 
-    with open(pkl_path, "rb") as f:
-        hash_after = hashlib.sha256(f.read())
+    hash_after = hashlib.sha256()
+    for ds_file in ds_files:
+        with open(ds_file, "rb") as f:
+            hash_after.update(f.read())
 
     shutil.move(os.path.join(tmp_dir, image_name), os.path.join("dataset", image_name))
     os.rmdir(tmp_dir)
 
     assert hash_before.hexdigest() == hash_after.hexdigest()
 
-    logger.info("✅ .pkl hashes before and after the recognition process are the same")
+    logger.info("✅ datastore hashes before and after the recognition process are the same")
 
     assert len(dfs) > 0
     for df in dfs:
@@ -162,3 +187,675 @@ def test_find_without_refresh_database():
         logger.debug(df.head())
         assert df.shape[0] > 0
     logger.info("✅ test find without refresh database done")
+
+
+def test_find_with_datastore_cache():
+    img_path = os.path.join("dataset", "img1.jpg")
+    recognition.clear_datastore_cache()
+
+    # 1st call loads the datastore from disk, 2nd one is served from memory
+    dfs_cold = DeepFace.find(img_path=img_path, db_path="dataset", silent=True)
+    dfs_warm = DeepFace.find(img_path=img_path, db_path="dataset", silent=True)
+    assert len(dfs_cold) == len(dfs_warm)
+    for df_cold, df_warm in zip(dfs_cold, dfs_warm):
+        pd.testing.assert_frame_equal(df_cold, df_warm)
+
+    # disabled cache must yield same results
+    recognition.set_datastore_cache_size(0)
+    try:
+        dfs_uncached = DeepFace.find(img_path=img_path, db_path="dataset", silent=True)
+    finally:
+        recognition.set_datastore_cache_size(2 * 1024**3)
+    for df_cold, df_uncached in zip(dfs_cold, dfs_uncached):
+        pd.testing.assert_frame_equal(df_cold, df_uncached)
+    logger.info("✅ test find with datastore cache done")
+
+
+@pytest.mark.parametrize("index", ["ivf", "hnsw", "identity", "int8", "pq"])
+def test_find_with_ann_index(index):
+    if index == "hnsw":
+        pytest.importorskip("hnswlib")
+
+    img_path = os.path.join("dataset", "img1.jpg")
+    exact_dfs = DeepFace.find(img_path=img_path, db_path="dataset", silent=True)
+
+    # searching all candidates must yield exact results
+    dfs = DeepFace.find(
+        img_path=img_path, db_path="dataset", silent=True, index=index, nprobe=1000
+    )
+    assert len(dfs) == len(exact_dfs)
+    for df, exact_df in zip(dfs, exact_dfs):
+        assert df["identity"].tolist() == exact_df["identity"].tolist()
+        assert df["distance"].tolist() == exact_df["distance"].tolist()
+
+    # lower search effort still finds the image itself
+    results = DeepFace.find(
+        img_path=img_path, db_path="dataset", silent=True, batched=True, index=index, nprobe=8
+    )
+    assert img_path in [result["identity"] for result in results[0]]
+
+    # float32 embeddings stay memory mapped for compressed indexes instead of being cached
+    recognition.clear_datastore_cache()
+    DeepFace.find(img_path=img_path, db_path="dataset", silent=True, index=index)
+    assert (len(recognition._datastore_cache) == 0) == indexing.INDEXES[index].compressed
+    logger.info(f"✅ test find with {index} index done")
+
+
+def test_identity_index():
+    rng = np.random.default_rng(0)
+    people = rng.standard_normal((20, 16)).astype(np.float32)
+    embeddings = np.repeat(people, 5, axis=0) + 0.05 * rng.standard_normal((100, 16))
+    embeddings = embeddings.astype(np.float32)
+    identities = np.array([f"db/person{i // 5}/img{i % 5}.jpg" for i in range(100)])
+    valid = np.ones(100, dtype=bool)
+    valid[3] = False
+
+    index = indexing.IdentityIndex(space="l2")
+    index.build(embeddings, valid, identities)
+
+    # only members of the person itself can be within a small radius
+    candidates = index.search(people[[7]], nprobe=20, radius=0.5)[0]
+    assert candidates.tolist() == list(range(35, 40))
+
+    # without radius, members of the 2 closest people having an embedding are nominated
+    candidates = index.search(people[[0]], nprobe=2)[0]
+    assert candidates[:4].tolist() == [0, 1, 2, 4]
+    assert candidates.shape[0] == 9
+
+    # drop person 7 and add a new person
+    keep_mask = ~np.isin(np.arange(100), range(35, 40))
+    new_person = rng.standard_normal((1, 16)).astype(np.float32)
+    embeddings = np.concatenate([embeddings[keep_mask], np.repeat(new_person, 3, axis=0)])
+    identities = np.concatenate(
+        [identities[keep_mask], ["db/new/a.jpg", "db/new/b.jpg", "db/new/c.jpg"]]
+    )
+    valid = np.concatenate([valid[keep_mask], np.ones(3, dtype=bool)])
+    index.update(keep_mask, embeddings, valid, identities)
+
+    assert index.size == 98
+    assert index.search(people[[7]], nprobe=20, radius=0.5)[0].shape[0] == 0
+    assert index.search(new_person, nprobe=1)[0].tolist() == [95, 96, 97]
+    logger.info("✅ test identity index done")
+
+
+def test_int8_index():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((1000, 32)).astype(np.float32)
+    valid = np.ones(1000, dtype=bool)
+    valid[::10] = False
+    identities = np.array([f"img{i}.jpg" for i in range(1000)])
+    targets = embeddings[:5] + 0.5 * rng.standard_normal((5, 32)).astype(np.float32)
+
+    index = indexing.Int8Index(space="l2")
+    index.build(embeddings, valid, identities)
+    assert index.codes.nbytes * 4 == embeddings.nbytes
+
+    distances = np.linalg.norm(targets[:, None, :] - embeddings[None, :, :], axis=2)
+    distances[:, ~valid] = np.inf
+    radius = np.sort(distances, axis=1)[:, 20].max()
+
+    # every match within the radius and the k closest items are nominated
+    for target_distances, candidates in zip(distances, index.search(targets, radius=radius)):
+        assert set(np.flatnonzero(target_distances <= radius)) <= set(candidates.tolist())
+        assert not (~valid[candidates]).any()
+    for target_distances, candidates in zip(distances, index.search(targets, k=5)):
+        assert set(np.argsort(target_distances)[:5]) <= set(candidates.tolist())
+        assert candidates.shape[0] < 1000
+
+    # rows dropped and added are kept in sync
+    keep_mask = np.arange(1000) >= 100
+    embeddings = np.concatenate([embeddings[keep_mask], embeddings[:100]])
+    valid = np.concatenate([valid[keep_mask], valid[:100]])
+    identities = np.concatenate([identities[keep_mask], identities[:100]])
+    index.update(keep_mask, embeddings, valid, identities)
+    assert index.size == 1000
+    assert 901 in index.search(embeddings[[901]], k=1)[0]
+    logger.info("✅ test int8 index done")
+
+
+def test_int8_index_scan_is_faster_than_exact_search():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((50000, 512)).astype(np.float32)
+    valid = np.ones(50000, dtype=bool)
+    identities = np.array([f"img{i}.jpg" for i in range(50000)])
+    norms = np.linalg.norm(embeddings, axis=1)
+    targets = embeddings[:5] + 0.1
+
+    index = indexing.Int8Index(space="l2")
+    index.build(embeddings, valid, identities)
+
+    def best_of(func, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            tic = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - tic)
+        return min(timings)
+
+    exact_seconds = best_of(
+        lambda: verification.find_normalized_distance(embeddings, norms, targets, "euclidean")
+    )
+    scan_seconds = best_of(lambda: index.search(targets, k=10))
+    assert scan_seconds < exact_seconds
+    logger.info("✅ test int8 index scan is faster than exact search done")
+
+
+def test_hnsw_index_with_replaced_rows(tmp_path):
+    pytest.importorskip("hnswlib")
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((500, 16)).astype(np.float32)
+    valid = np.ones(500, dtype=bool)
+    identities = np.array([f"img{i}.jpg" for i in range(500)])
+
+    index = indexing.HnswIndex(space="l2")
+    index.build(embeddings, valid, identities)
+
+    # replacing rows again and again reuses the slots of deleted rows
+    for _ in range(5):
+        keep_mask = np.arange(500) >= 100
+        embeddings = np.concatenate(
+            [embeddings[keep_mask], rng.standard_normal((100, 16)).astype(np.float32)]
+        )
+        index.update(keep_mask, embeddings, valid, identities)
+        index_path = str(tmp_path / "index")
+        index.save(index_path)
+        index = indexing.HnswIndex.load(index_path)
+    assert index.index.get_max_elements() == 500
+    assert index.index.get_current_count() == 500
+
+    for row in [0, 250, 499]:
+        assert row in index.search(embeddings[[row]], k=1)[0]
+    logger.info("✅ test hnsw index with replaced rows done")
+
+
+def test_pq_index():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((2000, 36)).astype(np.float32)
+    valid = np.ones(2000, dtype=bool)
+    valid[::10] = False
+    identities = np.array([f"img{i}.jpg" for i in range(2000)])
+
+    index = indexing.PqIndex(space="l2")
+    index.build(embeddings, valid, identities)
+    # 36 dimensions are padded to 6 subspaces of 8, stored in 3 codes of 2 bytes
+    assert index.codes.shape == (3, 2000)
+
+    targets = embeddings[1:6] + 0.1 * rng.standard_normal((5, 36)).astype(np.float32)
+    for i, candidates in enumerate(index.search(targets, nprobe=50), start=1):
+        assert candidates.shape[0] == 50
+        assert i in candidates
+        assert valid[candidates].all()
+
+    # rows dropped and added are kept in sync
+    keep_mask = np.arange(2000) >= 100
+    embeddings = np.concatenate([embeddings[keep_mask], embeddings[1:2]])
+    valid = np.concatenate([valid[keep_mask], valid[1:2]])
+    identities = np.concatenate([identities[keep_mask], identities[1:2]])
+    index.update(keep_mask, embeddings, valid, identities)
+    assert index.size == 1901
+    assert 1900 in index.search(embeddings[[1900]], nprobe=10)[0]
+    logger.info("✅ test pq index done")
+
+
+def test_find_with_top_k():
+    img_path = os.path.join("dataset", "img1.jpg")
+    dfs = DeepFace.find(img_path=img_path, db_path="dataset", silent=True)
+    top_dfs = DeepFace.find(img_path=img_path, db_path="dataset", silent=True, top_k=3)
+    results = DeepFace.find(
+        img_path=img_path, db_path="dataset", silent=True, batched=True, top_k=3
+    )
+
+    for df, top_df, result in zip(dfs, top_dfs, results):
+        assert top_df.shape[0] == min(3, df.shape[0])
+        assert top_df["identity"].tolist() == df["identity"].tolist()[:3]
+        assert [item["identity"] for item in result] == df["identity"].tolist()[:3]
+
+    with pytest.raises(ValueError, match="top_k must be a positive integer"):
+        DeepFace.find(img_path=img_path, db_path="dataset", silent=True, top_k=0)
+    logger.info("✅ test find with top k done")
+
+
+def test_find_many():
+    img_paths = [os.path.join("dataset", name) for name in ["img1.jpg", "img2.jpg", "img5.jpg"]]
+    expected = [
+        DeepFace.find(img_path=img_path, db_path="dataset", silent=True) for img_path in img_paths
+    ]
+
+    # probes are read lazily from a generator and searched in chunks
+    results = DeepFace.find_many(
+        img_paths=(img_path for img_path in img_paths),
+        db_path="dataset",
+        silent=True,
+        chunk_size=2,
+    )
+    for dfs, expected_dfs in zip(results, expected):
+        assert len(dfs) == len(expected_dfs)
+        for df, expected_df in zip(dfs, expected_dfs):
+            assert df["identity"].tolist() == expected_df["identity"].tolist()
+            assert np.allclose(df["distance"], expected_df["distance"], atol=1e-4)
+
+    batched_results = list(
+        DeepFace.find_many(img_paths=img_paths, db_path="dataset", silent=True, batched=True)
+    )
+    assert len(batched_results) == len(img_paths)
+    for results, expected_dfs in zip(batched_results, expected):
+        for result, expected_df in zip(results, expected_dfs):
+            assert [item["identity"] for item in result] == expected_df["identity"].tolist()
+
+    with pytest.raises(ValueError, match="chunk_size must be a positive integer"):
+        DeepFace.find_many(img_paths=img_paths, db_path="dataset", chunk_size=0)
+    logger.info("✅ test find many done")
+
+
+def test_find_with_block_size():
+    img_path = os.path.join("dataset", "img1.jpg")
+    for distance_metric in ["cosine", "euclidean", "euclidean_l2"]:
+        for top_k in [None, 3]:
+            dfs = DeepFace.find(
+                img_path=img_path,
+                db_path="dataset",
+                silent=True,
+                distance_metric=distance_metric,
+                top_k=top_k,
+            )
+            block_dfs = DeepFace.find(
+                img_path=img_path,
+                db_path="dataset",
+                silent=True,
+                distance_metric=distance_metric,
+                top_k=top_k,
+                block_size=7,
+            )
+            for df, block_df in zip(dfs, block_dfs):
+                assert block_df["identity"].tolist() == df["identity"].tolist()
+                assert block_df["distance"].tolist() == df["distance"].tolist()
+
+    with pytest.raises(ValueError, match="block_size must be a positive integer"):
+        DeepFace.find(img_path=img_path, db_path="dataset", silent=True, block_size=0)
+    logger.info("✅ test find with block size done")
+
+
+def test_datastore_with_memory_mapped_columns(tmp_path):
+    datastore_path = str(tmp_path / "ds")
+    datastore_utils.save(
+        datastore_utils.from_representations(
+            [
+                {
+                    "identity": f"img{i}.jpg",
+                    "hash": str(i),
+                    "embedding": [float(i), 1.0, 2.0],
+                    "target_x": 0,
+                    "target_y": 0,
+                    "target_w": 10,
+                    "target_h": 10,
+                }
+                for i in range(4)
+            ]
+        ),
+        datastore_path,
+    )
+
+    # columns of a snapshot are read from disk on access
+    datastore = datastore_utils.load(datastore_path)
+    assert isinstance(datastore.embeddings, np.memmap)
+    assert isinstance(datastore.metadata["identity"], np.memmap)
+    assert datastore.identities.tolist() == [f"img{i}.jpg" for i in range(4)]
+    assert datastore.metadata["target_w"].tolist() == [10] * 4
+
+    in_memory = datastore_utils.load(datastore_path, mmap=False)
+    assert not isinstance(in_memory.metadata["identity"], np.memmap)
+    assert np.allclose(in_memory.norms, datastore.norms)
+
+
+def test_legacy_pickle_migration(tmp_path):
+    representations = [
+        {
+            "identity": "dataset/img1.jpg",
+            "hash": "alpha",
+            "embedding": [0.1, 0.2, 0.3],
+            "target_x": 1,
+            "target_y": 2,
+            "target_w": 3,
+            "target_h": 4,
+        },
+        {
+            "identity": "dataset/img2.jpg",
+            "hash": "beta",
+            "embedding": None,
+            "target_x": 0,
+            "target_y": 0,
+            "target_w": 0,
+            "target_h": 0,
+        },
+    ]
+    datastore_path = str(tmp_path / "ds_model_vggface")
+    with open(f"{datastore_path}.pkl", "wb") as f:
+        pickle.dump(representations, f, pickle.HIGHEST_PROTOCOL)
+
+    assert datastore_utils.exists(datastore_path) is False
+    datastore_utils.migrate_pickle(datastore_path, silent=True)
+    assert datastore_utils.exists(datastore_path) is True
+
+    datastore = datastore_utils.load(datastore_path)
+    assert len(datastore) == 2
+    assert datastore.embeddings.dtype == np.float32
+    assert datastore.embeddings.shape == (2, 3)
+    assert datastore.valid.tolist() == [True, False]
+    assert datastore.identities.tolist() == ["dataset/img1.jpg", "dataset/img2.jpg"]
+    assert datastore.metadata["target_w"].tolist() == [3, 0]
+    # embeddings are stored l2 normalized with their norms
+    assert np.allclose(datastore.embeddings[0] * datastore.norms[0], [0.1, 0.2, 0.3])
+    assert np.isclose(np.linalg.norm(datastore.embeddings[0]), 1)
+    assert datastore.norms[1] == 0
+    logger.info("✅ test legacy pickle migration done")
+
+
+def __journal_item(identity: str, value: float):
+    return {
+        "identity": identity,
+        "hash": identity,
+        "embedding": [value, value, value],
+        "target_x": 0,
+        "target_y": 0,
+        "target_w": 1,
+        "target_h": 1,
+    }
+
+
+def test_compressed_index_with_memory_mapped_datastore(tmp_path):
+    file_name = datastore_utils.get_datastore_name(
+        model_name="VGG-Face",
+        detector_backend="opencv",
+        align=True,
+        normalization="base",
+        expand_percentage=0,
+    )
+    datastore_path = str(tmp_path / file_name)
+    datastore = datastore_utils.from_representations([__journal_item("a", 1)])
+    datastore_utils.save(datastore, datastore_path)
+    datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities=set(),
+        added=datastore_utils.from_representations([__journal_item("b", 2)]),
+    )
+
+    def prepare_search():
+        return getattr(recognition, "__prepare_search")(
+            db_path=str(tmp_path),
+            model_name="VGG-Face",
+            distance_metric="euclidean",
+            enforce_detection=True,
+            detector_backend="opencv",
+            align=True,
+            expand_percentage=0,
+            normalization="base",
+            silent=True,
+            refresh_database=False,
+            index="int8",
+            refresh_mode="files",
+            batch_size=32,
+            workers=1,
+        )
+
+    recognition.clear_datastore_cache()
+    try:
+        # the journal is compacted, so that embeddings are memory mapped instead of merged
+        datastore, ann_index, _ = prepare_search()
+        assert isinstance(datastore.embeddings, np.memmap)
+        assert datastore.identities.tolist() == ["a", "b"]
+        assert ann_index.size == 2
+        assert datastore_utils.get_version(datastore_path) == 2
+
+        # the memory mapped datastore is cached
+        assert prepare_search()[0] is datastore
+    finally:
+        recognition.clear_datastore_cache()
+    logger.info("✅ test compressed index with memory mapped datastore done")
+
+
+def test_datastore_journal(tmp_path):
+    datastore_path = str(tmp_path / "ds_model_vggface")
+    datastore = datastore_utils.from_representations(
+        [__journal_item("a", 1), __journal_item("b", 2)]
+    )
+    datastore_utils.save(datastore, datastore_path)
+    assert datastore_utils.get_version(datastore_path) == 1
+    with open(datastore_utils.get_embeddings_path(datastore_path, 1), "rb") as f:
+        snapshot_before = f.read()
+
+    # removing b and adding c must not rewrite the snapshot
+    sequence, in_sync = datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities={"b"},
+        added=datastore_utils.from_representations([__journal_item("c", 3)]),
+    )
+    assert sequence == 2
+    assert in_sync is True
+    with open(datastore_utils.get_embeddings_path(datastore_path, 1), "rb") as f:
+        assert f.read() == snapshot_before
+
+    datastore = datastore_utils.load(datastore_path)
+    assert datastore.identities.tolist() == ["a", "c"]
+    assert np.allclose(datastore.embeddings[:, 0] * datastore.norms, [1, 3])
+    assert datastore.sequence == 2
+
+    # compaction publishes a new version and removes the files of the previous one
+    datastore_utils.compact(datastore_path)
+    assert datastore_utils.get_version(datastore_path) == 2
+    assert os.path.exists(datastore_utils.get_journal_path(datastore_path, 2)) is False
+    assert os.path.exists(datastore_utils.get_embeddings_path(datastore_path, 1)) is False
+    assert os.path.exists(datastore_utils.get_journal_path(datastore_path, 1)) is False
+    compacted = datastore_utils.load(datastore_path)
+    assert compacted.identities.tolist() == ["a", "c"]
+    assert compacted.sequence == 2
+    logger.info("✅ test datastore journal done")
+
+
+def test_datastore_journal_with_concurrent_writers(tmp_path):
+    datastore_path = str(tmp_path / "ds_model_vggface")
+    datastore = datastore_utils.from_representations([__journal_item("a", 1)])
+    datastore_utils.save(datastore, datastore_path)
+
+    # both writers start from the same datastore, neither change must be dropped
+    sequence, in_sync = datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities={"a"},
+        added=datastore_utils.from_representations([__journal_item("b", 2)]),
+    )
+    assert (sequence, in_sync) == (2, True)
+
+    sequence, in_sync = datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities=set(),
+        added=datastore_utils.from_representations([__journal_item("c", 3)]),
+    )
+    assert (sequence, in_sync) == (3, False)
+
+    datastore = datastore_utils.load(datastore_path)
+    assert datastore.identities.tolist() == ["b", "c"]
+    assert datastore.sequence == 3
+    logger.info("✅ test datastore journal with concurrent writers done")
+
+
+def test_datastore_journal_with_incomplete_record(tmp_path):
+    datastore_path = str(tmp_path / "ds_model_vggface")
+    datastore = datastore_utils.from_representations([__journal_item("a", 1)])
+    datastore_utils.save(datastore, datastore_path)
+    datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities=set(),
+        added=datastore_utils.from_representations([__journal_item("b", 2)]),
+    )
+
+    # a record being appended by another writer looks incomplete
+    journal_path = datastore_utils.get_journal_path(datastore_path, 1)
+    journal_size = os.path.getsize(journal_path)
+    with open(journal_path, "ab") as f:
+        np.save(f, np.array([2, datastore_utils.ADD_RECORD], dtype=np.int64))
+        f.write(b"\x93NUMPY")
+
+    # loading ignores it and leaves the journal as it is
+    datastore = datastore_utils.load(datastore_path)
+    assert datastore.identities.tolist() == ["a", "b"]
+    assert os.path.getsize(journal_path) > journal_size
+
+    # writers hold the lock, so they drop the remainder of a crashed append
+    sequence, _ = datastore_utils.append_journal(
+        datastore_path=datastore_path,
+        sequence=datastore.sequence,
+        removed_identities=set(),
+        added=datastore_utils.from_representations([__journal_item("c", 3)]),
+    )
+    assert sequence == 2
+    assert datastore_utils.load(datastore_path).identities.tolist() == ["a", "b", "c"]
+    logger.info("✅ test datastore journal with incomplete record done")
+
+
+def test_scan_changed_images(tmp_path):
+    for person in ["alice", "bob"]:
+        os.makedirs(tmp_path / person)
+        for idx in range(2):
+            cv2.imwrite(str(tmp_path / person / f"{idx}.jpg"), np.zeros((8, 8, 3), np.uint8))
+    db_path = str(tmp_path)
+
+    images, changed, manifest = image_utils.scan_changed_images(path=db_path, manifest={})
+    assert len(images) == 4
+    assert changed == {db_path, str(tmp_path / "alice"), str(tmp_path / "bob")}
+
+    # nothing changed
+    images, changed, manifest = image_utils.scan_changed_images(path=db_path, manifest=manifest)
+    assert len(images) == 0
+    assert len(changed) == 0
+    assert sum(properties["images"] for properties in manifest.values()) == 4
+
+    # only the directory where an image was removed is scanned
+    os.remove(tmp_path / "bob" / "0.jpg")
+    images, changed, manifest = image_utils.scan_changed_images(path=db_path, manifest=manifest)
+    assert changed == {str(tmp_path / "bob")}
+    assert list(images.keys()) == [str(tmp_path / "bob" / "1.jpg")]
+
+    # removed sub directories are reported as changed
+    os.remove(tmp_path / "bob" / "1.jpg")
+    os.rmdir(tmp_path / "bob")
+    images, changed, manifest = image_utils.scan_changed_images(path=db_path, manifest=manifest)
+    assert changed == {str(tmp_path / "bob")}
+    assert len(images) == 0
+    logger.info("✅ test scan changed images done")
+
+
+def test_scan_images_with_removed_entries(tmp_path, monkeypatch):
+    for person in ["alice", "bob"]:
+        os.makedirs(tmp_path / person)
+        cv2.imwrite(str(tmp_path / person / "0.jpg"), np.zeros((8, 8, 3), np.uint8))
+    db_path = str(tmp_path)
+    assert len(image_utils.scan_images(db_path)) == 2
+
+    # format checks are only kept for the files found in the last scan of a path
+    os.remove(tmp_path / "alice" / "0.jpg")
+    assert len(image_utils.scan_images(db_path)) == 1
+    assert list(image_utils._format_cache[os.path.abspath(db_path)].keys()) == [
+        str(tmp_path / "bob" / "0.jpg")
+    ]
+
+    # directories removed while scanning are skipped
+    scandir = os.scandir
+
+    def vanishing_scandir(path):
+        if os.path.basename(path) == "bob":
+            raise FileNotFoundError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", vanishing_scandir)
+    assert len(image_utils.scan_images(db_path)) == 0
+    images, changed, _ = image_utils.scan_changed_images(path=db_path, manifest={})
+    assert len(images) == 0
+    assert str(tmp_path / "bob") not in changed
+    logger.info("✅ test scan images with removed entries done")
+
+
+def test_refresh_directories_with_trailing_separator(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "bob")
+    for image_path in [tmp_path / "root.jpg", tmp_path / "bob" / "0.jpg"]:
+        cv2.imwrite(str(image_path), np.zeros((8, 8, 3), np.uint8))
+    db_path = str(tmp_path) + os.sep
+
+    def find_bulk_embeddings(employees, **kwargs):
+        return [
+            {**__journal_item(employee, 1.0), "hash": image_utils.find_image_hash(employee)}
+            for employee in sorted(employees)
+        ]
+
+    monkeypatch.setattr(recognition, "__find_bulk_embeddings", find_bulk_embeddings)
+    try:
+        datastore = recognition.refresh_datastore(
+            db_path=db_path, refresh_mode="directories", silent=True
+        )
+        assert len(datastore) == 2
+
+        # images removed from the root directory are noticed
+        os.remove(tmp_path / "root.jpg")
+        datastore = recognition.refresh_datastore(
+            db_path=db_path, refresh_mode="directories", silent=True
+        )
+        assert datastore.identities.tolist() == [str(tmp_path / "bob" / "0.jpg")]
+    finally:
+        recognition.clear_datastore_cache()
+    logger.info("✅ test refresh directories with trailing separator done")
+
+
+def test_find_with_workers(tmp_path):
+    for img_name in ["img1.jpg", "img2.jpg", "img3.jpg", "img4.jpg", "img5.jpg"]:
+        shutil.copy(os.path.join("dataset", img_name), tmp_path / img_name)
+    db_path = str(tmp_path)
+
+    dfs = DeepFace.find(img_path="dataset/img1.jpg", db_path=db_path, workers=2, batch_size=2)
+    parallel = dfs[0][["identity", "distance"]]
+
+    recognition.clear_datastore_cache()
+    for file_name in os.listdir(db_path):
+        if file_name.startswith("ds_"):
+            os.remove(os.path.join(db_path, file_name))
+
+    dfs = DeepFace.find(img_path="dataset/img1.jpg", db_path=db_path)
+    sequential = dfs[0][["identity", "distance"]]
+
+    assert parallel["identity"].tolist() == sequential["identity"].tolist()
+    assert np.allclose(parallel["distance"], sequential["distance"], atol=1e-4)
+
+    with pytest.raises(ValueError, match="workers must be a positive integer"):
+        DeepFace.find(img_path="dataset/img1.jpg", db_path=db_path, workers=0)
+    logger.info("✅ test find with workers done")
+
+
+def test_find_with_watcher(tmp_path):
+    for img_name in ["img1.jpg", "img2.jpg", "img3.jpg"]:
+        shutil.copy(os.path.join("dataset", img_name), tmp_path / img_name)
+    db_path = str(tmp_path)
+
+    def find_identities():
+        dfs = DeepFace.find(
+            img_path="dataset/img1.jpg", db_path=db_path, threshold=10, refresh_database=False
+        )
+        return set(dfs[0]["identity"].tolist())
+
+    expected = {str(tmp_path / "img1.jpg"), str(tmp_path / "img3.jpg")}
+
+    with DeepFace.watch(db_path=db_path, interval=0.1, backend="polling"):
+        assert find_identities() == expected | {str(tmp_path / "img2.jpg")}
+
+        os.makedirs(tmp_path / "new")
+        shutil.copy(os.path.join("dataset", "img4.jpg"), tmp_path / "new" / "img4.jpg")
+        os.remove(tmp_path / "img2.jpg")
+        expected.add(str(tmp_path / "new" / "img4.jpg"))
+
+        for _ in range(100):
+            if find_identities() == expected:
+                break
+            time.sleep(0.5)
+        assert find_identities() == expected
+    logger.info("✅ test find with watcher done")
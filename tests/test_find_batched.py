@@ -2,6 +2,7 @@
 import os
 
 # 3rd party dependencies
+import pytest
 import cv2
 
 # project dependencies
@@ -101,3 +102,29 @@ def test_filetype_for_find():
     assert not any(face["identity"] == "dataset/img47.jpg" for face in result)
 
     logger.info("✅ test wrong filetype done")
+
+
+def test_find_with_arrays_format():
+    img_path = os.path.join("dataset", "img1.jpg")
+    dicts = DeepFace.find(img_path=img_path, db_path="dataset", silent=True, batched=True)
+    arrays = DeepFace.find(
+        img_path=img_path, db_path="dataset", silent=True, batched=True, return_format="arrays"
+    )
+    assert len(arrays) == len(dicts)
+
+    for result, columns in zip(dicts, arrays):
+        assert isinstance(columns, dict)
+        assert set(columns.keys()) == set(result[0].keys())
+        assert columns["identity"].tolist() == [face["identity"] for face in result]
+        assert columns["distance"].tolist() == [face["distance"] for face in result]
+        assert columns["target_x"].tolist() == [face["target_x"] for face in result]
+
+        # per face constants are stored once
+        for key in ["source_x", "source_y", "source_w", "source_h", "threshold"]:
+            assert all(columns[key] == face[key] for face in result)
+        assert columns["threshold"] == threshold
+
+    with pytest.raises(ValueError, match="return_format must be one of"):
+        DeepFace.find(img_path=img_path, db_path="dataset", silent=True, return_format="rows")
+
+    logger.info("✅ test find with arrays format done")
@@ -0,0 +1,109 @@
+# 3rd party dependencies
+import pytest
+import numpy as np
+
+# project dependencies
+from deepface import DeepFace
+from deepface.commons import package_utils
+from deepface.models.facial_recognition import Facenet
+from deepface.modules import modeling
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tf2onnx")
+
+img_paths = ["dataset/img1.jpg", "dataset/img2.jpg", "dataset/couple.jpg"]
+
+tf_major, tf_minor = package_utils.get_tf_major_version(), package_utils.get_tf_minor_version()
+
+
+@pytest.mark.parametrize(
+    "model_name",
+    [
+        "VGG-Face",
+        "Facenet",
+        "Facenet512",
+        "OpenFace",
+        "DeepID",
+        "ArcFace",
+        "GhostFaceNet",
+        pytest.param(
+            "DeepFace",
+            marks=pytest.mark.skipif(
+                tf_major == 2 and tf_minor > 12, reason="DeepFace model requires tf 2.12 or less"
+            ),
+        ),
+    ],
+)
+def test_represent_with_onnx_backend(model_name, monkeypatch):
+    expected = DeepFace.represent(img_path=img_paths, model_name=model_name, output="numpy")
+
+    monkeypatch.setenv("DEEPFACE_INFERENCE_BACKEND", "onnx")
+    model = DeepFace.build_model(model_name=model_name)
+    assert type(model.model).__name__ == "OnnxModel"
+
+    results = DeepFace.represent(img_path=img_paths, model_name=model_name, output="numpy")
+
+    for result, expected_result in zip(results, expected):
+        assert len(result) == len(expected_result)
+        for embedding_obj, expected_obj in zip(result, expected_result):
+            assert embedding_obj["facial_area"] == expected_obj["facial_area"]
+            assert np.allclose(embedding_obj["embedding"], expected_obj["embedding"], atol=1e-4)
+    logger.info(f"✅ test represent with onnx backend for {model_name} done")
+
+
+def test_analyze_with_onnx_backend(monkeypatch):
+    actions = ["age", "gender", "race", "emotion"]
+    expected = DeepFace.analyze(img_path="dataset/img4.jpg", actions=actions)
+
+    monkeypatch.setenv("DEEPFACE_INFERENCE_BACKEND", "onnx")
+    results = DeepFace.analyze(img_path="dataset/img4.jpg", actions=actions)
+
+    assert len(results) == len(expected)
+    for result, expected_result in zip(results, expected):
+        # age is truncated to an integer
+        assert abs(result["age"] - expected_result["age"]) <= 1
+        assert result["dominant_gender"] == expected_result["dominant_gender"]
+        assert result["dominant_race"] == expected_result["dominant_race"]
+        assert result["dominant_emotion"] == expected_result["dominant_emotion"]
+        for action in ["gender", "race", "emotion"]:
+            for label, score in expected_result[action].items():
+                assert abs(result[action][label] - score) < 1e-2
+    logger.info("✅ test analyze with onnx backend done")
+
+
+def test_verify_with_onnx_backend(monkeypatch):
+    expected = DeepFace.verify(img1_path="dataset/img1.jpg", img2_path="dataset/img2.jpg")
+
+    monkeypatch.setenv("DEEPFACE_INFERENCE_BACKEND", "onnx")
+    result = DeepFace.verify(img1_path="dataset/img1.jpg", img2_path="dataset/img2.jpg")
+
+    assert result["verified"] == expected["verified"]
+    assert abs(result["distance"] - expected["distance"]) < 1e-4
+    logger.info("✅ test verify with onnx backend done")
+
+
+def test_build_model_from_onnx_export(monkeypatch):
+    DeepFace.build_model(model_name="Facenet", backend="onnx")
+
+    def load_keras_model():
+        raise AssertionError("keras model must not be built once it is exported")
+
+    # a new process starts without the model in memory
+    monkeypatch.setitem(modeling.cached_models["facial_recognition"], ("Facenet", "onnx"), None)
+    monkeypatch.setattr(Facenet, "load_facenet128d_model", load_keras_model)
+
+    model = DeepFace.build_model(model_name="Facenet", backend="onnx")
+    assert type(model.model).__name__ == "OnnxModel"
+    assert model.model_name == "FaceNet-128d"
+    assert model.input_shape == (160, 160)
+    assert model.output_shape == 128
+    logger.info("✅ test build model from onnx export done")
+
+
+def test_build_model_with_invalid_backend():
+    with pytest.raises(ValueError, match="unimplemented backend"):
+        DeepFace.build_model(model_name="VGG-Face", backend="tflite")
+    logger.info("✅ test build model with invalid backend done")
@@ -1,10 +1,12 @@
 # built-in dependencies
 import io
 import cv2
+import numpy as np
 import pytest
 
 # project dependencies
 from deepface import DeepFace
+from deepface.modules import representation
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -81,3 +83,68 @@ def test_max_faces():
     max_faces = 1
     results = DeepFace.represent(img_path="dataset/couple.jpg", max_faces=max_faces)
     assert len(results) == max_faces
+
+
+@pytest.mark.parametrize("model_name", ["VGG-Face", "Facenet", "SFace"])
+def test_represent_faces_in_batches(model_name):
+    faces = [
+        face_obj["face"]
+        for img_path in ["dataset/img1.jpg", "dataset/img2.jpg", "dataset/couple.jpg"]
+        for face_obj in DeepFace.extract_faces(img_path=img_path)
+    ]
+    assert len(faces) > 3
+
+    embeddings = representation.represent_faces(
+        faces=faces, model_name=model_name, batch_size=2
+    )
+    assert len(embeddings) == len(faces)
+
+    for face, embedding in zip(faces, embeddings):
+        expected = DeepFace.represent(
+            img_path=face, model_name=model_name, detector_backend="skip"
+        )[0]["embedding"]
+        assert np.allclose(embedding, expected, atol=1e-4)
+
+    with pytest.raises(ValueError, match="batch_size must be a positive integer"):
+        representation.represent_faces(faces=faces, model_name=model_name, batch_size=0)
+    logger.info(f"✅ test represent faces in batches for {model_name} done")
+
+
+def test_represent_many_images():
+    img_paths = ["dataset/img1.jpg", "dataset/couple.jpg", "dataset/img5.jpg"]
+    results = DeepFace.represent(img_path=img_paths, batch_size=2)
+    assert len(results) == len(img_paths)
+
+    for img_path, embedding_objs in zip(img_paths, results):
+        expected_objs = DeepFace.represent(img_path=img_path)
+        assert len(embedding_objs) == len(expected_objs)
+        for embedding_obj, expected_obj in zip(embedding_objs, expected_objs):
+            assert embedding_obj["facial_area"] == expected_obj["facial_area"]
+            assert embedding_obj["face_confidence"] == expected_obj["face_confidence"]
+            assert np.allclose(embedding_obj["embedding"], expected_obj["embedding"], atol=1e-4)
+
+    # pre-extracted faces stacked as a 4 dimensional array
+    faces = np.stack([cv2.resize(cv2.imread(img_path), (224, 224)) for img_path in img_paths])
+    results = DeepFace.represent(img_path=faces, detector_backend="skip")
+    assert [len(embedding_objs) for embedding_objs in results] == [1, 1, 1]
+
+    assert DeepFace.represent(img_path=[]) == []
+    logger.info("✅ test represent many images done")
+
+
+def test_represent_with_numpy_output():
+    img_path = "dataset/couple.jpg"
+    list_objs = DeepFace.represent(img_path=img_path)
+    numpy_objs = DeepFace.represent(img_path=img_path, output="numpy")
+    assert len(numpy_objs) == len(list_objs)
+
+    for list_obj, numpy_obj in zip(list_objs, numpy_objs):
+        embedding = numpy_obj["embedding"]
+        assert isinstance(embedding, np.ndarray)
+        assert embedding.dtype == np.float32
+        assert embedding.tolist() == list_obj["embedding"]
+        assert numpy_obj["facial_area"] == list_obj["facial_area"]
+
+    with pytest.raises(ValueError, match="output must be one of list or numpy"):
+        DeepFace.represent(img_path=img_path, output="tensor")
+    logger.info("✅ test represent with numpy output done")
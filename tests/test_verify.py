@@ -1,9 +1,11 @@
 # 3rd party dependencies
 import pytest
 import cv2
+import numpy as np
 
 # project dependencies
 from deepface import DeepFace
+from deepface.modules import verification
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -144,6 +146,28 @@ def test_verify_for_precalculated_embeddings():
     logger.info("✅ test verify for pre-calculated embeddings done")
 
 
+def test_verify_for_precalculated_numpy_embeddings():
+    img1_path = "dataset/img1.jpg"
+    img2_path = "dataset/img2.jpg"
+
+    img1_embedding = DeepFace.represent(img_path=img1_path, output="numpy")[0]["embedding"]
+    img2_embedding = DeepFace.represent(img_path=img2_path, output="numpy")[0]["embedding"]
+    assert img1_embedding.ndim == 1
+
+    result = DeepFace.verify(img1_path=img1_embedding, img2_path=img2_embedding, silent=True)
+    expected = DeepFace.verify(
+        img1_path=img1_embedding.tolist(), img2_path=img2_embedding.tolist(), silent=True
+    )
+    assert result["distance"] == expected["distance"]
+    assert result["verified"] == expected["verified"]
+
+    # embeddings of the images are the same as the ones found by verify
+    expected = DeepFace.verify(img1_path=img1_path, img2_path=img2_path)
+    assert result["distance"] == expected["distance"]
+
+    logger.info("✅ test verify for pre-calculated numpy embeddings done")
+
+
 def test_verify_with_precalculated_embeddings_for_incorrect_model():
     # generate embeddings with VGG (default)
     img1_path = "dataset/img1.jpg"
@@ -188,3 +212,50 @@ def test_verify_for_nested_embeddings():
         _ = DeepFace.verify(img1_path=img1_embeddings, img2_path=img2_path)
 
     logger.info("✅ test verify for nested embeddings is done")
+
+
+def test_batch_euclidean_distance(monkeypatch):
+    rng = np.random.default_rng(0)
+    source = rng.standard_normal((1000, 128)).astype(np.float32) * 10
+    test = rng.standard_normal((5, 128)) * 10
+    test[0] = source[3]  # exact duplicate
+    test[1] = source[7] + 1e-3  # near duplicate
+
+    expected = np.linalg.norm(source[None, :, :] - test[:, None, :], axis=2)
+
+    # force many small chunks
+    monkeypatch.setattr(verification, "DISTANCE_CHUNK_BYTES", 64 * 1024)
+    squared_norms = np.einsum("ij,ij->i", source, source)
+    for norms in [None, squared_norms]:
+        distances = verification.find_euclidean_distance(source, test, norms)
+        assert distances.dtype == np.float32
+        assert distances.shape == (5, 1000)
+        assert np.allclose(distances, expected, rtol=1e-5, atol=1e-4)
+        assert distances[0, 3] == 0
+        assert np.isclose(distances[1, 7], expected[1, 7], rtol=1e-3)
+
+    logger.info("✅ test batch euclidean distance is done")
+
+
+@pytest.mark.parametrize("distance_metric", metrics)
+def test_normalized_distance(distance_metric):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((500, 64)) * 5
+    embeddings[10] = 0  # no face detected
+    targets = rng.standard_normal((3, 64)) * 5
+    targets[0] = embeddings[4]
+
+    normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-10)
+    norms = np.linalg.norm(embeddings, axis=1)
+
+    distances = verification.find_normalized_distance(
+        normalized.astype(np.float32), norms.astype(np.float32), targets, distance_metric
+    )
+    expected = verification.find_distance(embeddings, targets, distance_metric)
+
+    assert distances.dtype == np.float32
+    assert distances.shape == (3, 500)
+    valid = norms > 0
+    assert np.allclose(distances[:, valid], expected[:, valid], atol=1e-4)
+    assert np.isclose(distances[0, 4], 0, atol=1e-5)
+    logger.info(f"✅ test normalized distance for {distance_metric} is done")